@@ -0,0 +1,245 @@
+"""
+API JSON locale des agrégats du dashboard, sans Streamlit.
+
+Expose les calculs de `utils/computations.py` à plusieurs dashboards ou
+scripts à la fois. Les résultats sont mis en cache par état de filtres dans un
+cache partagé par toutes les requêtes (voir ViewCache) : deux requêtes
+simultanées pour la même vue ne la calculent qu'une fois.
+
+Routes (GET, filtres optionnels start, end, client, activite, localite) :
+    /health        version des données et efficacité du cache
+    /meta          clients, activités, localités, mois et canaux disponibles
+    /kpis          KPIs de chaque canal et agrégats du plan
+    /financial     métriques financières par produit, par client et globales
+    /performance   classements de performance (paramètre dimension)
+    /clients       tableau des clients (paramètre canal)
+
+Usage :
+    python app/api_server.py --port 8600
+    curl 'http://127.0.0.1:8600/kpis?start=2025-01&end=2025-05&activite=Plombier'
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from utils.computations import channel_kpis, compute_client_table, compute_view
+from utils.data_loader import DataLoader
+from utils.data_watcher import DataWatcher
+from utils.metric_catalog import CHANNELS, compile_plan
+from utils.view_cache import DEFAULT_ACTIVITE, DEFAULT_LOCALITE, ViewCache, make_filter_state
+
+logger = logging.getLogger(__name__)
+
+def to_json(value):
+    """Convertit un résultat de calcul (DataFrame, Series, numpy, NaN) en valeur JSON."""
+    if isinstance(value, pd.DataFrame):
+        return [to_json(record) for record in value.to_dict(orient='records')]
+    if isinstance(value, pd.Series):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [to_json(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class ComputationService:
+    """
+    Calculs du dashboard partagés par toutes les requêtes : un loader, un plan
+    et une liste des mois par version des données, et un cache des vues par
+    état de filtres.
+    """
+
+    def __init__(self, loader: DataLoader, max_entries: int = 256):
+        self.loader = loader
+        self.views = ViewCache(max_entries)
+        self.tables = ViewCache(max_entries)
+        self._plan = None
+        self._plan_version = None
+        self._months = None
+        self._months_version = None
+        self._lock = threading.Lock()
+
+    def sync(self) -> None:
+        """
+        Suit les données publiées avant chaque requête (backend shared).
+
+        Les autres backends sont suivis par un DataWatcher ; en mémoire
+        partagée, aucun watcher ne tourne et seule la version publiée par
+        app/shared_publisher.py est lue (un entier).
+        """
+        if self.loader.backend == 'shared':
+            self.loader.refresh()
+
+    def plan(self) -> dict:
+        """Plan d'exécution du catalogue, recompilé quand la version des données change."""
+        with self._lock:
+            if self._plan_version != self.loader.version:
+                self._plan = compile_plan(self.loader.get_metric_columns())
+                self._plan_version = self.loader.version
+            return self._plan
+
+    def months(self) -> list:
+        """Mois disponibles, relus quand la version des données change."""
+        with self._lock:
+            if self._months_version != self.loader.version:
+                self._months = self.loader.get_dimension_values('date')
+                self._months_version = self.loader.version
+            return self._months
+
+    def filter_state(self, params: dict) -> tuple:
+        """État de filtres (clé des caches) à partir des paramètres de la requête."""
+        months = self.months()
+        return make_filter_state(
+            self.loader.version,
+            params.get('start') or months[0],
+            params.get('end') or months[-1],
+            params.get('client') or "",
+            params.get('activite') or DEFAULT_ACTIVITE,
+            params.get('localite') or DEFAULT_LOCALITE,
+        )
+
+    def view(self, state: tuple) -> dict:
+        plan = self.plan()
+        return self.views.get_or_compute(state, lambda: compute_view(self.loader, plan, state))
+
+    def health(self, params: dict) -> dict:
+        return {
+            'version': self.loader.version,
+            'backend': self.loader.backend,
+            'cache': {'vues': len(self.views), 'succes': self.views.hits, 'calculs': self.views.misses},
+        }
+
+    def meta(self, params: dict) -> dict:
+        return {
+            'clients': self.loader.get_clients(),
+            'activites': self.loader.get_dimension_values('Activité'),
+            'localites': self.loader.get_dimension_values('Localité'),
+            'mois': self.months(),
+            'canaux': list(CHANNELS),
+        }
+
+    def kpis(self, params: dict) -> dict:
+        values = self.view(self.filter_state(params))['kpis']
+        return {'kpis': channel_kpis(values, self.plan()), 'agregats': values}
+
+    def financial(self, params: dict) -> dict:
+        return self.view(self.filter_state(params))['financial']
+
+    def performance(self, params: dict) -> dict:
+        performances = self.view(self.filter_state(params))['performance']
+        dimension = params.get('dimension')
+        if dimension is None:
+            return performances
+        if dimension not in performances:
+            raise ValueError(f"Dimension {dimension} inconnue ({', '.join(performances)})")
+        return {dimension: performances[dimension]}
+
+    def clients(self, params: dict) -> dict:
+        canal = params.get('canal') or "Tous"
+        if canal != "Tous" and canal not in CHANNELS:
+            raise ValueError(f"Canal {canal} inconnu ({', '.join(CHANNELS)})")
+        state = self.filter_state(params)
+        plan = self.plan()
+        return {'lignes': self.tables.get_or_compute(
+            (state, canal), lambda: compute_client_table(self.loader, plan, state, canal)
+        )}
+
+
+# Routes : chemin → méthode de ComputationService
+ROUTES = {
+    '/health': 'health',
+    '/meta': 'meta',
+    '/kpis': 'kpis',
+    '/financial': 'financial',
+    '/performance': 'performance',
+    '/clients': 'clients',
+}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Requêtes GET de l'API ; `service` est fourni par make_server."""
+
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        route = ROUTES.get(url.path.rstrip('/') or '/')
+        if route is None:
+            self._send(404, {'error': f"Route {url.path} inconnue", 'routes': list(ROUTES)})
+            return
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            self.service.sync()
+            self._send(200, to_json(getattr(self.service, route)(params)))
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            logger.exception(f"Erreur sur {self.path}")
+            self._send(500, {'error': str(e)})
+
+    def _send(self, status: int, payload) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def make_server(loader: DataLoader, host: str = "127.0.0.1", port: int = 8600) -> ThreadingHTTPServer:
+    """Serveur HTTP (un thread par requête) partageant un ComputationService."""
+    handler = type('BoundApiHandler', (ApiHandler,), {'service': ComputationService(loader)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", type=Path, default=Path("data/data.json"), help="Snapshot JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8600, help="Port d'écoute")
+    args = parser.parse_args()
+
+    # Même backend que le dashboard (DASHBOARD_BACKEND), chargé une fois avant la première requête
+    loader = DataLoader(json_path=args.json, backend=os.getenv('DASHBOARD_BACKEND', 'pandas'),
+                        compact=os.getenv('DASHBOARD_COMPACT') == '1')
+    if loader.backend == 'sqlite':
+        loader.get_store()
+    else:
+        loader.get_data()
+    # Données partagées : suivies par app/shared_publisher.py, relues avant chaque requête (sync)
+    watcher = None if loader.backend == 'shared' else DataWatcher(loader).start()
+    server = make_server(loader, args.host, args.port)
+    print(f"API à l'écoute sur http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if watcher is not None:
+            watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
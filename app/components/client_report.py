@@ -0,0 +1,128 @@
+import html
+import logging
+import re
+import unicodedata
+from typing import Optional
+import numpy as np
+import pandas as pd
+from components.visualizations import (
+    UNIT_SCALES,
+    build_evolution_figure,
+    format_currency,
+    format_metric
+)
+from utils.computations import compute_financial_metrics
+from utils.metric_catalog import CHANNELS, plan_reductions
+
+logger = logging.getLogger(__name__)
+
+# KPIs tracés dans les graphiques d'évolution du rapport (un graphique par KPI, une trace par canal)
+EVOLUTION_KPIS = ['Contacts', 'Budget', 'Coût Contact']
+
+# Graphiques figés : pas de zoom ni de barre d'outils, rendu identique à l'impression
+STATIC_CONFIG = {'staticPlot': True}
+
+# Bibliothèque plotly.js, écrite une fois à côté des rapports
+PLOTLY_JS = "plotly.min.js"
+
+REPORT_STYLE = """
+body { font-family: sans-serif; margin: 2em auto; max-width: 1200px; color: #262730; }
+.tiles { display: grid; grid-template-columns: repeat(auto-fill, minmax(200px, 1fr)); gap: 0.6em; }
+.tile { border: 1px solid #e6e6e6; border-radius: 6px; padding: 0.6em 0.8em; }
+.tile .label { font-size: 0.85em; color: #6b6f76; }
+.tile .value { font-size: 1.4em; }
+table { border-collapse: collapse; }
+td, th { border-bottom: 1px solid #e6e6e6; padding: 0.3em 0.8em; text-align: right; }
+"""
+
+def report_filename(client: str) -> str:
+    """Nom de fichier du rapport d'un client (caractères sûrs uniquement)."""
+    ascii_name = unicodedata.normalize('NFKD', client).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^0-9A-Za-z]+', '_', ascii_name).strip('_') + ".html"
+
+def compute_client_report(loader, plan: dict, client: str, start: Optional[str] = None,
+                          end: Optional[str] = None) -> dict:
+    """
+    Calculs du rapport d'un client, sans affichage : les mêmes que le dashboard.
+
+    Returns:
+        Dictionnaire client, start, end, kpis (agrégats du plan), financial
+        (voir compute_financial_metrics), months et series (colonne → valeurs mensuelles)
+    """
+    kpis = loader.aggregate(**plan_reductions(plan), client=client, start=start, end=end).iloc[0]
+    financial = compute_financial_metrics(loader, start=start, end=end, client=client)
+    columns = [
+        plan['catalog'][channel][kpi]['column']
+        for kpi in EVOLUTION_KPIS for channel in CHANNELS if kpi in plan['catalog'][channel]
+    ]
+    months, series = loader.get_client_series(client, columns)
+    # Même période que les KPIs pour les graphiques
+    months = np.asarray(months)
+    window = (months >= (start or '')) & (months <= (end or '9999-12'))
+    return {
+        'client': client,
+        'start': start,
+        'end': end,
+        'kpis': kpis,
+        'financial': financial,
+        'months': months[window].tolist(),
+        'series': {column: values[window] for column, values in series.items()},
+    }
+
+def _tiles_html(values: pd.Series, kpis: dict) -> str:
+    """Tuiles des KPIs d'un canal (équivalent statique de display_kpis_grid)."""
+    tiles = [
+        f'<div class="tile"><div class="label">{html.escape(name)}</div>'
+        f'<div class="value">{html.escape(format_metric(values[definition["column"]], definition["unit"]))}</div></div>'
+        for name, definition in kpis.items()
+    ]
+    return f'<div class="tiles">{"".join(tiles)}</div>'
+
+def _evolution_html(report: dict, plan: dict) -> str:
+    """Graphiques d'évolution statiques, un par KPI de EVOLUTION_KPIS."""
+    figures = []
+    for kpi in EVOLUTION_KPIS:
+        traces = {}
+        for channel in CHANNELS:
+            definition = plan['catalog'][channel].get(kpi)
+            if definition and definition['column'] in report['series']:
+                facteur, _ = UNIT_SCALES.get(definition['unit'], (1, ''))
+                traces[channel] = report['series'][definition['column']] * facteur
+        if not traces or not report['months']:
+            continue
+        fig = build_evolution_figure(report['months'], traces)
+        fig.update_layout(title=f"Évolution : {kpi}", height=420)
+        figures.append(fig.to_html(full_html=False, include_plotlyjs=False, config=STATIC_CONFIG))
+    return "\n".join(figures)
+
+def render_client_report(report: dict, plan: dict) -> str:
+    """
+    Rapport HTML autonome d'un client : tuiles de KPIs par canal, métriques
+    financières et graphiques d'évolution statiques.
+
+    plotly.js n'est pas embarqué : il est lu dans PLOTLY_JS, à côté du rapport.
+    """
+    financial = report['financial']
+    periode = f"{report['start'] or 'début'} → {report['end'] or 'fin'}"
+    sections = [
+        f"<h1>📊 {html.escape(report['client'])}</h1>",
+        f"<p>Période : {html.escape(periode)}</p>",
+    ]
+    for channel, kpis in plan['catalog'].items():
+        if kpis:
+            sections.append(f"<h2>{html.escape(CHANNELS[channel]['title'])}</h2>")
+            sections.append(_tiles_html(report['kpis'], kpis))
+    sections.append("<h2>💰 Métriques Financières</h2>")
+    sections.append(
+        f"<p>Budget publicitaire : {format_currency(financial['budget_total'])} — "
+        f"coût par contact : {format_currency(financial['cout_contact_global'])}</p>"
+    )
+    sections.append(financial['produits'].to_html(index=False, float_format=lambda v: f"{v:,.2f}", na_rep="—"))
+    sections.append("<h2>📈 Évolution des KPIs</h2>")
+    sections.append(_evolution_html(report, plan))
+    return (
+        "<!DOCTYPE html>\n<html lang=\"fr\"><head><meta charset=\"utf-8\">"
+        f"<title>Rapport {html.escape(report['client'])}</title>"
+        f"<style>{REPORT_STYLE}</style><script src=\"{PLOTLY_JS}\"></script></head>"
+        f"<body>{''.join(sections)}</body></html>\n"
+    )
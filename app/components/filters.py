@@ -2,6 +2,8 @@ import streamlit as st
 from typing import List, Optional, Tuple
 import pandas as pd
 import numpy as np
+from datetime import date
+from utils.data_loader import month_ordinals
 
 def create_filters(data: pd.DataFrame) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
@@ -28,9 +30,10 @@ def create_filters(data: pd.DataFrame) -> Tuple[Optional[str], Optional[str], Op
     
     # Filtre par date
     if 'date' in data.columns:
-        dates = pd.to_datetime(data['date'])
-        min_date = dates.min()
-        max_date = dates.max()
+        # Ordinaux entiers des mois : seules les valeurs distinctes sont analysées
+        ordinals = month_ordinals(data['date'])
+        min_date = date(ordinals.min() // 12, ordinals.min() % 12 + 1, 1)
+        max_date = date(ordinals.max() // 12, ordinals.max() % 12 + 1, 1)
         
         col1, col2 = st.sidebar.columns(2)
         
@@ -0,0 +1,400 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import os
+import tempfile
+from components.visualizations import (
+    display_canal_comparison,
+    compute_canal_comparison,
+    build_canal_comparison_figure,
+    build_evolution_figure,
+    build_correlation_heatmap,
+    format_delta,
+    format_metric,
+    CHART_WIDTH_PX,
+    UNIT_SCALES
+)
+from utils.data_loader import DataLoader, format_month_labels
+from utils.anomalies import get_metric_cube
+from utils.correlations import DRIVER_TARGETS, compute_correlations, driver_table
+from utils.budget_optimizer import AD_CHANNELS, fit_response_curves, recommendation_table
+from utils.derived_metrics import GMB_BUDGET_MENSUEL, ROW_COUNT, SITE_BUDGET_MENSUEL
+from utils.export import EXPORT_FILES, EXPORT_FORMATS, frame_chunks, loader_chunks, write_export
+from utils.forecasting import FORECAST_METHODS, FORECAST_SUMMARY, client_forecast, forecast_series
+from utils.metric_catalog import CHANNELS, comparison_metrics, plan_reductions, table_columns
+from utils.period_comparison import compare_periods, period_deltas
+from utils.segments import SegmentStore, segment_aggregates
+from utils.view_cache import state_filters
+
+@st.fragment(run_every=5)
+def data_version_watch(loader: DataLoader) -> None:
+    """Relance la page lorsque le loader a intégré de nouvelles données (vérifié toutes les 5 s)."""
+    if st.session_state.get('data_version') != loader.version:
+        st.rerun()
+
+@st.cache_resource(max_entries=64)
+def get_canal_comparison_figures(filter_state: tuple, _kpi_values: pd.Series, _plan: dict) -> dict:
+    """
+    Graphiques de comparaison de toutes les métriques pour un état de filtres.
+
+    Les valeurs viennent des agrégats du plan, déjà calculés pour les KPIs, et
+    les graphiques sont construits une fois : changer de métrique ne relit plus
+    les données.
+    """
+    comparisons = comparison_metrics(_plan)
+    comparison = compute_canal_comparison(_kpi_values, comparisons)
+    return {
+        metric: build_canal_comparison_figure(comparison, metric, definition['unit'])
+        for metric, definition in comparisons.items()
+    }
+
+@st.fragment
+def canal_comparison_section(kpi_values: pd.Series, plan: dict, filter_state: tuple) -> None:
+    """
+    Section « Comparaison des Canaux ».
+
+    Exécutée comme fragment : changer de métrique ne relance que cette section,
+    avec les agrégats et l'état des filtres (clé de cache) reçus en argument.
+    """
+    st.header("📊 Comparaison des Canaux")
+    figures = get_canal_comparison_figures(filter_state, kpi_values, plan)
+    metric = st.selectbox(
+        "Sélectionnez une métrique à comparer",
+        list(figures)
+    )
+    display_canal_comparison(figures[metric])
+
+@st.cache_resource(max_entries=len(FORECAST_METHODS))
+def get_forecasts(_loader: DataLoader, _plan: dict, version: int, method: str) -> dict:
+    """Prévisions de tous les clients et de toutes les métriques, une fois par version des données et par modèle."""
+    columns = [definition['column'] for metrics in _plan['catalog'].values() for definition in metrics.values()]
+    columns += [definition['column'] for definition in FORECAST_SUMMARY.values()]
+    return forecast_series(get_metric_cube(_loader, list(dict.fromkeys(columns))), method)
+
+@st.fragment
+def kpi_evolution_section(loader: DataLoader, plan: dict, client_search: str) -> None:
+    """
+    Section « Évolution des KPIs » pour un client.
+
+    Exécutée comme fragment : les sélections de canaux, de KPIs et de modèle de
+    prévision ne relancent que le graphique d'évolution.
+    """
+    st.header("📈 Évolution des KPIs")
+
+    # Sélection de plusieurs canaux pour le graphique d'évolution
+    canaux_evolution = st.multiselect(
+        "Sélectionnez un ou plusieurs canaux pour l'évolution",
+        list(CHANNELS),
+        default=["Site"]
+    )
+
+    # Sélection des KPIs à afficher (communs à tous les canaux sélectionnés)
+    catalogue = plan['catalog']
+    kpis_communs = set.intersection(*[set(catalogue[canal]) for canal in canaux_evolution]) if canaux_evolution else set()
+    kpis_selectionnes = st.multiselect(
+        "Sélectionnez les KPIs à afficher",
+        options=sorted(list(kpis_communs)),
+        default=list(kpis_communs)[:3] if kpis_communs else []
+    )
+
+    # Prévision du mois suivant, en pointillés dans le prolongement des courbes
+    modele = st.radio("Prévision", list(FORECAST_METHODS) + ["Aucune"], horizontal=True)
+    previsions = get_forecasts(loader, plan, loader.version, FORECAST_METHODS[modele]) if modele in FORECAST_METHODS else None
+
+    if kpis_selectionnes and canaux_evolution:
+        # Séries du client lues dans le cube (client × mois × métrique) du loader :
+        # simples vues, sans reconstruction ni tri du DataFrame
+        colonnes = [catalogue[canal][kpi]['column'] for canal in canaux_evolution for kpi in kpis_selectionnes]
+        mois, series = loader.get_client_series(client_search, colonnes)
+        prevues = client_forecast(previsions, client_search, colonnes) if previsions else {}
+        traces, traces_prevues = {}, {}
+        for canal in canaux_evolution:
+            for kpi in kpis_selectionnes:
+                definition = catalogue[canal][kpi]
+                if definition['column'] in series:
+                    # Mise à l'échelle selon l'unité du catalogue (taux en %, durées en minutes...)
+                    facteur, suffixe = UNIT_SCALES.get(definition['unit'], (1, ''))
+                    nom = f"{kpi} - {canal}{' ' + suffixe.strip() if suffixe else ''}"
+                    traces[nom] = series[definition['column']] * facteur
+                    if definition['column'] in prevues:
+                        traces_prevues[nom] = prevues[definition['column']] * facteur
+
+        # Historique trop long pour être affiché point par point : la période
+        # choisie est renvoyée en pleine résolution dès qu'elle tient dans le graphique
+        debut, fin = 0, len(mois)
+        if len(mois) > CHART_WIDTH_PX:
+            periode = st.select_slider(
+                "Période affichée",
+                options=mois,
+                value=(mois[0], mois[-1])
+            )
+            debut, fin = mois.index(periode[0]), mois.index(periode[1]) + 1
+
+        # Les prévisions prolongent la fin de l'historique
+        fig = build_evolution_figure(
+            mois[debut:fin],
+            {nom: valeurs[debut:fin] for nom, valeurs in traces.items()},
+            forecast_x=previsions['months'] if previsions else None,
+            forecasts=traces_prevues if fin == len(mois) else None
+        )
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': True})
+
+    if previsions and previsions['months']:
+        # Budget, contacts et coût par contact prévus, comparés au dernier mois connu
+        colonnes = [definition['column'] for definition in FORECAST_SUMMARY.values()]
+        prevues = client_forecast(previsions, client_search, colonnes)
+        _, historique = loader.get_client_series(client_search, colonnes)
+        st.subheader(f"🔮 Prévisions pour {format_month_labels(previsions['months'][:1])[0]}")
+        cols = st.columns(len(FORECAST_SUMMARY))
+        for col, (libelle, definition) in zip(cols, FORECAST_SUMMARY.items()):
+            if definition['column'] not in prevues:
+                continue
+            valeur = prevues[definition['column']][0]
+            dernier = historique[definition['column']][-1] if definition['column'] in historique else np.nan
+            with col:
+                st.metric(
+                    libelle,
+                    format_metric(valeur, definition['unit']),
+                    delta=format_delta(valeur, dernier, definition['unit']),
+                    delta_color="inverse" if definition['column'].startswith('cout') else "normal"
+                )
+
+@st.fragment
+def biggest_movers_section(layout: dict, plan: dict, filter_state: tuple, shift: int, channels: list) -> None:
+    """
+    Section « Plus fortes variations » : clients classés par variation d'une métrique.
+
+    Les deux périodes sont agrégées pour tous les clients en une passe sur la
+    disposition mensuelle (voir utils/period_comparison.py) ; changer de
+    métrique ne relance que cette section.
+    """
+    st.header("🚀 Plus fortes variations")
+    metriques = {
+        f"{nom} - {canal}": definition
+        for canal in channels
+        for nom, definition in plan['catalog'][canal].items()
+    }
+    libelle = st.selectbox("Métrique", list(metriques))
+    definition = metriques[libelle]
+
+    actuel, precedent, couverture = compare_periods(
+        layout, shift=shift, by_client=True, **plan_reductions(plan), **state_filters(filter_state)
+    )
+    if actuel.empty or not precedent[ROW_COUNT].any():
+        st.info("Aucune donnée sur la période de comparaison.")
+        return
+    if couverture < 1:
+        st.info(f"La période de comparaison n'est couverte qu'à {couverture:.0%} par l'historique : variations non comparables.")
+        return
+
+    facteur, suffixe = UNIT_SCALES.get(definition['unit'], (1, ''))
+    variations = period_deltas(actuel, precedent, definition['column'])
+    variations[['Actuel', 'Précédent', 'Variation']] *= facteur
+    movers = pd.concat([actuel[['Client', 'Activité', 'Localité']], variations], axis=1)
+    # Plus fortes variations absolues en tête ; le tableau reste triable
+    movers = movers.iloc[np.argsort(-np.abs(movers['Variation'].to_numpy()), kind='stable')]
+    valeur = st.column_config.NumberColumn(format=f"%.2f{suffixe}")
+    st.dataframe(
+        movers,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Actuel': valeur,
+            'Précédent': valeur,
+            'Variation': valeur,
+            'Variation %': st.column_config.NumberColumn(format="%+.1f%%"),
+        }
+    )
+
+@st.cache_resource(max_entries=1)
+def get_budget_curves(_loader: DataLoader, version: int) -> dict:
+    """Courbes contacts / budget de tous les clients, ajustées une fois par version des données."""
+    columns = [col for channel in AD_CHANNELS.values() for col in channel.values()]
+    return fit_response_curves(get_metric_cube(_loader, columns))
+
+@st.fragment
+def budget_allocation_section(loader: DataLoader, clients=None) -> None:
+    """
+    Section « Réallocation du budget » : où placer un budget supplémentaire.
+
+    Les courbes sont ajustées une fois par version des données ; changer le
+    montant ne relance que cette section et une allocation vectorisée.
+    """
+    st.header("🎯 Réallocation du budget")
+    montant = st.number_input(
+        "Budget supplémentaire par client (€ / mois)",
+        min_value=0.0,
+        value=1000.0,
+        step=100.0
+    )
+    st.caption(
+        f"Site ({SITE_BUDGET_MENSUEL} € / mois) et GMB ({GMB_BUDGET_MENSUEL} € / mois) sont des forfaits : "
+        f"le montant est réparti entre {' et '.join(AD_CHANNELS)} selon les rendements décroissants "
+        "observés pour chaque client."
+    )
+    recommandations = recommendation_table(get_budget_curves(loader, loader.version), montant, clients)
+    devise = st.column_config.NumberColumn(format="%.0f €")
+    st.dataframe(
+        recommandations,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            **{col: devise for col in recommandations.columns if col.startswith(('Budget', '+'))},
+            'Contacts supplémentaires': st.column_config.NumberColumn(format="%.1f"),
+            'Coût par contact supplémentaire': st.column_config.NumberColumn(format="%.2f €"),
+        }
+    )
+
+@st.cache_resource(max_entries=16)
+def get_correlations(filter_state: tuple, _loader: DataLoader) -> dict:
+    """Matrices de corrélation des lignes filtrées, calculées une fois par état de filtres (lignes lues à ce moment)."""
+    return compute_correlations(_loader.filter_data(**state_filters(filter_state)))
+
+@st.fragment
+def correlation_section(loader: DataLoader, filter_state: tuple) -> None:
+    """
+    Section « Corrélations et leviers » : métriques qui évoluent avec les contacts
+    et le coût par contact, sur les lignes client-mois filtrées.
+
+    Les matrices sont mises en cache par état de filtres (estimées sur un
+    échantillon pour les grandes sélections) ; changer de cible ou de méthode
+    ne relance que cette section.
+    """
+    st.header("🔗 Corrélations et leviers")
+    correlations = get_correlations(filter_state, loader)
+    if correlations['rows'] < 3:
+        st.info("Pas assez de lignes client-mois pour estimer des corrélations.")
+        return
+
+    col1, col2 = st.columns(2)
+    cible = col1.selectbox("Cible", list(DRIVER_TARGETS))
+    methode = col2.radio("Méthode", ["Spearman", "Pearson"], horizontal=True)
+    exclure = st.checkbox("Exclure les composantes de la cible", value=True)
+    if correlations['sampled'] < correlations['rows']:
+        st.caption(f"Estimé sur un échantillon de {correlations['sampled']:,} lignes sur {correlations['rows']:,}.")
+
+    leviers = driver_table(correlations, DRIVER_TARGETS[cible], exclude_inputs=exclure, limit=15)
+    st.dataframe(
+        leviers,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Spearman': st.column_config.NumberColumn(format="%.2f"),
+            'Pearson': st.column_config.NumberColumn(format="%.2f"),
+        }
+    )
+    with st.expander("Matrice de corrélation complète"):
+        st.plotly_chart(
+            build_correlation_heatmap(correlations[methode.lower()], f"Corrélations de {methode}"),
+            use_container_width=True
+        )
+
+@st.cache_resource
+def get_segment_store() -> SegmentStore:
+    """Définitions des segments, partagées par toutes les sessions."""
+    return SegmentStore()
+
+@st.fragment
+def segments_section(layout: dict, plan: dict, filter_state: tuple, channels: list) -> None:
+    """
+    Section « Comparaison de segments » : KPIs de segments enregistrés, côte à côte.
+
+    Tous les segments sont agrégés ensemble (produit de la matrice d'appartenance
+    par les sommes des clients, voir utils/segments.py) : comparer vingt segments
+    coûte autant qu'en comparer un. Les filtres de client, d'activité et de
+    localité de la barre latérale ne s'appliquent pas : chaque segment a les siens.
+    """
+    st.header("🧩 Comparaison de segments")
+    store = get_segment_store()
+    segments = store.load()
+
+    with st.expander("Créer ou supprimer un segment"):
+        nom = st.text_input("Nom du segment")
+        criteres = {
+            'clients': st.multiselect("Clients", sorted(layout['clients'])),
+            'activites': st.multiselect("Activités", sorted(set(layout['activites']))),
+            'localites': st.multiselect("Localités", sorted(set(layout['localites']))),
+        }
+        if st.button("Enregistrer le segment"):
+            try:
+                store.save({'name': nom, **criteres})
+                st.rerun()
+            except ValueError as e:
+                st.warning(str(e))
+        if segments:
+            a_supprimer = st.selectbox("Segment à supprimer", [segment['name'] for segment in segments])
+            if st.button("Supprimer le segment"):
+                store.delete(a_supprimer)
+                st.rerun()
+
+    if not segments:
+        st.info("Aucun segment enregistré : créez-en un pour comparer des groupes de clients.")
+        return
+
+    noms = st.multiselect(
+        "Segments comparés",
+        [segment['name'] for segment in segments],
+        default=[segment['name'] for segment in segments]
+    )
+    selection = [segment for segment in segments if segment['name'] in noms]
+    if not selection:
+        return
+
+    _, start, end, *_ = filter_state
+    resultats = segment_aggregates(layout, selection, start, end, **plan_reductions(plan))
+    tableau = pd.DataFrame({'Clients': resultats['Clients']}, index=resultats.index)
+    for libelle, definition in table_columns(plan, channels).items():
+        tableau[libelle] = [format_metric(value, definition['unit']) for value in resultats[definition['column']]]
+    st.dataframe(tableau, use_container_width=True)
+
+def _discard_exports() -> None:
+    """Supprime les fichiers des exports préparés pour des filtres ou un format précédents."""
+    for chemin in st.session_state.get('exports', {}).values():
+        try:
+            os.remove(chemin)
+        except OSError:
+            pass
+    st.session_state.exports = {}
+
+@st.fragment
+def export_section(loader: DataLoader, filter_state: tuple, client_rows: pd.DataFrame) -> None:
+    """
+    Section « Export » : données filtrées et tableau des clients en CSV ou Parquet.
+
+    Le fichier n'est écrit qu'à la demande, dans un fichier temporaire, par
+    tranches de lignes lues dans la sélection (positions ou requêtes paginées,
+    jamais une copie complète des données filtrées).
+    """
+    st.header("⬇️ Export")
+    choix = st.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+    export_format = EXPORT_FORMATS[choix]
+    extension, mime = EXPORT_FILES[export_format]
+    _, start, end, *_ = filter_state
+    sources = {
+        'donnees': ("Données filtrées", lambda: loader_chunks(loader, **state_filters(filter_state))),
+        'clients': ("Tableau des clients", lambda: frame_chunks(client_rows)),
+    }
+
+    # Un export préparé n'est valable que pour ses filtres et son format
+    cle = (filter_state, export_format)
+    if st.session_state.get('export_key') != cle:
+        _discard_exports()
+        st.session_state.export_key = cle
+
+    for col, (nom, (libelle, chunks)) in zip(st.columns(len(sources)), sources.items()):
+        with col:
+            if nom not in st.session_state.exports and st.button(f"Préparer : {libelle}", key=f"export_{nom}"):
+                with st.spinner("Export en cours..."), \
+                        tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as fichier:
+                    lignes = write_export(chunks(), fichier, export_format)
+                st.session_state.exports[nom] = fichier.name
+                st.caption(f"{lignes:,} ligne(s)")
+            if nom in st.session_state.exports:
+                with open(st.session_state.exports[nom], 'rb') as fichier:
+                    st.download_button(
+                        f"Télécharger : {libelle}",
+                        data=fichier,
+                        file_name=f"{nom}_{start}_{end}.{extension}",
+                        mime=mime,
+                        key=f"download_{nom}"
+                    )
@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from typing import Optional
+from utils.downsampling import lttb_indices
+from utils.computations import SCORE_COLUMNS
+from utils.metric_catalog import CHANNELS
+from utils.anomalies import ANOMALY_METRICS
+
+# Au-delà de ce nombre total de points, les traces passent en WebGL (Scattergl)
+WEBGL_POINT_THRESHOLD = 5000
+# Largeur de référence des graphiques : inutile d'envoyer plus d'un point par pixel
+CHART_WIDTH_PX = 1200
 
 def format_currency(value: float) -> str:
     """Formate une valeur en devise."""
@@ -17,49 +24,54 @@ def format_number(value: float) -> str:
     """Formate une valeur numérique en entier."""
     return f"{int(value):,}"  # Conversion en entier et formatage avec séparateurs de milliers
 
-def clean_numeric_value(value: str) -> float:
-    """Nettoie une valeur numérique en retirant les caractères spéciaux et en convertissant les virgules en points."""
-    if isinstance(value, (int, float)):
-        return float(value)
-    if isinstance(value, str):
-        # Remplace les espaces insécables et les espaces normaux
-        value = value.replace('\u202f', '').replace(' ', '')
-        # Remplace les virgules par des points
-        value = value.replace(',', '.')
-        try:
-            return float(value)
-        except ValueError:
-            print(f"Impossible de convertir la valeur: {value}")
-            return 0.0
-    return 0.0
-
-def safe_sum(data: pd.DataFrame, column: str) -> float:
-    """Calcule la somme d'une colonne en gérant les valeurs manquantes."""
-    if column not in data.columns:
-        print(f"Colonne {column} non trouvée dans les données")
-        return 0
-    try:
-        # Nettoie et convertit chaque valeur avant de faire la somme
-        return sum(clean_numeric_value(x) for x in data[column])
-    except Exception as e:
-        print(f"Erreur lors du calcul de la somme pour {column}: {str(e)}")
-        return 0
-
-def safe_mean(data: pd.DataFrame, column: str) -> float:
-    """Calcule la moyenne d'une colonne en gérant les valeurs manquantes."""
-    if column not in data.columns:
-        print(f"Colonne {column} non trouvée dans les données")
-        return 0
-    try:
-        # Nettoie et convertit chaque valeur avant de calculer la moyenne
-        values = [clean_numeric_value(x) for x in data[column]]
-        return sum(values) / len(values) if values else 0
-    except Exception as e:
-        print(f"Erreur lors du calcul de la moyenne pour {column}: {str(e)}")
-        return 0
-
-def display_kpis_grid(data: pd.DataFrame, kpis: dict, title: str) -> None:
-    """Affiche une grille de KPIs avec un nombre variable de colonnes."""
+# Formatage des valeurs selon l'unité déclarée dans le catalogue des métriques
+UNIT_FORMATS = {
+    'nombre': format_number,
+    'devise': format_currency,
+    'taux': lambda x: format_percentage(x * 100),
+    'duree': lambda x: f"{x / 60:.1f} min",
+    'position': lambda x: f"{x:.1f}",
+    'note_5': lambda x: f"{x:.1f}/5",
+    'note_10': lambda x: f"{x:.1f}/10",
+    'note_100': lambda x: f"{x:.1f}/100",
+}
+
+# Mise à l'échelle des séries et des comparaisons : (facteur, suffixe)
+UNIT_SCALES = {
+    'taux': (100, '%'),
+    'devise': (1, '€'),
+    'duree': (1 / 60, ' min'),
+}
+
+def format_metric(value: float, unit: str) -> str:
+    """Formate une valeur selon son unité (0 si la valeur manque)."""
+    return UNIT_FORMATS[unit](0 if pd.isna(value) else value)
+
+def format_delta(value: float, previous: float, unit: str) -> Optional[str]:
+    """
+    Variation par rapport à la période précédente, pour l'argument `delta` de st.metric.
+
+    Les taux varient en points, les autres unités en pourcentage de la valeur
+    précédente (None si elle est nulle ou manquante).
+    """
+    if pd.isna(value) or pd.isna(previous):
+        return None
+    if unit == 'taux':
+        return f"{(value - previous) * 100:+.2f} pt"
+    if previous == 0:
+        return None
+    return f"{(value - previous) / abs(previous) * 100:+.1f}%"
+
+def display_kpis_grid(values: pd.Series, kpis: dict, title: str, previous: Optional[pd.Series] = None) -> None:
+    """
+    Affiche une grille de KPIs avec un nombre variable de colonnes.
+
+    Args:
+        values: Agrégats du plan d'exécution (une valeur par colonne)
+        kpis: Définitions du catalogue (nom affiché → définition)
+        title: Titre de la grille
+        previous: Agrégats de la période de comparaison (variations affichées si fournis)
+    """
     st.subheader(title)
     
     # Calculer le nombre de KPIs
@@ -71,325 +83,52 @@ def display_kpis_grid(data: pd.DataFrame, kpis: dict, title: str) -> None:
     cols = st.columns(n_cols)
     
     # Afficher chaque KPI dans une colonne
-    for i, (kpi_name, kpi_data) in enumerate(kpis.items()):
-        col_idx = i % n_cols
-        with cols[col_idx]:
-            if isinstance(kpi_data, dict):
-                # Si c'est un KPI calculé
-                value = kpi_data['value'](data)
-                format_func = kpi_data.get('format', str)
-                st.metric(kpi_name, format_func(value))
-            else:
-                # Si c'est un KPI direct
-                value = safe_sum(data, kpi_name) if 'total' in kpi_name.lower() else safe_mean(data, kpi_name)
-                format_func = format_currency if 'budget' in kpi_name.lower() or 'cout' in kpi_name.lower() else format_number
-                st.metric(kpi_name, format_func(value))
-
-def display_site_kpis(data: pd.DataFrame) -> None:
-    """Affiche les KPIs du site internet."""
-    kpis = {
-        'Impressions': {
-            'value': lambda df: safe_sum(df, 'site_impressions'),
-            'format': format_number
-        },
-        'Visites': {
-            'value': lambda df: safe_sum(df, 'site_visites'),
-            'format': format_number
-        },
-        'CTR': {
-            'value': lambda df: (safe_sum(df, 'site_visites') / safe_sum(df, 'site_impressions') * 100) if safe_sum(df, 'site_impressions') > 0 else 0,
-            'format': format_percentage
-        },
-        'Taux de Rebond': {
-            'value': lambda df: safe_mean(df, 'site_taux_rebond') * 100,
-            'format': format_percentage
-        },
-        'Durée Moyenne': {
-            'value': lambda df: safe_mean(df, 'site_duree_moyenne') / 60,
-            'format': lambda x: f"{x:.1f} min"
-        },
-        'Position Moyenne': {
-            'value': lambda df: safe_mean(df, 'site_position_moyenne'),
-            'format': lambda x: f"{x:.1f}"
-        },
-        'Appels': {
-            'value': lambda df: safe_sum(df, 'site_nombre_appels'),
-            'format': format_number
-        },
-        'Formulaires': {
-            'value': lambda df: safe_sum(df, 'site_formulaires'),
-            'format': format_number
-        },
-        'Contacts': {
-            'value': lambda df: safe_sum(df, 'site_nombre_appels') + safe_sum(df, 'site_formulaires'),
-            'format': format_number
-        },
-        'Coût Contact': {
-            'value': lambda df: safe_mean(df, 'site_cout_contact'),
-            'format': format_currency
-        }
-    }
-    display_kpis_grid(data, kpis, "📱 Site Internet")
-
-def display_google_ads_kpis(data: pd.DataFrame) -> None:
-    """Affiche les KPIs de Google Ads."""
-    kpis = {
-        'Budget': {
-            'value': lambda df: safe_sum(df, 'google_ads_budget'),
-            'format': format_currency
-        },
-        'Impressions': {
-            'value': lambda df: safe_sum(df, 'google_ads_impressions'),
-            'format': format_number
-        },
-        'Clics': {
-            'value': lambda df: safe_sum(df, 'google_ads_clics'),
-            'format': format_number
-        },
-        'CTR': {
-            'value': lambda df: (safe_sum(df, 'google_ads_clics') / safe_sum(df, 'google_ads_impressions') * 100) if safe_sum(df, 'google_ads_impressions') > 0 else 0,
-            'format': format_percentage
-        },
-        'Taux de Conversion': {
-            'value': lambda df: (safe_sum(df, 'google_ads_contacts') / safe_sum(df, 'google_ads_clics') * 100) if safe_sum(df, 'google_ads_clics') > 0 else 0,
-            'format': format_percentage
-        },
-        'Appels': {
-            'value': lambda df: safe_sum(df, 'google_ads_appels'),
-            'format': format_number
-        },
-        'Formulaires': {
-            'value': lambda df: safe_sum(df, 'google_ads_formulaires'),
-            'format': format_number
-        },
-        'Contacts': {
-            'value': lambda df: safe_sum(df, 'google_ads_contacts'),
-            'format': format_number
-        },
-        'Coût Contact': {
-            'value': lambda df: safe_mean(df, 'google_ads_cout_contact'),
-            'format': format_currency
-        },
-        'Quality Score': {
-            'value': lambda df: safe_mean(df, 'google_ads_quality_score'),
-            'format': lambda x: f"{x:.1f}/100"
-        },
-        'Durée Moyenne': {
-            'value': lambda df: safe_mean(df, 'google_ads_durée_moyenne_visite') / 60,
-            'format': lambda x: f"{x:.1f} min"
-        },
-        'Taux de Rebond': {
-            'value': lambda df: safe_mean(df, 'google_ads_taux_de_rebond') * 100,
-            'format': format_percentage
-        }
-    }
-    display_kpis_grid(data, kpis, "🔍 Google Ads")
-
-def display_meta_ads_kpis(data: pd.DataFrame) -> None:
-    """Affiche les KPIs de Meta Ads."""
-    kpis = {
-        'Budget': {
-            'value': lambda df: safe_sum(df, 'meta_ads_budget'),
-            'format': format_currency
-        },
-        'Impressions': {
-            'value': lambda df: safe_sum(df, 'meta_ads_impressions'),
-            'format': format_number
-        },
-        'Clics': {
-            'value': lambda df: safe_sum(df, 'meta_ads_clics'),
-            'format': format_number
-        },
-        'CTR': {
-            'value': lambda df: (safe_sum(df, 'meta_ads_clics') / safe_sum(df, 'meta_ads_impressions') * 100) if safe_sum(df, 'meta_ads_impressions') > 0 else 0,
-            'format': format_percentage
-        },
-        'Taux de Conversion': {
-            'value': lambda df: (safe_sum(df, 'meta_ads_contacts') / safe_sum(df, 'meta_ads_clics') * 100) if safe_sum(df, 'meta_ads_clics') > 0 else 0,
-            'format': format_percentage
-        },
-        'Appels': {
-            'value': lambda df: safe_sum(df, 'meta_ads_appels'),
-            'format': format_number
-        },
-        'Formulaires': {
-            'value': lambda df: safe_sum(df, 'meta_ads_formulaires'),
-            'format': format_number
-        },
-        'Contacts': {
-            'value': lambda df: safe_sum(df, 'meta_ads_contacts'),
-            'format': format_number
-        },
-        'Coût Contact': {
-            'value': lambda df: safe_mean(df, 'meta_ads_cout_contact'),
-            'format': format_currency
-        },
-        'Relevance Score': {
-            'value': lambda df: safe_mean(df, 'meta_ads_relevance_score'),
-            'format': lambda x: f"{x:.1f}/10"
-        },
-        'Durée Moyenne': {
-            'value': lambda df: safe_mean(df, 'meta_ads_durée_moyenne_visite') / 60,
-            'format': lambda x: f"{x:.1f} min"
-        },
-        'Taux de Rebond': {
-            'value': lambda df: safe_mean(df, 'meta_ads_taux_de_rebond') * 100,
-            'format': format_percentage
-        },
-        'Taux d\'Interaction': {
-            'value': lambda df: safe_mean(df, 'meta_ads_taux_interaction') * 100,
-            'format': format_percentage
-        }
-    }
-    display_kpis_grid(data, kpis, "📘 Meta Ads")
-
-def display_gmb_kpis(data: pd.DataFrame) -> None:
-    """Affiche les KPIs de Google My Business."""
-    kpis = {
-        'Vues': {
-            'value': lambda df: safe_sum(df, 'gmb_impressions'),
-            'format': format_number
-        },
-        'Clics Site': {
-            'value': lambda df: safe_sum(df, 'gmb_clics_site'),
-            'format': format_number
-        },
-        'Itinéraires': {
-            'value': lambda df: safe_sum(df, 'gmb_demande_d_itineraire'),
-            'format': format_number
-        },
-        'Appels': {
-            'value': lambda df: safe_sum(df, 'gmb_appels'),
-            'format': format_number
-        },
-        'Réservations': {
-            'value': lambda df: safe_sum(df, 'gmb_reservations'),
-            'format': format_number
-        },
-        'Score Avis': {
-            'value': lambda df: safe_mean(df, 'gmb_score_avis'),
-            'format': lambda x: f"{x:.1f}/5"
-        },
-        'Nombre Avis': {
-            'value': lambda df: safe_sum(df, 'gmb_nombre_avis'),
-            'format': format_number
-        },
-        'Taux d\'Interaction': {
-            'value': lambda df: safe_mean(df, 'gmb_taux_d_interaction') * 100,
-            'format': format_percentage
-        },
-        'Taux d\'Appel': {
-            'value': lambda df: safe_mean(df, 'gmb_taux_d_appel') * 100,
-            'format': format_percentage
-        },
-        'Taux de Réservation': {
-            'value': lambda df: safe_mean(df, 'gmb_taux_de_reservation') * 100,
-            'format': format_percentage
-        },
-        'Vues Meta Mobile': {
-            'value': lambda df: safe_sum(df, 'gmb_vues_meta_adsps_mobile'),
-            'format': format_number
-        },
-        'Vues Meta Desktop': {
-            'value': lambda df: safe_sum(df, 'gmb_vues_meta_adsps_desktop'),
-            'format': format_number
-        },
-        'Vues Google Mobile': {
-            'value': lambda df: safe_sum(df, 'gmb_vues_recherche_google_mobile'),
-            'format': format_number
-        },
-        'Vues Google Desktop': {
-            'value': lambda df: safe_sum(df, 'gmb_vues_recherche_google_desktop'),
-            'format': format_number
-        }
-    }
-    display_kpis_grid(data, kpis, "📍 Google My Business")
-
-def display_canal_comparison(data: pd.DataFrame, metric: str) -> None:
-    """Affiche une comparaison des métriques entre les produits."""
-    metric_mapping = {
-        'impressions': {
-            'site': 'site_impressions',
-            'google_ads': 'google_ads_impressions',
-            'meta_ads': 'meta_ads_impressions',
-            'gmb': 'gmb_impressions'
-        },
-        'clics': {
-            'site': 'site_visites',
-            'google_ads': 'google_ads_clics',
-            'meta_ads': 'meta_ads_clics',
-            'gmb': 'gmb_clics_site'
-        },
-        'ctr': {
-            'site': ('site_visites', 'site_impressions'),  # (clics, impressions)
-            'google_ads': ('google_ads_clics', 'google_ads_impressions'),
-            'meta_ads': ('meta_ads_clics', 'meta_ads_impressions'),
-            'gmb': ('gmb_clics_site', 'gmb_impressions')
-        },
-        'taux_conversion': {
-            'site': ('site_contacts', 'site_visites'),  # (contacts, visites)
-            'google_ads': ('google_ads_contacts', 'google_ads_clics'),
-            'meta_ads': ('meta_ads_contacts', 'meta_ads_clics'),
-            'gmb': ('gmb_appels', 'gmb_impressions')
-        },
-        'cout_contact': {
-            'site': 'site_cout_contact',
-            'google_ads': 'google_ads_cout_contact',
-            'meta_ads': 'meta_ads_cout_contact',
-            'gmb': None
-        },
-        'appels': {
-            'site': 'site_nombre_appels',
-            'google_ads': 'google_ads_appels',
-            'meta_ads': 'meta_ads_appels',
-            'gmb': 'gmb_appels'
-        },
-        'formulaires': {
-            'site': 'site_formulaires',
-            'google_ads': 'google_ads_formulaires',
-            'meta_ads': 'meta_ads_formulaires',
-            'gmb': None
-        },
-        'contacts': {
-            'site': 'site_contacts',
-            'google_ads': 'google_ads_contacts',
-            'meta_ads': 'meta_ads_contacts',
-            'gmb': None
+    for i, (kpi_name, definition) in enumerate(kpis.items()):
+        with cols[i % n_cols]:
+            column, unit = definition['column'], definition['unit']
+            st.metric(
+                kpi_name,
+                format_metric(values[column], unit),
+                delta=format_delta(values[column], previous[column], unit) if previous is not None else None,
+                delta_color="inverse" if definition.get('inverse') else "normal"
+            )
+
+def display_channel_kpis(values: pd.Series, channel: str, plan: dict, previous: Optional[pd.Series] = None) -> None:
+    """Affiche les KPIs d'un canal (Site, Google Ads, Meta Ads, GMB) à partir des agrégats du plan."""
+    display_kpis_grid(values, plan['catalog'][channel], CHANNELS[channel]['title'], previous)
+
+def compute_canal_comparison(values: pd.Series, comparisons: dict) -> pd.DataFrame:
+    """
+    Met en forme les valeurs de toutes les métriques de comparaison.
+
+    Args:
+        values: Agrégats du plan d'exécution (déjà calculés pour les KPIs)
+        comparisons: Métriques de comparaison (voir metric_catalog.comparison_metrics)
+
+    Returns:
+        DataFrame indexé par métrique, avec une colonne par produit
+        (NaN lorsqu'un produit ne dispose pas de la métrique).
+    """
+    resultats = {}
+    for metric, comparison in comparisons.items():
+        facteur = UNIT_SCALES.get(comparison['unit'], (1, ''))[0]
+        resultats[metric] = {
+            channel: values[column] * facteur for channel, column in comparison['columns'].items()
         }
-    }
-    
-    if metric not in metric_mapping:
-        st.error(f"Métrique {metric} non supportée")
-        return
-    
-    # Préparation des données pour le graphique
-    product_data = []
-    for product, col_info in metric_mapping[metric].items():
-        if col_info is not None:
-            if metric in ['ctr', 'taux_conversion']:
-                # Pour les taux, on calcule le ratio global
-                clicks_col, impressions_col = col_info
-                clicks = safe_sum(data, clicks_col)
-                impressions = safe_sum(data, impressions_col)
-                value = (clicks / impressions * 100) if impressions > 0 else 0
-            elif metric in ['cout_contact', 'taux_rebond', 'duree_moyenne']:
-                # Pour ces métriques, on utilise la moyenne
-                value = safe_mean(data, col_info)
-            else:
-                # Pour les autres métriques, on utilise la somme
-                value = safe_sum(data, col_info)
-            product_data.append({
-                'Produit': product.replace('_', ' ').title(),
-                'Valeur': value
-            })
-    
-    if not product_data:
-        st.error("Aucune donnée disponible pour cette métrique")
-        return
-    
+    return pd.DataFrame.from_dict(resultats, orient='index').reindex(columns=list(CHANNELS))
+
+def build_canal_comparison_figure(comparison: pd.DataFrame, metric: str, unit: str):
+    """Construit le graphique de comparaison d'une métrique (None si aucune donnée)."""
+    product_data = comparison.loc[metric].dropna().rename_axis('Produit').reset_index(name='Valeur')
+    if product_data.empty:
+        return None
+
+    # Import différé : plotly.express n'est chargé qu'à la première utilisation
+    import plotly.express as px
+
     # Création du graphique
     fig = px.bar(
-        pd.DataFrame(product_data),
+        product_data,
         x='Produit',
         y='Valeur',
         title=f"Comparaison des {metric.replace('_', ' ').title()} par produit",
@@ -406,121 +145,105 @@ def display_canal_comparison(data: pd.DataFrame, metric: str) -> None:
     )
     
     # Ajout des valeurs sur les barres avec les unités appropriées
-    if metric in ['ctr', 'taux_conversion', 'taux_rebond']:
+    if unit == 'taux':
         fig.update_traces(texttemplate='%{y:.1f}%', textposition='outside')
-    elif metric in ['cout_contact']:
+    elif unit == 'devise':
         fig.update_traces(texttemplate='%{y:.2f}€', textposition='outside')
-    elif metric in ['duree_moyenne']:
+    elif unit == 'duree':
         fig.update_traces(texttemplate='%{y:.1f} min', textposition='outside')
     else:
         fig.update_traces(texttemplate='%{y:,.0f}', textposition='outside')
+    return fig
+
+def display_canal_comparison(figure) -> None:
+    """Affiche la comparaison d'une métrique entre les produits (graphique déjà construit)."""
+    if figure is None:
+        st.error("Aucune donnée disponible pour cette métrique")
+        return
     
     # Affichage du graphique
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figure, use_container_width=True)
+
+def display_anomaly_alerts(alerts: pd.DataFrame, month_label: str) -> None:
+    """
+    Affiche le panneau des alertes d'un mois (voir utils/anomalies.rank_alerts).
+
+    Args:
+        alerts: Alertes classées par score z absolu décroissant
+        month_label: Mois examiné, en toutes lettres
+    """
+    st.header("🚨 Alertes")
+    if alerts.empty:
+        st.success(f"Aucune variation anormale détectée en {month_label}.")
+        return
+
+    st.write(f"{len(alerts)} variation(s) anormale(s) en {month_label}, par rapport aux mois précédents :")
+    units = alerts['Métrique'].map(lambda label: ANOMALY_METRICS[label]['unit'])
+    st.dataframe(
+        pd.DataFrame({
+            'Client': alerts['Client'],
+            'Métrique': alerts['Métrique'],
+            'Sens': np.where(alerts['Score z'] > 0, "↑ Hausse", "↓ Baisse"),
+            'Valeur': [format_metric(v, unit) for v, unit in zip(alerts['Valeur'], units)],
+            'Référence': [format_metric(v, unit) for v, unit in zip(alerts['Référence'], units)],
+            'Score z': alerts['Score z'].round(1),
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+def build_correlation_heatmap(matrix: pd.DataFrame, title: str):
+    """Carte de chaleur d'une matrice de corrélation (échelle divergente de -1 à 1)."""
+    # Import différé de plotly.graph_objects
+    import plotly.graph_objects as go
 
-def display_performance_analysis(data: pd.DataFrame) -> None:
-    """Affiche l'analyse des performances par différents critères."""
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(),
+        x=list(matrix.columns),
+        y=list(matrix.index),
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        reversescale=True,
+        hovertemplate='%{y} / %{x} : %{z:.2f}<extra></extra>'
+    ))
+    fig.update_layout(
+        title=title,
+        title_x=0.5,
+        height=max(500, 14 * len(matrix)),
+        yaxis_autorange='reversed'
+    )
+    return fig
+
+def display_performance_analysis(performances: dict) -> None:
+    """Affiche l'analyse des performances par différents critères (voir utils.computations.compute_performance_analysis)."""
     st.header("📊 Analyse des Performances")
     
     # Création des onglets pour chaque type d'analyse
-    tab1, tab2, tab3 = st.tabs(["Clients", "Activités", "Localités"])
-    
-    with tab1:
-        st.subheader("Performance par Client")
-        # Préparation des données pour les clients
-        client_performance = data.groupby('Client').agg({
-            'site_score_site_pondéré': 'mean',
-            'google_ads_score_google_ads_pondéré': 'mean',
-            'meta_ads_score_meta_ads_pondéré': 'mean',
-            'gmb_score_gmb_pondéré': 'mean'
-        }).reset_index()
-        
-        # Calcul du score global moyen
-        client_performance['score_global'] = client_performance[[
-            'site_score_site_pondéré', 
-            'google_ads_score_google_ads_pondéré', 
-            'meta_ads_score_meta_ads_pondéré', 
-            'gmb_score_gmb_pondéré'
-        ]].mean(axis=1)
-        
-        # Tri par score global
-        client_performance = client_performance.sort_values('score_global', ascending=False)
-        
-        # Affichage du classement complet
-        st.write("Classement complet des clients par performance :")
-        for i, (_, row) in enumerate(client_performance.iterrows(), 1):
-            st.write(f"{i}. {row['Client']} - Score global : {row['score_global']:.2f}")
-            st.write(f"   - Site : {row['site_score_site_pondéré']:.2f}")
-            st.write(f"   - Google Ads : {row['google_ads_score_google_ads_pondéré']:.2f}")
-            st.write(f"   - Meta Ads : {row['meta_ads_score_meta_ads_pondéré']:.2f}")
-            st.write(f"   - GMB : {row['gmb_score_gmb_pondéré']:.2f}")
-            st.write("---")
-    
-    with tab2:
-        st.subheader("Performance par Activité")
-        # Préparation des données pour les activités
-        activity_performance = data.groupby('Activité').agg({
-            'site_score_site_pondéré': 'mean',
-            'google_ads_score_google_ads_pondéré': 'mean',
-            'meta_ads_score_meta_ads_pondéré': 'mean',
-            'gmb_score_gmb_pondéré': 'mean'
-        }).reset_index()
-        
-        # Calcul du score global moyen
-        activity_performance['score_global'] = activity_performance[[
-            'site_score_site_pondéré', 
-            'google_ads_score_google_ads_pondéré', 
-            'meta_ads_score_meta_ads_pondéré', 
-            'gmb_score_gmb_pondéré'
-        ]].mean(axis=1)
-        
-        # Tri par score global
-        activity_performance = activity_performance.sort_values('score_global', ascending=False)
-        
-        # Affichage du classement complet
-        st.write("Classement complet des activités par performance :")
-        for i, (_, row) in enumerate(activity_performance.iterrows(), 1):
-            st.write(f"{i}. {row['Activité']} - Score global : {row['score_global']:.2f}")
-            st.write(f"   - Site : {row['site_score_site_pondéré']:.2f}")
-            st.write(f"   - Google Ads : {row['google_ads_score_google_ads_pondéré']:.2f}")
-            st.write(f"   - Meta Ads : {row['meta_ads_score_meta_ads_pondéré']:.2f}")
-            st.write(f"   - GMB : {row['gmb_score_gmb_pondéré']:.2f}")
-            st.write("---")
+    onglets = st.tabs(["Clients", "Activités", "Localités"])
+    titres = {
+        'Client': ("Performance par Client", "clients"),
+        'Activité': ("Performance par Activité", "activités"),
+        'Localité': ("Performance par Localité", "localités")
+    }
     
-    with tab3:
-        st.subheader("Performance par Localité")
-        # Préparation des données pour les localités
-        locality_performance = data.groupby('Localité').agg({
-            'site_score_site_pondéré': 'mean',
-            'google_ads_score_google_ads_pondéré': 'mean',
-            'meta_ads_score_meta_ads_pondéré': 'mean',
-            'gmb_score_gmb_pondéré': 'mean'
-        }).reset_index()
-        
-        # Calcul du score global moyen
-        locality_performance['score_global'] = locality_performance[[
-            'site_score_site_pondéré', 
-            'google_ads_score_google_ads_pondéré', 
-            'meta_ads_score_meta_ads_pondéré', 
-            'gmb_score_gmb_pondéré'
-        ]].mean(axis=1)
-        
-        # Tri par score global
-        locality_performance = locality_performance.sort_values('score_global', ascending=False)
-        
-        # Affichage du classement complet
-        st.write("Classement complet des localités par performance :")
-        for i, (_, row) in enumerate(locality_performance.iterrows(), 1):
-            st.write(f"{i}. {row['Localité']} - Score global : {row['score_global']:.2f}")
-            st.write(f"   - Site : {row['site_score_site_pondéré']:.2f}")
-            st.write(f"   - Google Ads : {row['google_ads_score_google_ads_pondéré']:.2f}")
-            st.write(f"   - Meta Ads : {row['meta_ads_score_meta_ads_pondéré']:.2f}")
-            st.write(f"   - GMB : {row['gmb_score_gmb_pondéré']:.2f}")
-            st.write("---")
-
-def display_financial_metrics(data: pd.DataFrame) -> None:
-    """Affiche les métriques financières (coût par contact et ROI) par produit et global."""
+    for onglet, (dimension, (sous_titre, libelle)) in zip(onglets, titres.items()):
+        with onglet:
+            st.subheader(sous_titre)
+            # Affichage du classement complet
+            st.write(f"Classement complet des {libelle} par performance :")
+            for i, (_, row) in enumerate(performances[dimension].iterrows(), 1):
+                st.write(f"{i}. {row[dimension]} - Score global : {row['score_global']:.2f}")
+                for canal, colonne in SCORE_COLUMNS.items():
+                    st.write(f"   - {canal} : {row[colonne]:.2f}")
+                st.write("---")
+
+def display_financial_metrics(financial: dict) -> None:
+    """Affiche les métriques financières (voir utils.computations.compute_financial_metrics) par produit et global."""
     st.header("💰 Métriques Financières")
+
+    # Import différé : plotly.express n'est chargé qu'à la première utilisation
+    import plotly.express as px
     
     # Création des onglets pour chaque type d'analyse
     tab1, tab2, tab3 = st.tabs(["Par Produit", "Par Client", "Global"])
@@ -528,64 +251,10 @@ def display_financial_metrics(data: pd.DataFrame) -> None:
     with tab1:
         st.subheader("Coût par Contact et ROI par Produit")
         
-        # Calcul des métriques par produit
-        product_metrics = []
-        
-        # Site
-        site_budget = 249 * len(data['date'].unique())  # Budget total sur la période
-        site_contacts = safe_sum(data, 'site_contacts')
-        site_cpc = safe_mean(data, 'site_cout_contact')  # Utilisation directe du coût par contact du site
-        
-        # Google Ads
-        google_budget = safe_sum(data, 'google_ads_budget')
-        google_contacts = safe_sum(data, 'google_ads_contacts')
-        google_cpc = google_budget / google_contacts if google_contacts > 0 else 0
-        
-        # Meta Ads
-        meta_budget = safe_sum(data, 'meta_ads_budget')
-        meta_contacts = safe_sum(data, 'meta_ads_contacts')
-        meta_cpc = meta_budget / meta_contacts if meta_contacts > 0 else 0
-        
-        # GMB
-        gmb_budget = 99 * len(data['date'].unique())  # Budget mensuel de 99€
-        gmb_contacts = safe_sum(data, 'gmb_appels') + safe_sum(data, 'gmb_reservations')  # Somme des appels et réservations
-        gmb_cpc = gmb_budget / gmb_contacts if gmb_contacts > 0 else 0  # Coût par contact = budget total / nombre total de contacts
-        
-        # Ajout des métriques par produit
-        product_metrics.extend([
-            {
-                'Produit': 'Site',
-                'Budget': site_budget,
-                'Contacts': site_contacts,
-                'Coût par Contact': site_cpc
-            },
-            {
-                'Produit': 'Google Ads',
-                'Budget': google_budget,
-                'Contacts': google_contacts,
-                'Coût par Contact': google_cpc
-            },
-            {
-                'Produit': 'Meta Ads',
-                'Budget': meta_budget,
-                'Contacts': meta_contacts,
-                'Coût par Contact': meta_cpc
-            },
-            {
-                'Produit': 'GMB',
-                'Budget': gmb_budget,
-                'Contacts': gmb_contacts,
-                'Coût par Contact': gmb_cpc
-            }
-        ])
-        
-        # Création du DataFrame
-        df_metrics = pd.DataFrame(product_metrics)
-        
         # Affichage des métriques
         st.subheader("Coût par Contact")
         fig_cpc = px.bar(
-            df_metrics,
+            financial['produits'],
             x='Produit',
             y='Coût par Contact',
             title="Coût par Contact par Produit",
@@ -597,42 +266,10 @@ def display_financial_metrics(data: pd.DataFrame) -> None:
     with tab2:
         st.subheader("Coût par Contact par Client")
         
-        # Calcul des métriques par client
-        client_metrics = []
-        
-        for client in data['Client'].unique():
-            client_data = data[data['Client'] == client]
-            
-            # Calcul des métriques pour ce client
-            total_budget = (
-                safe_sum(client_data, 'google_ads_budget') +
-                safe_sum(client_data, 'meta_ads_budget')
-            )
-            
-            total_contacts = (
-                safe_sum(client_data, 'site_contacts') +
-                safe_sum(client_data, 'google_ads_contacts') +
-                safe_sum(client_data, 'meta_ads_contacts') +
-                safe_sum(client_data, 'gmb_appels')
-            )
-            
-            cpc = total_budget / total_contacts if total_contacts > 0 else 0
-            
-            client_metrics.append({
-                'Client': client,
-                'Budget': total_budget,
-                'Contacts': total_contacts,
-                'Coût par Contact': cpc
-            })
-        
-        # Création du DataFrame
-        df_client_metrics = pd.DataFrame(client_metrics)
-        df_client_metrics = df_client_metrics.sort_values('Coût par Contact', ascending=True)
-        
         # Affichage des métriques
         st.subheader("Coût par Contact")
         fig_cpc = px.bar(
-            df_client_metrics,
+            financial['clients'],
             x='Client',
             y='Coût par Contact',
             title="Coût par Contact par Client",
@@ -644,26 +281,74 @@ def display_financial_metrics(data: pd.DataFrame) -> None:
     with tab3:
         st.subheader("Métriques Financières Globales")
         
-        # Calcul des métriques globales
-        total_budget = (
-            safe_sum(data, 'google_ads_budget') +
-            safe_sum(data, 'meta_ads_budget')
-        )
-        
-        total_contacts = (
-            safe_sum(data, 'site_contacts') +
-            safe_sum(data, 'google_ads_contacts') +
-            safe_sum(data, 'meta_ads_contacts') +
-            safe_sum(data, 'gmb_appels')
-        )
-        
-        global_cpc = total_budget / total_contacts if total_contacts > 0 else 0
-        
         # Affichage des métriques globales
         col1, col2 = st.columns(2)
         
         with col1:
-            st.metric("Budget Total", format_currency(total_budget))
+            st.metric("Budget Total", format_currency(financial['budget_total']))
         
         with col2:
-            st.metric("Coût par Contact Global", format_currency(global_cpc)) 
\ No newline at end of file
+            st.metric("Coût par Contact Global", format_currency(financial['cout_contact_global']))
+
+def build_evolution_figure(x, traces: dict, max_points: int = CHART_WIDTH_PX,
+                           webgl_threshold: int = WEBGL_POINT_THRESHOLD,
+                           forecast_x: Optional[list] = None, forecasts: Optional[dict] = None):
+    """
+    Construit le graphique d'évolution des KPIs.
+
+    Les séries plus longues que `max_points` sont sous-échantillonnées (LTTB) et,
+    au-delà de `webgl_threshold` points au total, les traces utilisent Scattergl.
+
+    Args:
+        x: Libellés des périodes (axe des abscisses)
+        traces: Dictionnaire nom de la trace → valeurs (même longueur que x)
+        max_points: Nombre maximal de points par trace
+        webgl_threshold: Nombre total de points à partir duquel WebGL est utilisé
+        forecast_x: Libellés des mois prévus
+        forecasts: Dictionnaire nom de la trace → valeurs prévues, tracées en
+            pointillés dans le prolongement du dernier point de la trace
+    """
+    # Import différé de plotly.graph_objects
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
+    x = np.asarray(x)
+    downsample = len(x) > max_points
+    n_points = min(len(x), max_points) * len(traces)
+    trace_type = go.Scattergl if n_points > webgl_threshold else go.Scatter
+
+    forecasts = forecasts or {}
+    fig = go.Figure()
+    for i, (name, valeurs) in enumerate(traces.items()):
+        valeurs = np.asarray(valeurs)
+        indices = lttb_indices(valeurs, max_points) if downsample else slice(None)
+        couleur = qualitative.Plotly[i % len(qualitative.Plotly)]
+        fig.add_trace(trace_type(
+            x=x[indices],
+            y=valeurs[indices],
+            name=name,
+            legendgroup=name,
+            line={'color': couleur},
+            # Les marqueurs n'ont plus de sens quand les points se touchent
+            mode='lines' if downsample else 'lines+markers'
+        ))
+        if name in forecasts and len(x):
+            # Prolongement en pointillés depuis le dernier point observé
+            fig.add_trace(go.Scatter(
+                x=[x[-1], *forecast_x],
+                y=[valeurs[-1], *forecasts[name]],
+                name=f"{name} (prévision)",
+                legendgroup=name,
+                showlegend=False,
+                line={'color': couleur, 'dash': 'dash'},
+                mode='lines+markers'
+            ))
+    fig.update_layout(
+        title=f"Évolution des KPIs",
+        xaxis_title="Date",
+        yaxis_title="Valeur",
+        hovermode='x unified',
+        showlegend=True,
+        height=600
+    )
+    return fig
@@ -0,0 +1,50 @@
+"""
+Ingestion des nouvelles données mensuelles.
+
+Les enregistrements sont ajoutés au journal `data/data.changes.jsonl` (sans
+réécrire `data/data.json`) ; les dashboards en cours d'exécution les
+intègrent au fil de l'eau. La compaction réécrit périodiquement le snapshot.
+
+Usage :
+    python app/ingest.py append nouveaux_mois.jsonl
+    python app/ingest.py compact
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from utils.data_loader import DataLoader
+
+
+def read_records(path: Path) -> list:
+    """Lit des enregistrements depuis un fichier JSONL ou une liste JSON."""
+    text = path.read_text(encoding='utf-8')
+    if path.suffix == '.jsonl':
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    records = json.loads(text)
+    return records if isinstance(records, list) else [records]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", type=Path, default=Path("data/data.json"), help="Snapshot JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    append = commands.add_parser("append", help="Ajoute des enregistrements au journal")
+    append.add_argument("records", type=Path, help="Fichier .jsonl (un enregistrement par ligne) ou .json")
+    commands.add_parser("compact", help="Intègre le journal dans un nouveau snapshot")
+    args = parser.parse_args()
+
+    loader = DataLoader(json_path=args.json)
+    if args.command == "append":
+        records = read_records(args.records)
+        loader.append_records(records)
+        print(f"{len(records)} enregistrement(s) ajouté(s) à {loader.changes_path}")
+    else:
+        count = loader.compact()
+        print(f"{count} enregistrement(s) intégré(s) dans {loader.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,32 @@
+import os
 import streamlit as st
-import pandas as pd
-from utils.data_loader import DataLoader
+from utils.data_loader import DataLoader, format_month_labels
+from utils.data_watcher import DataWatcher
+from utils.instrumentation import session_memory, format_bytes
+from utils.metric_catalog import CHANNELS, compile_plan, plan_reductions, table_columns
 from components.visualizations import (
-    display_site_kpis,
-    display_google_ads_kpis,
-    display_meta_ads_kpis,
-    display_gmb_kpis,
-    display_canal_comparison,
-    format_number,
-    format_currency,
-    format_percentage,
-    clean_numeric_value,
+    display_channel_kpis,
+    format_metric,
     display_performance_analysis,
-    display_financial_metrics
+    display_financial_metrics,
+    display_anomaly_alerts
 )
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
-from utils.ai_analyzer import AIAnalyzer
+from components.sections import (
+    canal_comparison_section,
+    kpi_evolution_section,
+    biggest_movers_section,
+    budget_allocation_section,
+    segments_section,
+    correlation_section,
+    export_section,
+    data_version_watch
+)
+from utils.computations import compute_client_table, compute_view
+from utils.anomalies import ANOMALY_METRICS, detect_anomalies, get_metric_cube, rank_alerts
+from utils.derived_metrics import ROW_COUNT
+from utils.period_comparison import COMPARISON_MODES, compare_periods, comparison_shift, get_month_layout
+from utils.view_cache import ViewCache, UsageLog, CacheWarmer, make_filter_state, state_filters, warmup_states
+from datetime import datetime
 
 # Configuration de la page
 st.set_page_config(
@@ -25,25 +35,90 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialisation de l'analyseur IA
-ai_analyzer = AIAnalyzer()
+# Analyseur IA partagé par tout le processus, construit à la première analyse
+@st.cache_resource
+def get_ai_analyzer():
+    from utils.ai_analyzer import AIAnalyzer
+    return AIAnalyzer()
 
 # Titre de l'application
 st.title("📊 Dashboard Marketing")
 
-# Chargement des données
-@st.cache_data
-def load_data():
-    loader = DataLoader()
-    return loader.get_data()
+# Chargement des données : un seul loader par processus, partagé par les sessions.
+# DASHBOARD_BACKEND=sqlite exécute filtres et agrégats en SQL au lieu de garder
+# tout l'historique en mémoire ; DASHBOARD_BACKEND=shared lit sans copie le jeu
+# de données publié en mémoire partagée pour plusieurs processus.
+# DASHBOARD_COMPACT=1 garde le DataFrame en cache en types compacts (catégorielles, float32).
+@st.cache_resource
+def get_loader():
+    loader = DataLoader(backend=os.getenv('DASHBOARD_BACKEND', 'pandas'), compact=os.getenv('DASHBOARD_COMPACT') == '1')
+    if loader.backend == 'shared':
+        # Données publiées par app/shared_publisher.py, qui suit lui-même les fichiers
+        loader.get_data()
+        return loader
+    if loader.backend == 'pandas':
+        loader.get_data()
+        loader.get_time_series()
+    else:
+        loader.get_store()
+    # Surveillance de data.json et du journal : seuls les clients modifiés sont rechargés
+    DataWatcher(loader).start()
+    return loader
+
+# Plan d'exécution du catalogue de métriques : validé une fois contre le schéma
+# chargé, puis partagé par les KPIs, la comparaison des canaux et le tableau
+@st.cache_resource
+def get_metric_plan(_loader, version):
+    return compile_plan(_loader.get_metric_columns())
+
+# Résultats des vues (KPIs, métriques financières, performances) partagés par les sessions
+@st.cache_resource
+def get_view_cache():
+    return ViewCache()
+
+# Journal des clients consultés, pour préchauffer les vues les plus demandées
+@st.cache_resource
+def get_usage_log():
+    return UsageLog()
+
+# Préchauffage en arrière-plan, relancé à chaque nouvelle version des données :
+# vue par défaut, clients les plus consultés (DASHBOARD_WARMUP_TOP_CLIENTS, 5 par
+# défaut) et états listés dans data/warmup.json
+@st.cache_resource(max_entries=1)
+def get_cache_warmer(_loader, _plan, version):
+    clients = set(_loader.get_clients())
+    top_clients = [
+        client for client in get_usage_log().top_clients(int(os.getenv('DASHBOARD_WARMUP_TOP_CLIENTS', '5')))
+        if client in clients
+    ]
+    states = warmup_states(version, _loader.get_dimension_values('date'), top_clients, 'data/warmup.json')
+    return CacheWarmer(get_view_cache(), lambda state: compute_view(_loader, _plan, state), states).start()
+
+# Disposition mensuelle cumulée des réductions du plan, pour les comparaisons de périodes
+@st.cache_resource(max_entries=1)
+def get_period_layout(_loader, _plan, version):
+    return get_month_layout(_loader, **plan_reductions(_plan))
 
-data = load_data()
+# Scores z robustes de tous les clients et de toutes les métriques surveillées,
+# calculés une fois par version des données
+@st.cache_resource(max_entries=1)
+def get_anomalies(_loader, version):
+    return detect_anomalies(get_metric_cube(_loader, [d['column'] for d in ANOMALY_METRICS.values()]))
+
+loader = get_loader()
+# Intégration des enregistrements ajoutés au journal depuis la dernière exécution
+loader.refresh()
+plan = get_metric_plan(loader, loader.version)
+warmer = get_cache_warmer(loader, plan, loader.version)
+# Les sessions ouvertes se relancent d'elles-mêmes quand les données changent
+st.session_state.data_version = loader.version
+data_version_watch(loader)
 
 # Filtres
 st.sidebar.header("Filtres")
 
 # Filtre par date
-dates_disponibles = sorted(data['date'].unique().tolist())
+dates_disponibles = loader.get_dimension_values('date')
 date_debut = st.sidebar.date_input(
     "Date de début",
     value=datetime.strptime(dates_disponibles[0], '%Y-%m').date(),
@@ -62,7 +137,7 @@ date_debut_str = date_debut.strftime('%Y-%m')
 date_fin_str = date_fin.strftime('%Y-%m')
 
 # Liste des clients pour l'autocomplétion
-liste_clients = sorted(data['Client'].unique().tolist())
+liste_clients = loader.get_clients()
 
 # Barre de recherche de client avec autocomplétion
 client_search = st.sidebar.selectbox(
@@ -71,35 +146,48 @@ client_search = st.sidebar.selectbox(
     format_func=lambda x: x if x else "Tous les clients"
 )
 
-# Filtrage des données si un client est sélectionné
-if client_search:
-    data = data[data['Client'] == client_search]
+# Restriction au client sélectionné
+client_filtre = client_search if client_search else None
+
+# Consultation enregistrée une fois par sélection de client
+if client_search and st.session_state.get('logged_client') != client_search:
+    get_usage_log().record(client_search)
+st.session_state.logged_client = client_search
 
 # Filtre par activité
-activites = ["Tous"] + sorted(data['Activité'].unique().tolist())
+activites = ["Tous"] + loader.get_dimension_values('Activité', client=client_filtre)
 activite_selectionnee = st.sidebar.selectbox("Activité", activites)
 
 # Filtre par localité
-localites = ["Tous"] + sorted(data['Localité'].unique().tolist())
+localites = ["Tous"] + loader.get_dimension_values('Localité', client=client_filtre)
 localite_selectionnee = st.sidebar.selectbox("Localité", localites)
 
 # Filtre par canal
-canaux = ["Tous", "Site", "Google Ads", "Meta Ads", "GMB"]
+canaux = ["Tous"] + list(CHANNELS)
 canal_selectionne = st.sidebar.selectbox("Canal", canaux)
 
-# Application des filtres
-data_filtree = data.copy()
+# Période de comparaison des KPIs (variations)
+mode_comparaison = st.sidebar.selectbox("Comparer à", list(COMPARISON_MODES))
+decalage = comparison_shift(COMPARISON_MODES[mode_comparaison], date_debut_str, date_fin_str)
+
+# État des filtres (et version des données) : clé des calculs mis en cache pour cette sélection
+filter_state = make_filter_state(loader.version, date_debut_str, date_fin_str, client_search, activite_selectionnee, localite_selectionnee)
 
-# Filtre par date pour les KPIs
-data_filtree = data_filtree[
-    (data_filtree['date'] >= date_debut_str) & 
-    (data_filtree['date'] <= date_fin_str)
-]
+# KPIs (toutes les réductions du catalogue en une passe), métriques financières et
+# performances : calculés une fois par état de filtres, souvent déjà préchauffés
+vue = get_view_cache().get_or_compute(filter_state, lambda: compute_view(loader, plan, filter_state))
+kpi_values = vue['kpis']
 
-if activite_selectionnee != "Tous":
-    data_filtree = data_filtree[data_filtree['Activité'] == activite_selectionnee]
-if localite_selectionnee != "Tous":
-    data_filtree = data_filtree[data_filtree['Localité'] == localite_selectionnee]
+# Période courante et période de comparaison agrégées ensemble, en une passe
+kpi_courants, kpi_precedents = kpi_values, None
+layout = get_period_layout(loader, plan, loader.version)
+if decalage:
+    courant, precedent, couverture = compare_periods(layout, shift=decalage, **plan_reductions(plan), **state_filters(filter_state))
+    kpi_courants = courant.iloc[0]
+    # Pas de variation si la période de comparaison sort, même en partie, de l'historique
+    kpi_precedents = precedent.iloc[0] if couverture == 1 and precedent[ROW_COUNT].iloc[0] > 0 else None
+    if 0 < couverture < 1:
+        st.sidebar.caption(f"Période de comparaison couverte à {couverture:.0%} par l'historique : variations masquées.")
 
 # Section d'analyse IA
 st.header("🤖 Analyse IA")
@@ -123,8 +211,8 @@ if st.button("Lancer l'analyse", type="primary"):
     if user_query:
         with st.spinner("Analyse en cours..."):
             # Utiliser les données complètes si aucun client n'est sélectionné
-            data_to_analyze = data if not client_search else data_filtree
-            analysis = ai_analyzer.analyze_data(data_to_analyze, user_query)
+            data_to_analyze = loader.get_data() if not client_search else loader.filter_data(**state_filters(filter_state))
+            analysis = get_ai_analyzer().analyze_data(data_to_analyze, user_query)
             # Stocker l'analyse et la question dans la session
             st.session_state.last_analysis = analysis
             st.session_state.last_query = user_query
@@ -137,339 +225,93 @@ elif st.session_state.last_analysis:
     st.write(st.session_state.last_analysis)
 
 # Affichage des KPIs
-display_site_kpis(data_filtree)
-display_google_ads_kpis(data_filtree)
-display_meta_ads_kpis(data_filtree)
-display_gmb_kpis(data_filtree)
+for canal in CHANNELS:
+    display_channel_kpis(kpi_courants, canal, plan, kpi_precedents)
+
+# Clients retenus par les filtres (tous si aucun filtre de client, d'activité ou de localité)
+filtres_clients = client_filtre or activite_selectionnee != "Tous" or localite_selectionnee != "Tous"
+clients_filtres = loader.get_dimension_values('Client', **state_filters(filter_state)) if filtres_clients else None
+
+# Alertes du dernier mois de la période, restreintes aux clients filtrés
+alertes = rank_alerts(get_anomalies(loader, loader.version), date_fin_str, clients=clients_filtres)
+display_anomaly_alerts(alertes, format_month_labels([date_fin_str])[0])
 
 # Affichage des métriques financières
-display_financial_metrics(data_filtree)
+display_financial_metrics(vue['financial'])
+
+# Répartition d'un budget supplémentaire entre Google Ads et Meta Ads
+budget_allocation_section(loader, clients_filtres)
 
 # Affichage de l'analyse de performance
-display_performance_analysis(data_filtree)
+display_performance_analysis(vue['performance'])
 
-# Comparaison des canaux
+# Comparaison des canaux et évolution des KPIs : fragments relancés seuls
+# lorsque leurs propres widgets changent
 if canal_selectionne == "Tous":
-    st.header("📊 Comparaison des Canaux")
-    metric = st.selectbox(
-        "Sélectionnez une métrique à comparer",
-        ["impressions", "clics", "ctr", "taux_conversion", "cout_contact", "appels", "formulaires", "contacts"]
-    )
-    display_canal_comparison(data_filtree, metric)
+    canal_comparison_section(kpi_values, plan, filter_state)
 
     # Graphique d'évolution des KPIs uniquement si un client est sélectionné
     if client_search:
-        st.header("📈 Évolution des KPIs")
-        
-        # Sélection de plusieurs canaux pour le graphique d'évolution
-        canaux_evolution = st.multiselect(
-            "Sélectionnez un ou plusieurs canaux pour l'évolution",
-            ["Site", "Google Ads", "Meta Ads", "GMB"],
-            default=["Site"]
-        )
-        
-        # Définition des KPIs disponibles par canal
-        kpis_disponibles = {
-            'Site': {
-                'Impressions': 'site_impressions',
-                'Visites': 'site_visites',
-                'CTR': 'site_ctr',
-                'Taux de Rebond': 'site_taux_rebond',
-                'Durée Moyenne': 'site_duree_moyenne',
-                'Position Moyenne': 'site_position_moyenne',
-                'Appels': 'site_nombre_appels',
-                'Formulaires': 'site_formulaires',
-                'Contacts': 'site_contacts',
-                'Coût Contact': 'site_cout_contact'
-            },
-            'Google Ads': {
-                'Budget': 'google_ads_budget',
-                'Impressions': 'google_ads_impressions',
-                'Clics': 'google_ads_clics',
-                'CTR': 'google_ads_ctr',
-                'Taux de Conversion': 'google_ads_taux_conversion',
-                'Appels': 'google_ads_appels',
-                'Formulaires': 'google_ads_formulaires',
-                'Contacts': 'google_ads_contacts',
-                'Coût Contact': 'google_ads_cout_contact',
-                'Quality Score': 'google_ads_quality_score'
-            },
-            'Meta Ads': {
-                'Budget': 'meta_ads_budget',
-                'Impressions': 'meta_ads_impressions',
-                'Clics': 'meta_ads_clics',
-                'CTR': 'meta_ads_ctr',
-                'Taux de Conversion': 'meta_ads_taux_conversion',
-                'Appels': 'meta_ads_appels',
-                'Formulaires': 'meta_ads_formulaires',
-                'Contacts': 'meta_ads_contacts',
-                'Coût Contact': 'meta_ads_cout_contact',
-                'Relevance Score': 'meta_ads_relevance_score'
-            },
-            'GMB': {
-                'Vues': 'gmb_impressions',
-                'Clics': 'gmb_clics_site',
-                'Itinéraires': 'gmb_demande_d_itineraire',
-                'Appels': 'gmb_appels',
-                'Réservations': 'gmb_reservations',
-                'Score': 'gmb_score_avis',
-                'Nombre Avis': 'gmb_nombre_avis'
-            }
-        }
-        
-        # Sélection des KPIs à afficher (communs à tous les canaux sélectionnés)
-        kpis_communs = set.intersection(*[set(kpis_disponibles[canal].keys()) for canal in canaux_evolution]) if canaux_evolution else set()
-        kpis_selectionnes = st.multiselect(
-            "Sélectionnez les KPIs à afficher",
-            options=sorted(list(kpis_communs)),
-            default=list(kpis_communs)[:3] if kpis_communs else []
-        )
-        
-        if kpis_selectionnes and canaux_evolution:
-            # Filtrer les données pour le client sélectionné et créer une copie explicite
-            data_client = data[data['Client'] == client_search].loc[:].copy()
-            # Nettoyer les données
-            for col in data_client.columns:
-                if col not in ['Client', 'Activité', 'Localité', 'date']:
-                    data_client.loc[:, col] = pd.to_numeric(data_client[col], errors='coerce').fillna(0)
-            # Créer le graphique
-            fig = go.Figure()
-            # Trier les données par date
-            data_triee = data_client.sort_values('date')
-            for canal in canaux_evolution:
-                for kpi in kpis_selectionnes:
-                    colonne = kpis_disponibles[canal][kpi]
-                    if colonne in data_triee.columns:
-                        if 'ctr' in colonne or 'taux' in colonne or 'score' in colonne:
-                            valeurs = data_triee[colonne] * 100
-                            suffixe = '%'
-                        elif 'budget' in colonne or 'cout' in colonne:
-                            valeurs = data_triee[colonne]
-                            suffixe = '€'
-                        elif 'duree' in colonne:
-                            valeurs = data_triee[colonne] / 60
-                            suffixe = ' min'
-                        else:
-                            valeurs = data_triee[colonne]
-                            suffixe = ''
-                        fig.add_trace(go.Scatter(
-                            x=data_triee['date'],
-                            y=valeurs,
-                            name=f"{kpi} - {canal}{' ' + suffixe if suffixe else ''}",
-                            mode='lines+markers'
-                        ))
-            fig.update_layout(
-                title=f"Évolution des KPIs",
-                xaxis_title="Date",
-                yaxis_title="Valeur",
-                hovermode='x unified',
-                showlegend=True,
-                height=600
-            )
-            st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': True})
+        kpi_evolution_section(loader, plan, client_search)
     else:
         st.info("Veuillez sélectionner un client pour afficher l'évolution des KPIs.")
 
+# Clients classés par variation sur la période de comparaison
+if decalage and not client_search:
+    biggest_movers_section(
+        layout, plan, filter_state, decalage,
+        list(CHANNELS) if canal_selectionne == "Tous" else [canal_selectionne]
+    )
+
+# Métriques liées aux contacts et au coût par contact sur la sélection
+correlation_section(loader, filter_state)
+
+# Segments enregistrés, comparés sur la période sélectionnée
+segments_section(layout, plan, filter_state, list(CHANNELS) if canal_selectionne == "Tous" else [canal_selectionne])
+
 # Tableau des clients avec leurs KPIs
 st.header("👥 Tableau des Clients")
 
 # Préparation des données pour le tableau
-def prepare_client_data(df, canal_selectionne):
-    # Filtrer les données par date
-    df = df[(df['date'] >= date_debut_str) & (df['date'] <= date_fin_str)]
-    
-    # Nettoyer les données
-    for col in df.columns:
-        if col not in ['Client', 'Activité', 'Localité', 'date']:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
-    # Si un client est sélectionné, ne pas agréger les données
-    if client_search:
-        df_agg = df
-    else:
-        # Agréger les données par client
-        df_agg = df.groupby(['Client', 'Activité', 'Localité']).agg({
-            # Site
-            'site_impressions': 'sum',
-            'site_visites': 'sum',
-            'site_ctr': 'mean',
-            'site_taux_rebond': 'mean',
-            'site_duree_moyenne': 'mean',
-            'site_position_moyenne': 'mean',
-            'site_nombre_appels': 'sum',
-            'site_formulaires': 'sum',
-            'site_cout_contact': 'mean',
-            # Google Ads
-            'google_ads_budget': 'sum',
-            'google_ads_impressions': 'sum',
-            'google_ads_clics': 'sum',
-            'google_ads_ctr': 'mean',
-            'google_ads_taux_conversion': 'mean',
-            'google_ads_appels': 'sum',
-            'google_ads_formulaires': 'sum',
-            'google_ads_contacts': 'sum',
-            'google_ads_cout_contact': 'mean',
-            'google_ads_quality_score': 'mean',
-            'google_ads_durée_moyenne_visite': 'mean',
-            'google_ads_taux_de_rebond': 'mean',
-            # Meta Ads
-            'meta_ads_budget': 'sum',
-            'meta_ads_impressions': 'sum',
-            'meta_ads_clics': 'sum',
-            'meta_ads_ctr': 'mean',
-            'meta_ads_taux_conversion': 'mean',
-            'meta_ads_appels': 'sum',
-            'meta_ads_formulaires': 'sum',
-            'meta_ads_contacts': 'sum',
-            'meta_ads_cout_contact': 'mean',
-            'meta_ads_relevance_score': 'mean',
-            'meta_ads_durée_moyenne_visite': 'mean',
-            'meta_ads_taux_de_rebond': 'mean',
-            'meta_ads_taux_interaction': 'mean',
-            # GMB
-            'gmb_impressions': 'sum',
-            'gmb_clics_site': 'sum',
-            'gmb_demande_d_itineraire': 'sum',
-            'gmb_appels': 'sum',
-            'gmb_reservations': 'sum',
-            'gmb_score_avis': 'mean',
-            'gmb_nombre_avis': 'sum',
-            'gmb_taux_d_interaction': 'mean',
-            'gmb_taux_d_appel': 'mean',
-            'gmb_taux_de_reservation': 'mean',
-            'gmb_vues_meta_adsps_mobile': 'sum',
-            'gmb_vues_meta_adsps_desktop': 'sum',
-            'gmb_vues_recherche_google_mobile': 'sum',
-            'gmb_vues_recherche_google_desktop': 'sum'
-        }).reset_index()
-    
-    # Remplacer les valeurs NaN par 0
-    df_agg = df_agg.fillna(0)
-    
-    client_data = []
-    
-    # Définition des colonnes par canal
-    colonnes_par_canal = {
-        'Site': [
-            'Client', 'Activité', 'Localité', 'date' if client_search else None,
-            'Impressions Site', 'Visites Site', 'CTR Site', 'Taux Rebond Site',
-            'Durée Moyenne Site', 'Position Moyenne Site', 'Appels Site', 'Formulaires Site',
-            'Contacts Site', 'Coût Contact Site', 'Taux Conversion Site'
-        ],
-        'Google Ads': [
-            'Client', 'Activité', 'Localité', 'date' if client_search else None,
-            'Budget Google', 'Impressions Google', 'Clics Google',
-            'CTR Google', 'Taux Conv Google', 'Appels Google',
-            'Formulaires Google', 'Contacts Google', 'Coût Contact Google',
-            'Quality Score Google', 'Durée Moyenne Google', 'Taux Rebond Google'
-        ],
-        'Meta Ads': [
-            'Client', 'Activité', 'Localité', 'date' if client_search else None,
-            'Budget Meta', 'Impressions Meta', 'Clics Meta',
-            'CTR Meta', 'Taux Conv Meta', 'Appels Meta',
-            'Formulaires Meta', 'Contacts Meta', 'Coût Contact Meta',
-            'Relevance Score Meta', 'Durée Moyenne Meta', 'Taux Rebond Meta',
-            'Taux Interaction Meta'
-        ],
-        'GMB': [
-            'Client', 'Activité', 'Localité', 'date' if client_search else None,
-            'Vues GMB', 'Clics GMB', 'Itinéraires GMB',
-            'Appels GMB', 'Réservations GMB', 'Score GMB',
-            'Nombre Avis GMB', 'Taux Interaction GMB', 'Taux Appel GMB',
-            'Taux Réservation GMB', 'Vues Meta Mobile', 'Vues Meta Desktop',
-            'Vues Google Mobile', 'Vues Google Desktop'
-        ]
-    }
-    
-    # Sélection des colonnes à afficher
-    if canal_selectionne == "Tous":
-        colonnes_a_afficher = None  # Afficher toutes les colonnes
-    else:
-        colonnes_a_afficher = [col for col in colonnes_par_canal[canal_selectionne] if col is not None]
-    
-    for _, row in df_agg.iterrows():
-        # Convertir la date en format lettré si un client est sélectionné
-        if client_search:
-            date_obj = datetime.strptime(row['date'], '%Y-%m')
-            date_formatted = date_obj.strftime('%B %Y').capitalize()
-        
-        # Calculer le taux de conversion pour le site
-        total_contacts = clean_numeric_value(row['site_nombre_appels']) + clean_numeric_value(row['site_formulaires'])
-        total_visits = clean_numeric_value(row['site_visites'])
-        taux_conversion = (total_contacts / total_visits * 100) if total_visits > 0 else 0
-        
-        # Calculer le CTR site
-        impressions = clean_numeric_value(row['site_impressions'])
-        clics = clean_numeric_value(row['site_visites'])
-        ctr_site = (clics / impressions * 100) if impressions > 0 else 0
-        
-        client = {
-            'Client': row['Client'],
-            'Activité': row['Activité'],
-            'Localité': row['Localité'],
-            'date': date_formatted if client_search else None,
-            # Site
-            'Impressions Site': format_number(impressions),
-            'Visites Site': format_number(clics),
-            'CTR Site': format_percentage(ctr_site),
-            'Taux Rebond Site': format_percentage(clean_numeric_value(row['site_taux_rebond']) * 100),
-            'Durée Moyenne Site': f"{clean_numeric_value(row['site_duree_moyenne'])/60:.1f} min",
-            'Position Moyenne Site': f"{clean_numeric_value(row['site_position_moyenne']):.1f}",
-            'Appels Site': format_number(clean_numeric_value(row['site_nombre_appels'])),
-            'Formulaires Site': format_number(clean_numeric_value(row['site_formulaires'])),
-            'Contacts Site': format_number(total_contacts),
-            'Coût Contact Site': format_currency(clean_numeric_value(row['site_cout_contact'])),
-            'Taux Conversion Site': format_percentage(taux_conversion),
-            # Google Ads
-            'Budget Google': format_currency(clean_numeric_value(row['google_ads_budget'])),
-            'Impressions Google': format_number(clean_numeric_value(row['google_ads_impressions'])),
-            'Clics Google': format_number(clean_numeric_value(row['google_ads_clics'])),
-            'CTR Google': format_percentage(clean_numeric_value(row['google_ads_ctr']) * 100),
-            'Taux Conv Google': format_percentage(clean_numeric_value(row['google_ads_taux_conversion']) * 100),
-            'Appels Google': format_number(clean_numeric_value(row['google_ads_appels'])),
-            'Formulaires Google': format_number(clean_numeric_value(row['google_ads_formulaires'])),
-            'Contacts Google': format_number(clean_numeric_value(row['google_ads_contacts'])),
-            'Coût Contact Google': format_currency(clean_numeric_value(row['google_ads_cout_contact'])),
-            'Quality Score Google': f"{clean_numeric_value(row['google_ads_quality_score']):.1f}/100",
-            'Durée Moyenne Google': f"{clean_numeric_value(row['google_ads_durée_moyenne_visite'])/60:.1f} min",
-            'Taux Rebond Google': format_percentage(clean_numeric_value(row['google_ads_taux_de_rebond']) * 100),
-            # Meta Ads
-            'Budget Meta': format_currency(clean_numeric_value(row['meta_ads_budget'])),
-            'Impressions Meta': format_number(clean_numeric_value(row['meta_ads_impressions'])),
-            'Clics Meta': format_number(clean_numeric_value(row['meta_ads_clics'])),
-            'CTR Meta': format_percentage(clean_numeric_value(row['meta_ads_ctr']) * 100),
-            'Taux Conv Meta': format_percentage(clean_numeric_value(row['meta_ads_taux_conversion']) * 100),
-            'Appels Meta': format_number(clean_numeric_value(row['meta_ads_appels'])),
-            'Formulaires Meta': format_number(clean_numeric_value(row['meta_ads_formulaires'])),
-            'Contacts Meta': format_number(clean_numeric_value(row['meta_ads_contacts'])),
-            'Coût Contact Meta': format_currency(clean_numeric_value(row['meta_ads_cout_contact'])),
-            'Relevance Score Meta': f"{clean_numeric_value(row['meta_ads_relevance_score']):.1f}/10",
-            'Durée Moyenne Meta': f"{clean_numeric_value(row['meta_ads_durée_moyenne_visite'])/60:.1f} min",
-            'Taux Rebond Meta': format_percentage(clean_numeric_value(row['meta_ads_taux_de_rebond']) * 100),
-            'Taux Interaction Meta': format_percentage(clean_numeric_value(row['meta_ads_taux_interaction']) * 100),
-            # GMB
-            'Vues GMB': format_number(clean_numeric_value(row['gmb_impressions'])),
-            'Clics GMB': format_number(clean_numeric_value(row['gmb_clics_site'])),
-            'Itinéraires GMB': format_number(clean_numeric_value(row['gmb_demande_d_itineraire'])),
-            'Appels GMB': format_number(clean_numeric_value(row['gmb_appels'])),
-            'Réservations GMB': format_number(clean_numeric_value(row['gmb_reservations'])),
-            'Score GMB': f"{clean_numeric_value(row['gmb_score_avis']):.1f}/5",
-            'Nombre Avis GMB': format_number(clean_numeric_value(row['gmb_nombre_avis'])),
-            'Taux Interaction GMB': format_percentage(clean_numeric_value(row['gmb_taux_d_interaction']) * 100),
-            'Taux Appel GMB': format_percentage(clean_numeric_value(row['gmb_taux_d_appel']) * 100),
-            'Taux Réservation GMB': format_percentage(clean_numeric_value(row['gmb_taux_de_reservation']) * 100),
-            'Vues Meta Mobile': format_number(clean_numeric_value(row['gmb_vues_meta_adsps_mobile'])),
-            'Vues Meta Desktop': format_number(clean_numeric_value(row['gmb_vues_meta_adsps_desktop'])),
-            'Vues Google Mobile': format_number(clean_numeric_value(row['gmb_vues_recherche_google_mobile'])),
-            'Vues Google Desktop': format_number(clean_numeric_value(row['gmb_vues_recherche_google_desktop']))
-        }
-        client_data.append(client)
-    
-    df_result = pd.DataFrame(client_data)
-    if colonnes_a_afficher:
-        df_result = df_result[colonnes_a_afficher]
+def prepare_client_data(client_rows):
+    """Valeurs du tableau des clients formatées selon les unités du catalogue."""
+    unites = {libelle: definition['unit'] for libelle, definition in table_columns(plan).items()}
+    df_result = client_rows.copy()
+    if 'date' in df_result:
+        # Date en format lettré pour le détail mensuel d'un client
+        df_result['date'] = format_month_labels(df_result['date'])
+    for libelle in df_result.columns.intersection(list(unites)):
+        df_result[libelle] = [format_metric(value, unites[libelle]) for value in df_result[libelle]]
     return df_result
 
 # Affichage du tableau
-client_table = prepare_client_data(data, canal_selectionne)
-st.dataframe(client_table, use_container_width=True) 
\ No newline at end of file
+client_rows = compute_client_table(loader, plan, filter_state, canal_selectionne)
+client_table = prepare_client_data(client_rows)
+st.dataframe(client_table, use_container_width=True)
+
+# Téléchargement des données filtrées et du tableau des clients
+export_section(loader, filter_state, client_rows)
+
+# Mémoire propre à cette session, hors jeu de données partagé par toutes les sessions
+memoire_session = session_memory(
+    {
+        'Tableau des clients': client_table,
+        'État de session': dict(st.session_state),
+    },
+    [loader.get_data()] if loader.backend != 'sqlite' else []
+)
+with st.sidebar.expander(f"🧮 Mémoire de la session : {format_bytes(memoire_session['total'])}"):
+    for nom, taille in memoire_session.items():
+        if nom != 'total':
+            st.write(f"{nom} : {format_bytes(taille)}")
+
+# Avancement du préchauffage et efficacité du cache des vues
+cache_vues = get_view_cache()
+with st.sidebar.expander(f"🔥 Préchauffage : {warmer.progress['done']}/{warmer.progress['total']} vue(s)"):
+    if warmer.progress['finished']:
+        st.write(f"Terminé en {warmer.progress['elapsed']:.1f} s")
+    else:
+        st.write(f"En cours ({warmer.progress['elapsed']:.1f} s)")
+    if warmer.progress['errors']:
+        st.write(f"Erreurs : {warmer.progress['errors']}")
+    st.write(f"Vues en cache : {len(cache_vues)} (succès : {cache_vues.hits}, calculs : {cache_vues.misses})") 
\ No newline at end of file
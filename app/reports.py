@@ -0,0 +1,123 @@
+"""
+Rapports HTML de fin de mois pour tous les clients, sans Streamlit.
+
+Les données sont chargées une seule fois puis publiées en mémoire partagée ;
+les processus du pool s'y rattachent sans copie, calculent chacun leurs
+rapports (mêmes calculs que le dashboard) et les écrivent au fil de l'eau dans
+le dossier de sortie. L'index `index.html` est écrit à la fin, avec le débit
+(rapports / seconde) affiché sur la sortie standard.
+
+Usage :
+    python app/reports.py
+    python app/reports.py --start 2025-05 --end 2025-05 --out reports/2025-05 --workers 4
+"""
+import argparse
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from components.client_report import PLOTLY_JS, compute_client_report, render_client_report, report_filename
+from utils.data_loader import DataLoader
+from utils.metric_catalog import compile_plan
+from utils.shared_store import SharedDataset
+
+# État de chaque processus du pool : loader rattaché au jeu partagé et plan compilé
+_worker = {}
+
+
+def _init_worker(shared_name: str, out: str, start, end) -> None:
+    loader = DataLoader(backend="shared", shared_name=shared_name)
+    loader.get_data()
+    _worker.update(loader=loader, plan=compile_plan(loader.get_metric_columns()), out=Path(out), start=start, end=end)
+
+
+def write_report(client: str, filename: str) -> tuple:
+    """Calcule et écrit le rapport d'un client (dans un processus du pool) ; renvoie (client, fichier, durée)."""
+    started = time.perf_counter()
+    report = compute_client_report(_worker['loader'], _worker['plan'], client, _worker['start'], _worker['end'])
+    path = _worker['out'] / filename
+    # Écriture atomique : un rapport présent dans le dossier est toujours complet
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(render_client_report(report, _worker['plan']), encoding='utf-8')
+    os.replace(tmp, path)
+    return client, filename, time.perf_counter() - started
+
+
+def write_index(out: Path, reports: list, title: str) -> None:
+    """Page d'index des rapports écrits, triés par client."""
+    links = "".join(
+        f'<li><a href="{html.escape(filename)}">{html.escape(client)}</a></li>'
+        for client, filename in sorted(reports)
+    )
+    (out / "index.html").write_text(
+        f"<!DOCTYPE html>\n<html lang=\"fr\"><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>"
+        f"<body><h1>{html.escape(title)}</h1><ul>{links}</ul></body></html>\n",
+        encoding='utf-8'
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", type=Path, default=Path("data/data.json"), help="Snapshot JSON")
+    parser.add_argument("--out", type=Path, default=Path("reports"), help="Dossier des rapports")
+    parser.add_argument("--start", help="Premier mois inclus (YYYY-MM), tout l'historique par défaut")
+    parser.add_argument("--end", help="Dernier mois inclus (YYYY-MM)")
+    parser.add_argument("--client", action="append", help="Client à inclure (répétable), tous par défaut")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processus du pool")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    loader = DataLoader(json_path=args.json)
+    clients = args.client or loader.get_clients()
+    args.out.mkdir(parents=True, exist_ok=True)
+    from plotly.offline import get_plotlyjs
+    (args.out / PLOTLY_JS).write_text(get_plotlyjs(), encoding='utf-8')
+
+    # Noms de fichiers attribués à l'avance : deux clients ne peuvent pas écrire le même
+    filenames, used = {}, set()
+    for client in clients:
+        filename = report_filename(client)
+        suffix = 1
+        while filename in used:
+            suffix += 1
+            filename = f"{report_filename(client)[:-5]}_{suffix}.html"
+        used.add(filename)
+        filenames[client] = filename
+
+    workers = max(1, min(args.workers, len(clients)))
+    shared = SharedDataset(f"reports_{os.getpid()}")
+    loader.publish_shared(shared)
+    written, failed = [], []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared.name, str(args.out), args.start, args.end)
+        ) as pool:
+            futures = {pool.submit(write_report, client, filenames[client]): client for client in clients}
+            for future in as_completed(futures):
+                try:
+                    client, filename, _ = future.result()
+                except Exception as e:
+                    failed.append(futures[future])
+                    print(f"Erreur pour {futures[future]} : {e}", file=sys.stderr)
+                    continue
+                written.append((client, filename))
+                print(f"[{len(written) + len(failed)}/{len(clients)}] {client} → {args.out / filename}")
+    finally:
+        shared.unlink()
+
+    periode = f"{args.start or 'début'} → {args.end or 'fin'}"
+    write_index(args.out, written, f"Rapports clients ({periode})")
+    elapsed = time.perf_counter() - started
+    print(f"{len(written)} rapport(s) en {elapsed:.1f} s ({len(written) / elapsed:.1f} rapports/s, {workers} processus)")
+    if failed:
+        print(f"{len(failed)} échec(s) : {', '.join(failed)}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
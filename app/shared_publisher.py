@@ -0,0 +1,55 @@
+"""
+Éditeur du jeu de données en mémoire partagée.
+
+Charge les données une seule fois, les publie en mémoire partagée puis suit
+`data/data.json` et son journal : chaque changement est republié sous une
+nouvelle version, que les workers Streamlit lancés avec
+`DASHBOARD_BACKEND=shared` rattachent sans copie.
+
+Usage :
+    python app/shared_publisher.py &
+    DASHBOARD_BACKEND=shared streamlit run app/main.py --server.port 8501
+    DASHBOARD_BACKEND=shared streamlit run app/main.py --server.port 8502
+"""
+import argparse
+import signal
+import sys
+import time
+from pathlib import Path
+
+from utils.data_loader import DataLoader
+from utils.data_watcher import DataWatcher
+from utils.shared_store import SharedDataset
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", type=Path, default=Path("data/data.json"), help="Snapshot JSON")
+    parser.add_argument("--name", default="dashboard", help="Nom du jeu de données partagé")
+    parser.add_argument("--interval", type=float, default=1.0, help="Période de vérification des changements (s)")
+    args = parser.parse_args()
+
+    loader = DataLoader(json_path=args.json)
+    shared = SharedDataset(args.name)
+    loader.publish_shared(shared)
+    published = loader.version
+    watcher = DataWatcher(loader).start()
+
+    # Arrêt propre : les segments sont supprimés (les workers gardent leur projection)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while True:
+            time.sleep(args.interval)
+            if loader.version != published:
+                loader.publish_shared(shared)
+                published = loader.version
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        watcher.stop()
+        shared.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,22 @@
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
 import pandas as pd
-
-# Chargement des variables d'environnement
-load_dotenv()
+from utils.channel_block import build_channel_block, channel_means, channel_ratio, channel_totals
+from utils.derived_metrics import derived_total
 
 class AIAnalyzer:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self._client = None
+
+    @property
+    def client(self):
+        """Client OpenAI, construit à la première analyse (import d'openai différé)."""
+        if self._client is None:
+            from dotenv import load_dotenv
+            from openai import OpenAI
+            # Chargement des variables d'environnement
+            load_dotenv()
+            self._client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._client
         
     def analyze_data(self, data: pd.DataFrame, query: str) -> str:
         """
@@ -81,84 +89,65 @@ class AIAnalyzer:
         
         # Statistiques par activité
         summary.append("\nStatistiques détaillées par activité :")
+        bloc = build_channel_block(data)
         for activite in sorted(data['Activité'].unique()):
             data_activite = data[data['Activité'] == activite]
-            total_contacts = (data_activite['site_contacts'].sum() + 
-                            data_activite['google_ads_contacts'].sum() + 
-                            data_activite['meta_ads_contacts'].sum() + 
-                            data_activite['gmb_appels'].sum() + 
-                            data_activite['gmb_reservations'].sum())
-            total_budget = (data_activite['google_ads_budget'].sum() + 
-                          data_activite['meta_ads_budget'].sum() + 
-                          (99 * len(data_activite['date'].unique())))
+            total_contacts = derived_total(data_activite, 'contacts_total')
+            total_budget = derived_total(data_activite, 'budget_total')
+            cout_contact = derived_total(data_activite, 'cout_contact_total')
             
             summary.append(f"\n{activite} :")
             summary.append(f"- Nombre de clients : {data_activite['Client'].nunique()}")
             summary.append(f"- Localités couvertes : {', '.join(sorted(data_activite['Localité'].unique()))}")
             summary.append(f"- Contacts totaux : {total_contacts:,.0f}")
             summary.append(f"- Budget total : {total_budget:,.2f}€")
-            summary.append(f"- Coût par contact : {(total_budget / total_contacts if total_contacts > 0 else 0):.2f}€")
+            summary.append(f"- Coût par contact : {cout_contact:.2f}€")
             
-            # Détail par canal pour cette activité
+            # Détail par canal pour cette activité : totaux (canal × métrique) du bloc aligné
             summary.append("  Détail par canal :")
-            # Site
-            site_contacts = data_activite['site_contacts'].sum()
-            site_cpc = data_activite['site_cout_contact'].mean()
-            summary.append(f"  - Site : {site_contacts:,.0f} contacts, coût moyen : {site_cpc:.2f}€")
-            # Google Ads
-            ga_contacts = data_activite['google_ads_contacts'].sum()
-            ga_budget = data_activite['google_ads_budget'].sum()
-            ga_cpc = ga_budget / ga_contacts if ga_contacts > 0 else 0
-            summary.append(f"  - Google Ads : {ga_contacts:,.0f} contacts, budget : {ga_budget:,.2f}€, coût par contact : {ga_cpc:.2f}€")
-            # Meta Ads
-            ma_contacts = data_activite['meta_ads_contacts'].sum()
-            ma_budget = data_activite['meta_ads_budget'].sum()
-            ma_cpc = ma_budget / ma_contacts if ma_contacts > 0 else 0
-            summary.append(f"  - Meta Ads : {ma_contacts:,.0f} contacts, budget : {ma_budget:,.2f}€, coût par contact : {ma_cpc:.2f}€")
-            # GMB
-            gmb_contacts = data_activite['gmb_appels'].sum() + data_activite['gmb_reservations'].sum()
-            gmb_budget = 99 * len(data_activite['date'].unique())
-            gmb_cpc = gmb_budget / gmb_contacts if gmb_contacts > 0 else 0
-            summary.append(f"  - GMB : {gmb_contacts:,.0f} contacts, budget : {gmb_budget:,.2f}€, coût par contact : {gmb_cpc:.2f}€")
+            rows = (data['Activité'] == activite).to_numpy()
+            totaux = channel_totals(bloc, rows)
+            couts = channel_ratio(totaux, 'budget', 'contacts')
+            for canal in bloc['channels']:
+                contacts = totaux.at[canal, 'contacts']
+                if canal == 'Site':
+                    # Budget forfaitaire : coût moyen des mois plutôt que ratio des sommes
+                    site_cpc = channel_means(bloc, rows).at[canal, 'cout_contact']
+                    summary.append(f"  - Site : {contacts:,.0f} contacts, coût moyen : {site_cpc:.2f}€")
+                else:
+                    summary.append(
+                        f"  - {canal} : {contacts:,.0f} contacts, budget : {totaux.at[canal, 'budget']:,.2f}€, "
+                        f"coût par contact : {couts[canal]:.2f}€"
+                    )
         
         # Statistiques par localité
         summary.append("\nStatistiques par localité :")
         for localite in sorted(data['Localité'].unique()):
             data_localite = data[data['Localité'] == localite]
-            total_contacts = (data_localite['site_contacts'].sum() + 
-                            data_localite['google_ads_contacts'].sum() + 
-                            data_localite['meta_ads_contacts'].sum() + 
-                            data_localite['gmb_appels'].sum() + 
-                            data_localite['gmb_reservations'].sum())
-            total_budget = (data_localite['google_ads_budget'].sum() + 
-                          data_localite['meta_ads_budget'].sum() + 
-                          (99 * len(data_localite['date'].unique())))
+            total_contacts = derived_total(data_localite, 'contacts_total')
+            total_budget = derived_total(data_localite, 'budget_total')
+            cout_contact = derived_total(data_localite, 'cout_contact_total')
             
             summary.append(f"\n{localite} :")
             summary.append(f"- Nombre de clients : {data_localite['Client'].nunique()}")
             summary.append(f"- Activités présentes : {', '.join(sorted(data_localite['Activité'].unique()))}")
             summary.append(f"- Contacts totaux : {total_contacts:,.0f}")
             summary.append(f"- Budget total : {total_budget:,.2f}€")
-            summary.append(f"- Coût par contact : {(total_budget / total_contacts if total_contacts > 0 else 0):.2f}€")
+            summary.append(f"- Coût par contact : {cout_contact:.2f}€")
         
         # Statistiques par client
         summary.append("\nTop 5 clients par nombre de contacts :")
         client_stats = []
         for client in data['Client'].unique():
             data_client = data[data['Client'] == client]
-            total_contacts = (data_client['site_contacts'].sum() + 
-                            data_client['google_ads_contacts'].sum() + 
-                            data_client['meta_ads_contacts'].sum() + 
-                            data_client['gmb_appels'].sum() + 
-                            data_client['gmb_reservations'].sum())
-            total_budget = (data_client['google_ads_budget'].sum() + 
-                          data_client['meta_ads_budget'].sum() + 
-                          (99 * len(data_client['date'].unique())))
+            total_contacts = derived_total(data_client, 'contacts_total')
+            total_budget = derived_total(data_client, 'budget_total')
+            cout_contact = derived_total(data_client, 'cout_contact_total')
             client_stats.append({
                 'client': client,
                 'contacts': total_contacts,
                 'budget': total_budget,
-                'cpc': total_budget / total_contacts if total_contacts > 0 else 0
+                'cpc': cout_contact
             })
         
         # Trier les clients par nombre de contacts
@@ -0,0 +1,196 @@
+import logging
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from utils.data_loader import DataLoader
+from utils.derived_metrics import DERIVED_METRICS, add_derived_metrics, base_columns
+
+logger = logging.getLogger(__name__)
+
+# Métriques surveillées : libellé de l'alerte → colonne mensuelle (chargée ou dérivée) et unité
+ANOMALY_METRICS = {
+    'Contacts': {'column': 'contacts_total', 'unit': 'nombre'},
+    'Coût par contact': {'column': 'cout_contact_total', 'unit': 'devise'},
+    'Contacts Site': {'column': 'site_contacts_total', 'unit': 'nombre'},
+    'CTR Site': {'column': 'site_ctr_global', 'unit': 'taux'},
+    'Contacts Google Ads': {'column': 'google_ads_contacts', 'unit': 'nombre'},
+    'Coût contact Google Ads': {'column': 'google_ads_cout_contact_global', 'unit': 'devise'},
+    'CTR Google Ads': {'column': 'google_ads_ctr_global', 'unit': 'taux'},
+    'Contacts Meta Ads': {'column': 'meta_ads_contacts', 'unit': 'nombre'},
+    'Coût contact Meta Ads': {'column': 'meta_ads_cout_contact_global', 'unit': 'devise'},
+    'CTR Meta Ads': {'column': 'meta_ads_ctr_global', 'unit': 'taux'},
+    'Contacts GMB': {'column': 'gmb_contacts', 'unit': 'nombre'},
+    'CTR GMB': {'column': 'gmb_ctr_global', 'unit': 'taux'},
+}
+
+# Fenêtre glissante des mois précédents servant de référence (une année : saisonnalité comprise)
+WINDOW = 12
+# Nombre minimal de mois renseignés dans la fenêtre
+MIN_PERIODS = 6
+# Seuil du score z robuste (Iglewicz et Hoaglin)
+THRESHOLD = 3.5
+# Facteur rendant la MAD comparable à un écart-type (loi normale)
+MAD_SCALE = 0.6745
+# Facteur rendant l'écart absolu moyen comparable à un écart-type (loi normale)
+MEAN_DEVIATION_SCALE = 1.2533
+# Écart-type de référence minimal, en part de la médiane : sur quelques mois
+# très réguliers, la MAD est minuscule et une variation ordinaire serait signalée.
+# Au seuil de 3.5, seule une variation d'au moins 87,5 % de la médiane est une alerte
+MIN_RELATIVE_SCALE = 0.25
+
+def _nanmedian(values: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Médiane selon le dernier axe des `n` valeurs non NaN (tri unique, sans boucle)."""
+    ordered = np.sort(values, axis=-1)
+    low = np.take_along_axis(ordered, np.maximum((n - 1) // 2, 0)[..., None], axis=-1)[..., 0]
+    high = np.take_along_axis(ordered, np.minimum(n // 2, values.shape[-1] - 1)[..., None], axis=-1)[..., 0]
+    return np.where(n > 0, (low + high) / 2, np.nan)
+
+def robust_zscores(values: np.ndarray, window: int = WINDOW, min_periods: int = MIN_PERIODS,
+                   min_relative_scale: float = MIN_RELATIVE_SCALE) -> tuple:
+    """
+    Scores z robustes glissants de séries mensuelles.
+
+    Chaque mois est comparé à la médiane des `window` mois précédents :
+    z = 0.6745 * (x - médiane) / MAD. Si la MAD est nulle (série constante),
+    l'écart absolu moyen (× 1.2533) la remplace. L'écart-type ainsi estimé vaut
+    au moins `min_relative_scale` × |médiane|. S'il est nul, ou si la fenêtre
+    compte moins de `min_periods` mois renseignés, le score est NaN.
+
+    Args:
+        values: Tableau (série × mois), NaN pour les mois absents
+
+    Returns:
+        Tuple (scores z, médianes de référence), de même forme que `values`
+    """
+    # Fenêtres des mois t - window .. t - 1 pour chaque mois t (NaN avant le début de l'historique)
+    padded = np.concatenate([np.full((values.shape[0], window), np.nan), values], axis=1)
+    windows = sliding_window_view(padded, window, axis=1)[:, :-1]
+    periods = np.sum(~np.isnan(windows), axis=-1)
+    median = _nanmedian(windows, periods)
+    deviations = np.abs(windows - median[..., None])
+    mad = _nanmedian(deviations, periods)
+    mean_deviation = np.nansum(deviations, axis=-1) / np.maximum(periods, 1)
+    scale = np.where(mad > 0, mad / MAD_SCALE, mean_deviation * MEAN_DEVIATION_SCALE)
+    scale = np.fmax(scale, min_relative_scale * np.abs(median))
+    enough = periods >= min_periods
+    valid = enough & (scale > 0) & ~np.isnan(values)
+    zscores = np.divide(values - median, scale, out=np.full(values.shape, np.nan), where=valid)
+    return zscores, np.where(enough, median, np.nan)
+
+def build_metric_cube(data: pd.DataFrame, columns: List[str]) -> dict:
+    """
+    Construit le tableau (client × mois × métrique) à partir de lignes client-mois.
+
+    Returns:
+        Dictionnaire clients, months (triés), metrics (colonne → indice) et cube
+        (NaN pour les mois absents d'un client et les valeurs manquantes)
+    """
+    columns = [col for col in columns if col in data.columns]
+    client_codes, clients = pd.factorize(data['Client'])
+    month_codes, months = pd.factorize(data['date'], sort=True)
+    cube = np.full((len(clients), len(months), len(columns)), np.nan)
+    cube[client_codes, month_codes, :] = data[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    return {
+        'clients': {client: i for i, client in enumerate(clients)},
+        'months': months.tolist(),
+        'metrics': {col: i for i, col in enumerate(columns)},
+        'cube': cube,
+    }
+
+def _denominator(column: str) -> Optional[str]:
+    """Dénominateur d'une métrique dérivée de type ratio (None pour les autres colonnes)."""
+    definition = DERIVED_METRICS.get(column, {})
+    return definition.get('denominator') if definition.get('aggregation') == 'ratio' else None
+
+def get_metric_cube(loader: DataLoader, columns: List[str]) -> dict:
+    """
+    Cube (client × mois × métrique) des colonnes données.
+
+    Avec les backends en mémoire, c'est le cube des séries du loader ; avec le
+    backend sqlite, seules les colonnes nécessaires sont lues de la base, avec
+    les dénominateurs des ratios (voir detect_anomalies).
+    """
+    if loader.backend == "sqlite":
+        columns = list(dict.fromkeys(list(columns) + [
+            _denominator(col) for col in columns if _denominator(col) is not None
+        ]))
+        data = add_derived_metrics(loader.get_store().filter(columns=base_columns(columns)))
+        return build_metric_cube(data, columns)
+    return loader.get_time_series()
+
+def detect_anomalies(series: dict, metrics: Optional[dict] = None, window: int = WINDOW,
+                     min_periods: int = MIN_PERIODS) -> dict:
+    """
+    Scores z robustes de toutes les métriques surveillées, pour tous les clients et tous les mois.
+
+    Le calcul est vectorisé sur les clients et les mois ; seules les métriques
+    (une douzaine) sont parcourues, ce qui borne la mémoire des fenêtres glissantes.
+
+    Args:
+        series: Cube (voir get_metric_cube / build_metric_cube)
+        metrics: Libellé → définition (ANOMALY_METRICS par défaut)
+
+    Returns:
+        Dictionnaire clients (noms), months, labels et tableaux (client × mois ×
+        métrique) values, medians et zscores
+    """
+    metrics = ANOMALY_METRICS if metrics is None else metrics
+    labels = [label for label, definition in metrics.items() if definition['column'] in series['metrics']]
+    missing = [label for label in metrics if label not in labels]
+    if missing:
+        logger.debug(f"Métriques d'anomalie ignorées (colonne absente) : {', '.join(missing)}")
+    shape = (len(series['clients']), len(series['months']), len(labels))
+    values, medians, zscores = np.empty(shape), np.empty(shape), np.empty(shape)
+    for i, label in enumerate(labels):
+        column = metrics[label]['column']
+        values[:, :, i] = series['cube'][:, :, series['metrics'][column]]
+        denominator = _denominator(column)
+        if denominator in series['metrics']:
+            # Ratio d'un mois sans dénominateur (aucun contact, aucune impression) : 0 par
+            # convention dans les agrégats, mais pas un effondrement de la métrique
+            values[:, :, i][~(series['cube'][:, :, series['metrics'][denominator]] > 0)] = np.nan
+        zscores[:, :, i], medians[:, :, i] = robust_zscores(values[:, :, i], window, min_periods)
+    return {
+        'clients': np.asarray(list(series['clients']), dtype=object),
+        'months': list(series['months']),
+        'labels': labels,
+        'values': values,
+        'medians': medians,
+        'zscores': zscores,
+    }
+
+def rank_alerts(anomalies: dict, month: str, clients: Optional[List[str]] = None,
+                threshold: float = THRESHOLD, limit: int = 50) -> pd.DataFrame:
+    """
+    Alertes d'un mois, classées par score z absolu décroissant.
+
+    Args:
+        anomalies: Résultat de detect_anomalies
+        month: Mois examiné ('YYYY-MM')
+        clients: Clients retenus (tous par défaut)
+        threshold: Score z absolu minimal
+        limit: Nombre maximal d'alertes
+
+    Returns:
+        DataFrame (Client, Métrique, Valeur, Référence, Score z), vide si le mois
+        est absent de l'historique
+    """
+    columns = ['Client', 'Métrique', 'Valeur', 'Référence', 'Score z']
+    if month not in anomalies['months']:
+        return pd.DataFrame(columns=columns)
+    t = anomalies['months'].index(month)
+    zscores = anomalies['zscores'][:, t, :]
+    flagged = np.abs(np.nan_to_num(zscores)) >= threshold
+    if clients is not None:
+        flagged &= np.isin(anomalies['clients'], clients)[:, None]
+    rows, cols = np.nonzero(flagged)
+    order = np.argsort(-np.abs(zscores[rows, cols]), kind='stable')[:limit]
+    rows, cols = rows[order], cols[order]
+    return pd.DataFrame({
+        'Client': anomalies['clients'][rows],
+        'Métrique': np.asarray(anomalies['labels'], dtype=object)[cols],
+        'Valeur': anomalies['values'][rows, t, cols],
+        'Référence': anomalies['medians'][rows, t, cols],
+        'Score z': zscores[rows, cols],
+    }, columns=columns)
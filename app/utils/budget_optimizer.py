@@ -0,0 +1,150 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Canaux à budget libre : colonnes de budget et de contacts mensuels
+# (Site et GMB sont des forfaits fixes, hors réallocation)
+AD_CHANNELS = {
+    'Google Ads': {'budget': 'google_ads_budget', 'contacts': 'google_ads_contacts'},
+    'Meta Ads': {'budget': 'meta_ads_budget', 'contacts': 'meta_ads_contacts'},
+}
+
+# Mois d'historique utilisés pour ajuster les courbes
+FIT_WINDOW = 12
+# Mois récents dont la moyenne donne le budget mensuel actuel
+CURRENT_WINDOW = 3
+# Mois exploitables (budget et contacts positifs) pour un ajustement propre au client
+MIN_POINTS = 4
+# Élasticité bornée : rendements décroissants stricts (b < 1) et positifs
+ELASTICITY_BOUNDS = (0.05, 0.95)
+# Itérations de la dichotomie sur le coût marginal commun
+ITERATIONS = 60
+
+def fit_response_curves(series: dict, window: int = FIT_WINDOW) -> dict:
+    """
+    Ajuste pour chaque client et chaque canal la courbe contacts = a × budget^b.
+
+    L'ajustement est une régression linéaire en log-log, résolue pour tous les
+    clients à la fois par les sommes des moindres carrés sur les mois où budget
+    et contacts sont positifs. L'élasticité b est bornée à ELASTICITY_BOUNDS ;
+    un client avec moins de MIN_POINTS mois exploitables reçoit l'élasticité
+    médiane du canal, et a est recalé sur ses propres moyennes (géométriques).
+
+    Args:
+        series: Cube (client × mois × métrique), voir anomalies.get_metric_cube
+
+    Returns:
+        Dictionnaire clients (noms), channels, et tableaux (client × canal) :
+        a, b, current (budget mensuel actuel), points (mois exploitables)
+    """
+    metrics = series['metrics']
+    channels = [name for name, cols in AD_CHANNELS.items() if cols['budget'] in metrics and cols['contacts'] in metrics]
+    cube = series['cube'][:, -window:]
+    budget = cube[:, :, [metrics[AD_CHANNELS[name]['budget']] for name in channels]]
+    contacts = cube[:, :, [metrics[AD_CHANNELS[name]['contacts']] for name in channels]]
+
+    usable = (budget > 0) & (contacts > 0)
+    x = np.log(np.where(usable, budget, 1.0))
+    y = np.log(np.where(usable, contacts, 1.0))
+    n = usable.sum(axis=1)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (x * x).sum(axis=1), (x * y).sum(axis=1)
+    denominator = n * sxx - sx * sx
+    fitted = (n >= MIN_POINTS) & (denominator > 1e-9)
+    slope = np.divide(n * sxy - sx * sy, denominator, out=np.full(sx.shape, np.nan), where=fitted)
+    slope = np.clip(slope, *ELASTICITY_BOUNDS)
+
+    # Élasticité médiane du canal pour les clients sans historique suffisant
+    pooled = np.array([
+        np.median(slope[fitted[:, k], k]) if fitted[:, k].any() else ELASTICITY_BOUNDS[1]
+        for k in range(len(channels))
+    ])
+    b = np.where(fitted, slope, pooled)
+    a = np.exp(np.divide(sy - b * sx, n, out=np.full(sx.shape, -np.inf), where=n > 0))
+
+    recent = budget[:, -CURRENT_WINDOW:]
+    observed = (~np.isnan(recent)).sum(axis=1)
+    current = np.divide(np.nansum(recent, axis=1), observed, out=np.zeros(sx.shape), where=observed > 0)
+    return {
+        'clients': np.asarray(list(series['clients']), dtype=object),
+        'channels': channels,
+        'a': a,
+        'b': b,
+        'current': current,
+        'points': n,
+    }
+
+def allocate_budget(curves: dict, amount: float, iterations: int = ITERATIONS) -> dict:
+    """
+    Répartit un budget supplémentaire entre les canaux, pour tous les clients à la fois.
+
+    L'optimum égalise le coût marginal des canaux financés : pour un multiplicateur
+    λ, chaque canal reçoit x = max(0, (λ / (a b))^(1 / (b - 1)) - budget actuel).
+    λ est cherché par dichotomie (en échelle logarithmique) simultanément pour
+    tous les clients, jusqu'à ce que les montants alloués totalisent `amount`.
+
+    Args:
+        curves: Courbes ajustées (voir fit_response_curves)
+        amount: Budget mensuel supplémentaire par client (€)
+
+    Returns:
+        Dictionnaire allocation (client × canal, €) et extra_contacts (par client)
+    """
+    a, b = curves['a'], curves['b']
+    active = a > 0
+    # Budget actuel plancher de 1 € : coût marginal fini pour un canal à l'arrêt
+    current = np.maximum(curves['current'], 1.0)
+
+    def marginal(budget):
+        return np.where(active, a * b * budget ** (b - 1), 0.0)
+
+    def allocation(log_lambda):
+        lam = np.exp(log_lambda)[:, None]
+        target = np.divide(lam, a * b, out=np.ones_like(a), where=active) ** (1 / (b - 1))
+        return np.where(active, np.maximum(target - current, 0.0), 0.0)
+
+    funded = active.any(axis=1)
+    # λ haut : aucun euro alloué ; λ bas : le meilleur canal absorbe tout le montant
+    high = np.log(np.where(funded, marginal(current).max(axis=1, initial=0.0), 1.0))
+    low = np.log(np.where(funded, marginal(current + amount).max(axis=1, initial=0.0), 1.0))
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        too_much = allocation(middle).sum(axis=1) > amount
+        low = np.where(too_much, middle, low)
+        high = np.where(too_much, high, middle)
+
+    shares = allocation(high)
+    total = shares.sum(axis=1, keepdims=True)
+    # Remise à l'échelle : le reliquat de la dichotomie est réparti au prorata
+    shares = np.divide(shares * amount, total, out=np.zeros_like(shares), where=total > 0)
+    shares[~funded] = 0.0
+    gain = np.where(active, a * ((current + shares) ** b - current ** b), 0.0)
+    return {'allocation': shares, 'extra_contacts': gain.sum(axis=1)}
+
+def recommendation_table(curves: dict, amount: float, clients=None) -> pd.DataFrame:
+    """
+    Tableau des recommandations : budget actuel, montant conseillé par canal,
+    contacts supplémentaires attendus et leur coût, trié par gain décroissant.
+
+    Args:
+        curves: Courbes ajustées (voir fit_response_curves)
+        amount: Budget mensuel supplémentaire par client (€)
+        clients: Clients retenus (tous par défaut)
+    """
+    result = allocate_budget(curves, amount)
+    selected = np.ones(len(curves['clients']), dtype=bool) if clients is None else np.isin(curves['clients'], clients)
+    allocation, extra = result['allocation'][selected], result['extra_contacts'][selected]
+    table = {'Client': curves['clients'][selected]}
+    for k, channel in enumerate(curves['channels']):
+        table[f"Budget {channel}"] = curves['current'][selected, k]
+        table[f"+ {channel}"] = allocation[:, k]
+    table['Canal prioritaire'] = np.where(
+        extra > 0, np.asarray(curves['channels'], dtype=object)[allocation.argmax(axis=1)], None
+    )
+    table['Contacts supplémentaires'] = extra
+    table['Coût par contact supplémentaire'] = np.divide(
+        amount, extra, out=np.full(len(extra), np.nan), where=extra > 0
+    )
+    return pd.DataFrame(table).sort_values('Contacts supplémentaires', ascending=False, kind='stable')
@@ -0,0 +1,100 @@
+import logging
+from typing import Optional
+import numpy as np
+import pandas as pd
+from utils.metric_catalog import CHANNELS, METRIC_CATALOG
+
+logger = logging.getLogger(__name__)
+
+# Canaux du bloc, dans l'ordre de l'axe des canaux
+BLOCK_CHANNELS = list(CHANNELS)
+
+# Métriques du bloc absentes de la comparaison des canaux du catalogue : budget
+# de chaque canal et contacts GMB (forfaits et sommes dérivés, voir utils/derived_metrics.py)
+EXTRA_METRICS = {
+    'budget': {'Site': 'site_budget', 'Google Ads': 'google_ads_budget', 'Meta Ads': 'meta_ads_budget', 'GMB': 'gmb_budget'},
+    'contacts': {'GMB': 'gmb_contacts'},
+}
+
+def channel_metrics(catalog: Optional[dict] = None) -> dict:
+    """
+    Axe des métriques alignées : métrique → colonne de chaque canal (chargée ou dérivée).
+
+    Construit à partir des entrées `comparison` du catalogue (mêmes colonnes que
+    les KPIs et la comparaison des canaux), complétées par EXTRA_METRICS. Un canal
+    absent de la définition n'a pas la métrique (NaN dans le bloc).
+    """
+    catalog = METRIC_CATALOG if catalog is None else catalog
+    metrics = {name: dict(columns) for name, columns in EXTRA_METRICS.items()}
+    for channel, definitions in catalog.items():
+        for definition in definitions.values():
+            if 'comparison' in definition:
+                metrics.setdefault(definition['comparison'], {})[channel] = definition['column']
+    return metrics
+
+CHANNEL_METRICS = channel_metrics()
+
+def build_channel_block(data: pd.DataFrame, metrics: Optional[dict] = None) -> dict:
+    """
+    Bloc numérique (ligne × canal × métrique) des lignes client-mois.
+
+    Les colonnes préfixées de chaque canal sont rangées sur un axe de métriques
+    commun (voir CHANNEL_METRICS) : totaux, comparaisons et ratios entre canaux
+    deviennent des réductions selon un axe. Une copie des valeurs, en une seule
+    affectation indexée.
+
+    Args:
+        data: Lignes client-mois (métriques dérivées comprises)
+        metrics: Axe des métriques (CHANNEL_METRICS par défaut)
+
+    Returns:
+        Dictionnaire block (ndarray float64, NaN quand un canal n'a pas la
+        métrique ou que la colonne est absente), channels et metrics (libellés
+        des axes)
+    """
+    metrics = CHANNEL_METRICS if metrics is None else metrics
+    cells = [
+        (c, m, columns[channel])
+        for m, columns in enumerate(metrics.values())
+        for c, channel in enumerate(BLOCK_CHANNELS)
+        if columns.get(channel) in data.columns
+    ]
+    block = np.full((len(data), len(BLOCK_CHANNELS), len(metrics)), np.nan)
+    if cells:
+        channel_index, metric_index, columns = zip(*cells)
+        values = data[list(columns)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        block[:, list(channel_index), list(metric_index)] = values
+    return {'block': block, 'channels': list(BLOCK_CHANNELS), 'metrics': list(metrics)}
+
+def block_frame(block: dict, index: Optional[pd.Index] = None) -> pd.DataFrame:
+    """Bloc en DataFrame à colonnes MultiIndex (canal, métrique) : `frame['Meta Ads', 'contacts']`, `frame.xs('contacts', axis=1, level=1)`."""
+    values = block['block']
+    columns = pd.MultiIndex.from_product([block['channels'], block['metrics']], names=['canal', 'métrique'])
+    return pd.DataFrame(values.reshape(len(values), -1), index=index, columns=columns)
+
+def channel_totals(block: dict, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Sommes de chaque métrique par canal (canal × métrique), sur toutes les lignes ou un masque.
+
+    Une cellule sans aucune valeur (métrique absente du canal) reste NaN.
+    """
+    values = block['block'] if rows is None else block['block'][rows]
+    present = ~np.isnan(values)
+    totals = np.where(present.any(axis=0), np.where(present, values, 0.0).sum(axis=0), np.nan)
+    return pd.DataFrame(totals, index=block['channels'], columns=block['metrics'])
+
+def channel_means(block: dict, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """Moyennes de chaque métrique par canal (canal × métrique), NaN ignorés."""
+    values = block['block'] if rows is None else block['block'][rows]
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    means = np.divide(np.where(present, values, 0.0).sum(axis=0), count,
+                      out=np.full(count.shape, np.nan), where=count > 0)
+    return pd.DataFrame(means, index=block['channels'], columns=block['metrics'])
+
+def channel_ratio(totals: pd.DataFrame, numerator: str, denominator: str) -> pd.Series:
+    """Ratio de deux métriques pour chaque canal (ratio des sommes), 0 si le dénominateur est nul."""
+    num = totals[numerator].to_numpy()
+    den = totals[denominator].to_numpy()
+    ratio = np.divide(num, den, out=np.where(np.isnan(num) | np.isnan(den), np.nan, 0.0), where=den > 0)
+    return pd.Series(ratio, index=totals.index)
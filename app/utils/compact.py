@@ -0,0 +1,77 @@
+import logging
+from typing import Iterable, Union
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Types entiers candidats, du plus petit au plus grand (le premier qui contient la plage est retenu)
+INTEGER_TYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64]
+
+def compact_metric(values: pd.Series) -> pd.Series:
+    """
+    Colonne de métrique dans le plus petit type sûr.
+
+    Comptages (valeurs entières, sans valeur manquante) : plus petit entier qui
+    contient leur plage ; autres valeurs numériques : float32. Une colonne texte
+    (valeurs non numériques laissées par le chargement) est conservée telle quelle.
+    """
+    numeric = pd.to_numeric(values, errors='coerce')
+    if numeric.isna().sum() > values.isna().sum():
+        return values
+    array = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+    if len(array) and np.isfinite(array).all() and (array == np.round(array)).all():
+        low, high = array.min(), array.max()
+        for integer_type in INTEGER_TYPES:
+            info = np.iinfo(integer_type)
+            if info.min <= low and high <= info.max:
+                return pd.Series(array.astype(integer_type), index=values.index, name=values.name)
+    return pd.Series(array.astype(np.float32), index=values.index, name=values.name)
+
+def compact_frame(data: pd.DataFrame, dimensions: Iterable[str]) -> pd.DataFrame:
+    """
+    Copie compacte des lignes client-mois.
+
+    Les dimensions deviennent des catégorielles : un dictionnaire trié des valeurs
+    distinctes par colonne, partagé par toutes les lignes, et un code entier par
+    ligne. Les métriques sont réduites par compact_metric. Les sommes doivent
+    être faites en float64 (voir widen).
+    """
+    dimensions = set(dimensions)
+    columns = {
+        col: data[col].astype('category') if col in dimensions else compact_metric(data[col])
+        for col in data.columns
+    }
+    return pd.DataFrame(columns, index=data.index)
+
+def widen(data: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+    """
+    Colonnes float32 et petits entiers élargies en float64 et int64, avant une accumulation.
+
+    Sans colonne compacte, `data` est renvoyé tel quel (aucune copie).
+    """
+    if isinstance(data, pd.Series):
+        return data.astype(_wide(data.dtype)) if _narrow(data.dtype) else data
+    narrow = {col: _wide(data[col].dtype) for col in data.columns if _narrow(data[col].dtype)}
+    return data.astype(narrow) if narrow else data
+
+def _narrow(dtype) -> bool:
+    return dtype == np.float32 or (dtype.kind in 'iu' and dtype.itemsize < 8)
+
+def _wide(dtype) -> type:
+    return np.float64 if dtype == np.float32 else np.int64
+
+def memory_report(data: pd.DataFrame) -> dict:
+    """
+    Empreinte mémoire d'un DataFrame (chaînes Python et dictionnaires des catégorielles compris).
+
+    Returns:
+        Dictionnaire rows, bytes (total), bytes_per_row et dtypes (effectif par type)
+    """
+    total = int(data.memory_usage(index=True, deep=True).sum())
+    return {
+        'rows': len(data),
+        'bytes': total,
+        'bytes_per_row': total / len(data) if len(data) else 0.0,
+        'dtypes': data.dtypes.astype(str).value_counts().to_dict(),
+    }
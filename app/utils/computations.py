@@ -0,0 +1,148 @@
+import pandas as pd
+from utils.data_loader import DataLoader
+from utils.metric_catalog import plan_reductions, table_columns
+from utils.view_cache import state_filters
+
+# Calculs des vues du dashboard, sans Streamlit : appelés par le dashboard, le
+# préchauffage, les rapports (app/reports.py) et l'API JSON (app/api_server.py).
+# Les résultats sont des dictionnaires de DataFrames, de Series et de nombres.
+
+# Scores pondérés utilisés pour le classement des performances
+SCORE_COLUMNS = {
+    'Site': 'site_score_site_pondéré',
+    'Google Ads': 'google_ads_score_google_ads_pondéré',
+    'Meta Ads': 'meta_ads_score_meta_ads_pondéré',
+    'GMB': 'gmb_score_gmb_pondéré'
+}
+
+def compute_performance_analysis(loader: DataLoader, **filtres) -> dict:
+    """
+    Calcule les classements de performance (scores pondérés moyens).
+
+    Les moyennes par dimension sont calculées par loader.aggregate (en SQL avec
+    le backend sqlite) : aucune ligne client-mois n'est chargée.
+
+    Returns:
+        Dictionnaire dimension (Client, Activité, Localité) → DataFrame trié par score global
+    """
+    performances = {}
+    for dimension in ['Client', 'Activité', 'Localité']:
+        performance = loader.aggregate(means=list(SCORE_COLUMNS.values()), by=[dimension], **filtres)
+        # Calcul du score global moyen
+        performance['score_global'] = performance[list(SCORE_COLUMNS.values())].mean(axis=1)
+        # Tri par score global
+        performances[dimension] = performance.sort_values('score_global', ascending=False)
+    return performances
+
+def compute_financial_metrics(loader: DataLoader, **filtres) -> dict:
+    """
+    Calcule les métriques financières (coût par contact) par produit, par client et globales.
+
+    Sommes, moyennes et métriques dérivées sont calculées par loader.aggregate
+    (en SQL avec le backend sqlite) : aucune ligne client-mois n'est chargée.
+
+    Returns:
+        Dictionnaire : produits (DataFrame), clients (DataFrame trié par coût par
+        contact), budget_total et cout_contact_global
+    """
+    totals = loader.aggregate(
+        sums=['site_contacts', 'google_ads_budget', 'google_ads_contacts', 'meta_ads_budget', 'meta_ads_contacts'],
+        means=['site_cout_contact'],
+        derived=['site_budget', 'google_ads_cout_contact_global', 'meta_ads_cout_contact_global',
+                 'gmb_budget', 'gmb_contacts', 'gmb_cout_contact_global', 'budget_ads', 'cout_contact_ads'],
+        **filtres
+    ).iloc[0]
+
+    # Calcul des métriques par produit
+    df_metrics = pd.DataFrame([
+        {
+            'Produit': 'Site',
+            'Budget': totals['site_budget'],  # Forfait mensuel par client sur la période
+            'Contacts': totals.get('site_contacts', 0),
+            'Coût par Contact': totals.get('site_cout_contact', 0)  # Utilisation directe du coût par contact du site
+        },
+        {
+            'Produit': 'Google Ads',
+            'Budget': totals.get('google_ads_budget', 0),
+            'Contacts': totals.get('google_ads_contacts', 0),
+            'Coût par Contact': totals['google_ads_cout_contact_global']
+        },
+        {
+            'Produit': 'Meta Ads',
+            'Budget': totals.get('meta_ads_budget', 0),
+            'Contacts': totals.get('meta_ads_contacts', 0),
+            'Coût par Contact': totals['meta_ads_cout_contact_global']
+        },
+        {
+            'Produit': 'GMB',
+            'Budget': totals['gmb_budget'],  # Forfait mensuel de 99€ par client
+            'Contacts': totals['gmb_contacts'],  # Somme des appels et réservations
+            'Coût par Contact': totals['gmb_cout_contact_global']  # Budget total / nombre total de contacts
+        }
+    ])
+
+    # Calcul des métriques par client (budget publicitaire et contacts, ratio des sommes)
+    df_client_metrics = loader.aggregate(
+        derived=['budget_ads', 'contacts_total', 'cout_contact_ads'], by=['Client'], **filtres
+    ).rename(columns={
+        'budget_ads': 'Budget',
+        'contacts_total': 'Contacts',
+        'cout_contact_ads': 'Coût par Contact'
+    })[['Client', 'Budget', 'Contacts', 'Coût par Contact']]
+
+    return {
+        'produits': df_metrics,
+        'clients': df_client_metrics.sort_values('Coût par Contact', ascending=True),
+        'budget_total': float(totals['budget_ads']),
+        'cout_contact_global': float(totals['cout_contact_ads'])
+    }
+
+def compute_view(loader: DataLoader, plan: dict, filter_state: tuple) -> dict:
+    """
+    Résultats d'une vue pour un état de filtres, sans affichage (mis en cache et préchauffés).
+
+    Returns:
+        Dictionnaire :
+            kpis        : agrégats du plan (KPIs et comparaison des canaux)
+            financial   : métriques financières (voir compute_financial_metrics)
+            performance : analyse de performance (voir compute_performance_analysis)
+    """
+    filtres = state_filters(filter_state)
+    return {
+        'kpis': loader.aggregate(**plan_reductions(plan), **filtres).iloc[0],
+        'financial': compute_financial_metrics(loader, **filtres),
+        'performance': compute_performance_analysis(loader, **filtres),
+    }
+
+def channel_kpis(values: pd.Series, plan: dict) -> dict:
+    """KPIs de chaque canal : canal → {nom affiché : valeur}, à partir des agrégats du plan."""
+    return {
+        channel: {name: values[definition['column']] for name, definition in kpis.items()}
+        for channel, kpis in plan['catalog'].items()
+    }
+
+def compute_client_table(loader: DataLoader, plan: dict, filter_state: tuple, channel: str = "Tous") -> pd.DataFrame:
+    """
+    Tableau des clients : une ligne par client (ou par mois pour un client
+    sélectionné), avec les colonnes du catalogue du canal (toutes si "Tous").
+    Tous les filtres de l'état s'appliquent (période, client, activité, localité).
+
+    Returns:
+        DataFrame des valeurs brutes : Client, Activité, Localité, (date), une colonne par libellé
+    """
+    dimensions = ['Client', 'Activité', 'Localité']
+    filtres = state_filters(filter_state)
+    if filtres['client']:
+        # Client sélectionné : détail mensuel, sans agrégation
+        df_agg = loader.filter_data(**filtres)
+    else:
+        # Agrégation par client selon le plan du catalogue (en SQL avec le backend sqlite)
+        df_agg = loader.aggregate(**plan_reductions(plan), by=dimensions, **filtres)
+
+    colonnes = table_columns(plan, None if channel == "Tous" else [channel])
+    table = pd.DataFrame({dim: df_agg[dim].to_numpy() for dim in dimensions})
+    if filtres['client']:
+        table['date'] = df_agg['date'].to_numpy()
+    for libelle, definition in colonnes.items():
+        table[libelle] = df_agg[definition['column']].to_numpy()
+    return table
@@ -0,0 +1,152 @@
+import logging
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from utils.derived_metrics import metric_inputs
+
+logger = logging.getLogger(__name__)
+
+# Cibles de l'analyse des leviers : libellé → colonne
+DRIVER_TARGETS = {
+    'Contacts': 'contacts_total',
+    'Coût par contact': 'cout_contact_total',
+}
+
+# Au-delà de ce nombre de lignes, les corrélations sont estimées sur un échantillon
+SAMPLE_THRESHOLD = 50_000
+# Taille de l'échantillon (tirage sans remise, graine fixe : résultats reproductibles)
+SAMPLE_SIZE = 50_000
+SAMPLE_SEED = 0
+# Observations communes minimales pour qu'un coefficient soit renseigné
+MIN_OBSERVATIONS = 3
+
+def rank_columns(values: np.ndarray) -> np.ndarray:
+    """
+    Rangs moyens (ex æquo : moyenne de leurs rangs) de chaque colonne, en un seul tri.
+
+    Le tri de toutes les colonnes est fait à la fois ; les groupes d'ex æquo sont
+    délimités par des cumuls (maximum et minimum) sur les valeurs triées, sans
+    boucle par colonne. Les NaN restent NaN et ne comptent pas dans les rangs.
+
+    Args:
+        values: Tableau (ligne × colonne)
+
+    Returns:
+        Tableau (ligne × colonne) de rangs à partir de 1
+    """
+    n = values.shape[0]
+    if n == 0:
+        return values.astype(np.float64)
+    # Les NaN sont triés en dernier (np.argsort)
+    order = np.argsort(values, axis=0, kind='stable')
+    ordered = np.take_along_axis(values, order, axis=0)
+    positions = np.broadcast_to(np.arange(n)[:, None], ordered.shape)
+
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    ends = np.ones(ordered.shape, dtype=bool)
+    ends[:-1] = starts[1:]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=0)
+    last = np.minimum.accumulate(np.where(ends, positions, n - 1)[::-1], axis=0)[::-1]
+
+    sorted_ranks = np.where(np.isnan(ordered), np.nan, (first + last) / 2 + 1)
+    ranks = np.empty(ordered.shape, dtype=np.float64)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=0)
+    return ranks
+
+def pearson_matrix(values: np.ndarray, min_observations: int = MIN_OBSERVATIONS) -> np.ndarray:
+    """
+    Matrice des corrélations de Pearson, sur les observations communes à chaque paire.
+
+    Les sommes par paire de colonnes (effectif, sommes, sommes des carrés et des
+    produits) sont obtenues par produits matriciels du masque des valeurs
+    renseignées, comme DataFrame.corr mais sans boucle sur les paires.
+
+    Returns:
+        Tableau (colonne × colonne) ; NaN pour une paire constante ou trop peu renseignée
+    """
+    mask = ~np.isnan(values)
+    x = np.where(mask, values, 0.0)
+    # Centrage par colonne : limite les erreurs d'arrondi des grandes valeurs
+    x = np.where(mask, x - np.divide(x.sum(axis=0), mask.sum(axis=0), out=np.zeros(x.shape[1]),
+                                     where=mask.any(axis=0)), 0.0)
+    m = mask.astype(np.float64)
+    count = m.T @ m
+    sums = x.T @ m
+    squares = (x * x).T @ m
+    products = x.T @ x
+
+    covariance = count * products - sums * sums.T
+    variance = (count * squares - sums * sums) * (count * squares - sums * sums).T
+    valid = (count >= min_observations) & (variance > 0)
+    matrix = np.divide(covariance, np.sqrt(np.where(valid, variance, 1.0)),
+                       out=np.full(count.shape, np.nan), where=valid)
+    np.clip(matrix, -1.0, 1.0, out=matrix)
+    return matrix
+
+def sample_rows(data: pd.DataFrame, threshold: int = SAMPLE_THRESHOLD, size: int = SAMPLE_SIZE,
+                seed: int = SAMPLE_SEED) -> pd.DataFrame:
+    """Échantillon aléatoire de `size` lignes si `data` dépasse `threshold` lignes, sinon `data`."""
+    if len(data) <= threshold:
+        return data
+    rows = np.sort(np.random.default_rng(seed).choice(len(data), size=min(size, len(data)), replace=False))
+    return data.iloc[rows]
+
+def compute_correlations(data: pd.DataFrame, columns: Optional[List[str]] = None,
+                         threshold: int = SAMPLE_THRESHOLD, size: int = SAMPLE_SIZE) -> dict:
+    """
+    Matrices de corrélation de Pearson et de Spearman des colonnes numériques.
+
+    Au-delà de `threshold` lignes, les deux matrices sont estimées sur un
+    échantillon de `size` lignes. Spearman est la corrélation de Pearson des rangs
+    (rangs calculés par colonne ; avec des valeurs manquantes, ils ne sont pas
+    recalculés pour chaque paire comme dans DataFrame.corr).
+
+    Args:
+        data: Lignes client-mois filtrées
+        columns: Colonnes analysées (toutes les colonnes numériques par défaut)
+
+    Returns:
+        Dictionnaire pearson et spearman (DataFrames colonne × colonne),
+        rows (lignes de `data`) et sampled (lignes utilisées)
+    """
+    if columns is None:
+        columns = list(data.select_dtypes('number').columns)
+    sample = sample_rows(data, threshold, size)
+    if len(sample) < len(data):
+        logger.info(f"Corrélations estimées sur {len(sample)} lignes sur {len(data)}")
+    values = sample[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    return {
+        'pearson': pd.DataFrame(pearson_matrix(values), index=columns, columns=columns),
+        'spearman': pd.DataFrame(pearson_matrix(rank_columns(values)), index=columns, columns=columns),
+        'rows': len(data),
+        'sampled': len(sample),
+    }
+
+def driver_table(correlations: dict, target: str, exclude_inputs: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    Métriques classées par force de leur lien avec `target` (|Spearman| décroissant).
+
+    Args:
+        correlations: Matrices de corrélation (voir compute_correlations)
+        target: Colonne cible (voir DRIVER_TARGETS)
+        exclude_inputs: Écarte les colonnes qui entrent dans le calcul de la cible
+            (ex. les contacts de chaque canal pour 'contacts_total'), liées à elle par construction
+        limit: Nombre maximal de lignes
+
+    Returns:
+        DataFrame Métrique, Spearman, Pearson, Sens ; les métriques sans coefficient
+        (constantes sur la sélection) sont omises
+    """
+    excluded = [target] + (metric_inputs(target) if exclude_inputs else [])
+    spearman = correlations['spearman'][target].drop(excluded, errors='ignore')
+    pearson = correlations['pearson'][target].reindex(spearman.index)
+    table = pd.DataFrame({
+        'Métrique': spearman.index,
+        'Spearman': spearman.to_numpy(),
+        'Pearson': pearson.to_numpy(),
+    }).dropna(subset=['Spearman'])
+    table['Sens'] = np.where(table['Spearman'] >= 0, "↑ évoluent ensemble", "↓ évoluent en sens inverse")
+    order = np.argsort(-np.abs(table['Spearman'].to_numpy()), kind='stable')
+    table = table.iloc[order].reset_index(drop=True)
+    return table if limit is None else table.head(limit)
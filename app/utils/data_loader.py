@@ -1,20 +1,108 @@
 import pandas as pd
 import numpy as np
 import logging
+import hashlib
+import os
+import sys
+import threading
+from contextlib import contextmanager
 from typing import List, Optional, Union
 import json
 from pathlib import Path
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from utils.sqlite_store import SQLiteStore
+from utils.shared_store import SharedDataset
+from utils.channel_block import build_channel_block, channel_totals
+from utils.compact import compact_frame, compact_metric, widen
+from utils.derived_metrics import DERIVED_METRICS, ROW_COUNT, add_derived_metrics, aggregate_derived, base_columns
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus sur le journal
+    fcntl = None
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Copy-on-write (comportement par défaut à partir de pandas 3) : les sélections
+# partagent la mémoire du jeu de données en cache au lieu de le copier
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Colonnes de dimension (toutes les autres colonnes sont des métriques)
+DIMENSION_COLUMNS = ['Client', 'Activité', 'Localité', 'date']
+
+# Correspondance entre les arguments de filtre et les colonnes du DataFrame
+FILTER_COLUMNS = {'client': 'Client', 'activite': 'Activité', 'localite': 'Localité'}
+
+# Champs d'un enregistrement du journal décrivant le client (les autres forment l'entrée d'historique)
+RECORD_CLIENT_FIELDS = ('id', 'nom', 'activite', 'localite')
+
+# Noms des mois pour les libellés ("Mai 2025")
+MOIS = ['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
+        'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
+
+def month_ordinal(date: str) -> int:
+    """Ordinal entier d'un mois 'YYYY-MM' (année * 12 + mois - 1)."""
+    return int(date[:4]) * 12 + int(date[5:7]) - 1
+
+def month_ordinals(dates) -> np.ndarray:
+    """Ordinaux entiers de mois 'YYYY-MM' ; seules les valeurs distinctes sont analysées."""
+    codes, uniques = pd.factorize(np.asarray(dates, dtype=object))
+    return np.array([month_ordinal(date) for date in uniques], dtype=np.int64)[codes]
+
+def format_month_labels(dates) -> np.ndarray:
+    """Libellés « Mai 2025 » de mois 'YYYY-MM', formatés une fois par mois distinct."""
+    codes, uniques = pd.factorize(np.asarray(dates, dtype=object))
+    labels = np.array([f"{MOIS[int(date[5:7]) - 1]} {date[:4]}" for date in uniques], dtype=object)
+    return labels[codes]
+
 class DataLoader:
-    def __init__(self):
-        self.json_path = Path("data/data.json")
+    def __init__(self, json_path: Union[str, Path] = "data/data.json", backend: str = "pandas",
+                 db_path: Optional[Union[str, Path]] = None, shared_name: str = "dashboard",
+                 compact: bool = False):
+        """
+        Args:
+            json_path: Fichier JSON source
+            backend: "pandas" (tout le jeu de données en mémoire) ou "sqlite"
+                (filtres et agrégats exécutés en SQL, seuls les résultats sont chargés)
+            db_path: Base SQLite (par défaut à côté du JSON, avec l'extension .sqlite)
+            shared_name: Nom du jeu de données en mémoire partagée (backend "shared" :
+                colonnes publiées par `app/shared_publisher.py`, lues sans copie)
+            compact: DataFrame en cache compact (voir utils/compact.py) : dimensions
+                catégorielles, comptages en petits entiers, autres métriques en float32 ;
+                les sommes restent calculées en float64
+
+        Les enregistrements ajoutés au journal `<json>.changes.jsonl` (voir append_records)
+        sont appliqués par-dessus le snapshot JSON, puis intégrés au fil de l'eau par refresh().
+        """
+        if backend not in ("pandas", "sqlite", "shared"):
+            raise ValueError(f"Backend {backend} non supporté")
+        self.json_path = Path(json_path)
+        self.backend = backend
+        self.compact_dtypes = compact
+        self.db_path = Path(db_path) if db_path else self.json_path.with_suffix(".sqlite")
+        self.changes_path = self.json_path.with_suffix(".changes.jsonl")
+        # Verrou du journal entre processus (ingestion et compaction) : fichier distinct,
+        # le journal lui-même étant remplacé par la compaction
+        self.lock_path = self.json_path.with_suffix(".changes.lock")
+        # Incrémenté à chaque modification des données (clé des caches dérivés)
+        self.version = 0
         self._data = None
+        # Index des lignes du DataFrame figé, triées par (client, mois) (voir _freeze)
+        self._row_index = None
+        self._series = None
+        self._store = None
+        self._shared = SharedDataset(shared_name) if backend == "shared" else None
+        self._changes_offset = 0
+        self._snapshot_mtime = None
+        # Empreinte du contenu de chaque client (None : modifié par le journal depuis le dernier snapshot)
+        self._client_hashes = {}
+        # Activité et localité de chaque client connu : nom → (activite, localite)
+        self._client_dimensions = {}
+        self._lock = threading.RLock()
 
     def _convert_value(self, value):
         """Convertit une valeur en nombre, en gérant le format français (virgule → point)."""
@@ -27,74 +115,742 @@ class DataLoader:
                 return value
         return value
 
-    def _load_json_data(self):
-        """Charge les données depuis le fichier JSON."""
+    def _read_snapshot(self) -> dict:
+        """Lit le snapshot JSON."""
         if not self.json_path.exists():
             raise FileNotFoundError(f"Le fichier {self.json_path} n'existe pas")
         with open(self.json_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-        # Convertir en DataFrame à plat
-        rows = []
-        for client in json_data['clients']:
-            for hist in client['historique']:
-                row = {
-                    'Client': client['nom'],
-                    'Activité': client['activite'],
-                    'Localité': client['localite'],
-                    'date': hist['date']
+            return json.load(f)
+
+    def _read_changes_from(self, offset: int) -> tuple:
+        """
+        Lit les enregistrements du journal à partir d'une position (en octets).
+
+        Returns:
+            Tuple (enregistrements, nouvelle position). Une dernière ligne incomplète
+            (écriture en cours) n'est pas consommée.
+        """
+        if not self.changes_path.exists():
+            return [], 0
+        with open(self.changes_path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1
+        records = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+        return records, offset + end
+
+    def _read_changes(self) -> List[dict]:
+        """Lit les enregistrements ajoutés au journal depuis la dernière lecture."""
+        records, self._changes_offset = self._read_changes_from(self._changes_offset)
+        return records
+
+    @staticmethod
+    def _record_history(record: dict) -> dict:
+        """Entrée d'historique (date et canaux) contenue dans un enregistrement du journal."""
+        return {k: v for k, v in record.items() if k not in RECORD_CLIENT_FIELDS}
+
+    @classmethod
+    def _merge_records(cls, json_data: dict, records: List[dict]) -> dict:
+        """Applique des enregistrements sur un snapshot : un enregistrement remplace le mois du client."""
+        clients = {client['nom']: client for client in json_data['clients']}
+        for record in records:
+            client = clients.get(record['nom'])
+            if client is None:
+                client = {
+                    'id': record.get('id', record['nom'].lower().replace(' ', '_')),
+                    'nom': record['nom'],
+                    'activite': record.get('activite', ''),
+                    'localite': record.get('localite', ''),
+                    'historique': []
                 }
-                # Ajout des sous-dictionnaires (site, google_ads, meta_ads, gmb)
-                for canal in ['site', 'google_ads', 'meta_ads', 'gmb']:
-                    if canal in hist:
-                        for k, v in hist[canal].items():
-                            # Correction des noms de colonnes pour Quality Score et Relevance Score
-                            if canal == 'google_ads' and k == 'quality-score':
-                                row['google_ads_quality_score'] = self._convert_value(v)
-                            elif canal == 'meta_ads' and k == 'relevance_score':
-                                row['meta_ads_relevance_score'] = self._convert_value(v)
-                            else:
-                                row[f"{canal}_{k}"] = self._convert_value(v)
-                rows.append(row)
-        return pd.DataFrame(rows)
+                json_data['clients'].append(client)
+                clients[record['nom']] = client
+            hist = cls._record_history(record)
+            client['historique'] = sorted(
+                [h for h in client['historique'] if h['date'] != hist['date']] + [hist],
+                key=lambda h: h['date'],
+                reverse=True
+            )
+        return json_data
+
+    def _history_to_row(self, client: dict, hist: dict) -> dict:
+        """Convertit une entrée d'historique d'un client en ligne à plat."""
+        row = {
+            'Client': client['nom'],
+            'Activité': client['activite'],
+            'Localité': client['localite'],
+            'date': hist['date']
+        }
+        # Ajout des sous-dictionnaires (site, google_ads, meta_ads, gmb)
+        for canal in ['site', 'google_ads', 'meta_ads', 'gmb']:
+            if canal in hist:
+                for k, v in hist[canal].items():
+                    # Correction des noms de colonnes pour Quality Score et Relevance Score
+                    if canal == 'google_ads' and k == 'quality-score':
+                        row['google_ads_quality_score'] = self._convert_value(v)
+                    elif canal == 'meta_ads' and k == 'relevance_score':
+                        row['meta_ads_relevance_score'] = self._convert_value(v)
+                    else:
+                        row[f"{canal}_{k}"] = self._convert_value(v)
+        return row
+
+    @staticmethod
+    def _client_hash(client: dict) -> str:
+        """Empreinte du contenu d'un client (informations et historique)."""
+        return hashlib.sha1(json.dumps(client, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _read_current_state(self) -> dict:
+        """Lit le snapshot et tout le journal, et positionne la lecture du journal à la fin."""
+        json_data = self._read_snapshot()
+        self._snapshot_mtime = self.json_path.stat().st_mtime
+        self._changes_offset = 0
+        json_data = self._merge_records(json_data, self._read_changes())
+        self._client_dimensions = {client['nom']: (client['activite'], client['localite']) for client in json_data['clients']}
+        return json_data
+
+    def _current_dimensions(self) -> dict:
+        """Activité et localité de chaque client du snapshot et du journal, sans modifier l'état du loader."""
+        if not self.json_path.exists():
+            return {}
+        json_data = self._merge_records(self._read_snapshot(), self._read_changes_from(0)[0])
+        return {client['nom']: (client['activite'], client['localite']) for client in json_data['clients']}
+
+    def _load_json_rows(self) -> List[dict]:
+        """Charge le snapshot JSON et le journal, sous forme de lignes à plat."""
+        json_data = self._read_current_state()
+        self._client_hashes = {client['nom']: self._client_hash(client) for client in json_data['clients']}
+        # Convertir en lignes à plat
+        return [
+            self._history_to_row(client, hist)
+            for client in json_data['clients']
+            for hist in client['historique']
+        ]
+
+    def _load_json_data(self):
+        """Charge les données depuis le fichier JSON."""
+        return pd.DataFrame(self._load_json_rows())
+
+    def get_store(self) -> SQLiteStore:
+        """Base SQLite du backend "sqlite", (re)construite si le JSON ou le journal est plus récent."""
+        with self._lock:
+            if self._store is None:
+                sources = [self.json_path] + ([self.changes_path] if self.changes_path.exists() else [])
+                stale = not self.db_path.exists() or any(
+                    self.db_path.stat().st_mtime < source.stat().st_mtime for source in sources
+                )
+                self._store = SQLiteStore(self.db_path)
+                if stale or self._store.is_empty():
+                    self._store.load_rows(self._load_json_rows())
+                else:
+                    # La base contient déjà le snapshot et tout le journal
+                    self._snapshot_mtime = self.json_path.stat().st_mtime
+                    self._changes_offset = self.changes_path.stat().st_size if self.changes_path.exists() else 0
+                    self._client_dimensions = self._store.client_dimensions()
+            return self._store
 
     def get_data(self):
         """Récupère les données sous forme de DataFrame."""
-        if self._data is None:
-            self._data = self._load_json_data()
-        return self._data
+        with self._lock:
+            if self._data is None:
+                if self.backend == "sqlite":
+                    self._data = self._freeze(self.get_store().filter())
+                elif self.backend == "shared":
+                    self._attach_shared()
+                else:
+                    self._data = self._freeze(self._load_json_data())
+            return self._data
+
+    def _freeze(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fige le DataFrame partagé par toutes les sessions.
+
+        Les métriques dérivées (voir utils/derived_metrics.py) y sont calculées une
+        fois pour toutes ; celles déjà présentes (colonnes publiées en mémoire
+        partagée, lignes ajoutées par refresh) sont conservées sans copie. Les lignes sont triées par (client, mois) : un filtre
+        client ou une plage de mois devient une recherche dichotomique dans la clé
+        entière client * stride + ordinal du mois (voir filter_data). Chaque colonne
+        est un tableau numpy en lecture seule : une session qui modifie une
+        sélection en obtient une copie (copy-on-write), jamais le jeu de données en cache.
+        En mode compact, les colonnes sont d'abord réduites (voir utils/compact.py).
+        """
+        data = add_derived_metrics(data)
+        codes, clients = pd.factorize(data['Client'])
+        months = month_ordinals(data['date'])
+        order = np.lexsort((months, codes))
+        if np.any(order != np.arange(len(order))):
+            data = data.take(order)
+            codes, months = codes[order], months[order]
+        if self.compact_dtypes:
+            data = compact_frame(data, DIMENSION_COLUMNS)
+        columns = {}
+        for col in data.columns:
+            if isinstance(data[col].dtype, pd.CategoricalDtype):
+                # Dictionnaire des valeurs et codes par ligne (mode compact)
+                columns[col] = data[col].array
+                continue
+            values = data[col].to_numpy(dtype=object if col in DIMENSION_COLUMNS else None)
+            if values.flags.writeable:
+                values = values.copy()
+                values.flags.writeable = False
+            columns[col] = values
+        stride = int(months.max()) + 1 if len(months) else 1
+        key = codes.astype(np.int64) * stride + months
+        key.flags.writeable = False
+        self._row_index = {
+            'clients': {client: i for i, client in enumerate(clients)},
+            'stride': stride,
+            'key': key,
+        }
+        return pd.DataFrame(columns, copy=False)
+
+    def _attach_shared(self) -> None:
+        """Se rattache à la version publiée en mémoire partagée (DataFrame et cube)."""
+        data, self._series, _ = self._shared.attach()
+        self._data = self._freeze(data)
+
+    def append_records(self, records: List[dict]) -> None:
+        """
+        Ajoute des enregistrements mensuels au journal, sans réécrire le snapshot JSON.
+
+        Chaque enregistrement décrit un mois d'un client, au format de l'historique :
+        {"nom", "activite", "localite", "date": "YYYY-MM", "site": {...}, "google_ads": {...}, ...}.
+        Un enregistrement remplace le mois existant du même client. Un client
+        existant garde son activité et sa localité (comme à la compaction) ; celles
+        d'un nouveau client sont obligatoires.
+        """
+        for record in records:
+            if 'nom' not in record or 'date' not in record:
+                raise ValueError("Chaque enregistrement doit contenir au moins 'nom' et 'date'")
+        if any('activite' not in record or 'localite' not in record for record in records):
+            known = set(self._current_dimensions())
+            for record in records:
+                if record['nom'] not in known and ('activite' not in record or 'localite' not in record):
+                    raise ValueError(f"Client {record['nom']} inconnu : 'activite' et 'localite' sont obligatoires")
+                known.add(record['nom'])
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._journal_lock(), open(self.changes_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @contextmanager
+    def _journal_lock(self):
+        """Verrou exclusif du journal, partagé par tous les processus (ajouts et compaction)."""
+        with open(self.lock_path, 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _rows_frame(self, rows: List[dict]) -> pd.DataFrame:
+        """
+        Lignes ajoutées ou remplacées, avec les colonnes du DataFrame en cache et
+        leurs métriques dérivées : calculées sur ces seules lignes, comme au chargement.
+        """
+        loaded = [col for col in self._data.columns if col not in DERIVED_METRICS]
+        frame = pd.DataFrame(rows)
+        return add_derived_metrics(frame.reindex(columns=loaded + [col for col in frame.columns if col not in loaded]))
+
+    def _client_positions(self, clients) -> np.ndarray:
+        """Positions des lignes de clients dans le DataFrame figé (tranches de l'index trié)."""
+        index = self._row_index
+        codes = np.array([index['clients'][client] for client in clients if client in index['clients']], dtype=np.int64)
+        first = np.searchsorted(index['key'], codes * index['stride'], side='left')
+        last = np.searchsorted(index['key'], (codes + 1) * index['stride'], side='left')
+        lengths = last - first
+        return np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def _splice_clients(self, clients: set, blocks: pd.DataFrame) -> None:
+        """
+        Remplace dans le DataFrame figé toutes les lignes des clients donnés.
+
+        Args:
+            clients: Clients dont les lignes sont remplacées ; ceux absents de
+                `blocks` sont supprimés
+            blocks: Nouvelles lignes de ces clients (voir _rows_frame)
+
+        Les lignes restent triées par (client, mois) sans nouveau tri : les tranches
+        des autres clients sont recopiées telles quelles entre les nouveaux blocs,
+        un nouveau client reçoit le code suivant (en fin de tableau) et la clé n'est
+        recalculée pour toutes les lignes que si un mois dépasse le stride. Chaque
+        colonne reste un nouveau tableau en lecture seule : les vues déjà renvoyées
+        aux sessions sont intactes.
+        """
+        data, index = self._data, self._row_index
+        if any(col not in data.columns for col in blocks.columns):
+            # Nouvelle colonne chargée : métriques dérivées recalculées sur toutes les lignes
+            kept = data.take(np.setdiff1d(np.arange(len(data)), self._client_positions(clients)))
+            merged = pd.concat([kept, blocks], ignore_index=True)
+            self._data = self._freeze(merged.drop(columns=[col for col in DERIVED_METRICS if col in merged.columns]))
+            return
+
+        present = set(blocks['Client'].unique())
+        client_codes = {client: code for client, code in index['clients'].items() if client not in clients or client in present}
+        next_code = max(index['clients'].values(), default=-1) + 1
+        for client in blocks['Client'].unique():
+            if client not in client_codes:
+                client_codes[client] = next_code
+                next_code += 1
+        block_codes = blocks['Client'].map(client_codes).to_numpy(dtype=np.int64)
+        block_months = month_ordinals(blocks['date'])
+        order = np.lexsort((block_months, block_codes))
+        blocks, block_codes, block_months = blocks.take(order), block_codes[order], block_months[order]
+
+        stride, key = index['stride'], index['key']
+        if len(block_months) and block_months.max() >= stride:
+            new_stride = int(block_months.max()) + 1
+            key = key // stride * new_stride + key % stride
+            stride = new_stride
+        block_key = block_codes * stride + block_months
+
+        # Tranche remplacée (ancienne) et nouveau bloc de chaque client touché, dans l'ordre des codes
+        touched = np.unique(np.array(
+            [index['clients'][client] for client in clients if client in index['clients']] + list(np.unique(block_codes)),
+            dtype=np.int64
+        ))
+        old_first = np.searchsorted(key, touched * stride, side='left')
+        old_last = np.searchsorted(key, (touched + 1) * stride, side='left')
+        new_first = np.searchsorted(block_key, touched * stride, side='left')
+        new_last = np.searchsorted(block_key, (touched + 1) * stride, side='left')
+        kept_first = np.concatenate([[0], old_last])
+        kept_last = np.concatenate([old_first, [len(key)]])
+
+        def splice(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+            pieces = []
+            for i in range(len(touched)):
+                pieces += [old[kept_first[i]:kept_last[i]], new[new_first[i]:new_last[i]]]
+            pieces.append(old[kept_first[-1]:kept_last[-1]])
+            values = np.concatenate(pieces)
+            values.flags.writeable = False
+            return values
+
+        columns = {}
+        for col in data.columns:
+            old = data[col].array if isinstance(data[col].dtype, pd.CategoricalDtype) else data[col].to_numpy()
+            if isinstance(old, pd.Categorical):
+                # Mode compact : nouvelles valeurs ajoutées au dictionnaire
+                values = blocks[col].to_numpy(dtype=object)
+                categories = old.categories.append(pd.Index(pd.unique(values[~pd.isna(values)])).difference(old.categories))
+                category_codes = splice(old.codes.astype(np.int64), categories.get_indexer(values))
+                columns[col] = pd.Categorical.from_codes(category_codes, categories)
+                continue
+            if col in DIMENSION_COLUMNS:
+                new = blocks[col].to_numpy(dtype=object)
+            elif self.compact_dtypes:
+                new = compact_metric(blocks[col]).to_numpy()
+            else:
+                new = blocks[col].to_numpy()
+            dtype = np.result_type(old.dtype, new.dtype)
+            columns[col] = splice(old.astype(dtype, copy=False), new.astype(dtype, copy=False))
+
+        self._data = pd.DataFrame(columns, copy=False)
+        self._row_index = {'clients': client_codes, 'stride': stride, 'key': splice(key, block_key)}
+
+    def refresh(self) -> bool:
+        """
+        Intègre les enregistrements ajoutés au journal depuis la dernière lecture.
+
+        Seules les nouvelles lignes du journal sont lues. Si le snapshot a été
+        remplacé (compaction), les données sont rechargées.
+
+        Returns:
+            True si les données ont changé
+        """
+        with self._lock:
+            if self.backend == "shared":
+                # Les fichiers sont suivis par l'éditeur : il suffit de suivre sa version
+                if self._data is None or self._shared.current_version() == self._shared.version:
+                    return False
+                self._attach_shared()
+                self.version += 1
+                return True
+            if self._snapshot_mtime is None:
+                # Rien n'a encore été chargé
+                return False
+            journal_size = self.changes_path.stat().st_size if self.changes_path.exists() else 0
+            if self.json_path.stat().st_mtime != self._snapshot_mtime or journal_size < self._changes_offset:
+                return self._patch_snapshot()
+
+            records = self._read_changes()
+            if not records:
+                return False
+            # Dimensions du client existant, comme _merge_records (compaction)
+            dimensions = self._client_dimensions
+            for r in records:
+                dimensions.setdefault(r['nom'], (r.get('activite', ''), r.get('localite', '')))
+            rows = [self._history_to_row(
+                {'nom': r['nom'], 'activite': dimensions[r['nom']][0], 'localite': dimensions[r['nom']][1]},
+                self._record_history(r)
+            ) for r in records]
+            clients = {row['Client'] for row in rows}
+            blocks = None
+            if self._store is not None:
+                self._store.upsert_rows(rows)
+                self._data = None
+            elif self._data is not None:
+                # Lignes actuelles de ces clients, remplacées ou complétées par le journal
+                added = self._rows_frame(rows)
+                current = self._data.take(self._client_positions(clients))
+                blocks = pd.concat([current, added], ignore_index=True).drop_duplicates(subset=['Client', 'date'], keep='last')
+                self._splice_clients(clients, blocks)
+            # Le contenu de ces clients ne correspond plus à leur empreinte du snapshot
+            self._client_hashes.update(dict.fromkeys(clients))
+            self._patch_time_series(clients, blocks)
+            self.version += 1
+            logger.info(f"{len(records)} enregistrement(s) intégré(s) depuis le journal")
+            return True
+
+    def _patch_snapshot(self) -> bool:
+        """
+        Applique un nouveau snapshot en ne touchant que les clients modifiés.
+
+        Le contenu de chaque client est comparé à l'empreinte connue : seules les
+        lignes des clients ajoutés, modifiés ou supprimés sont remplacées, dans le
+        DataFrame (voir _splice_clients), la base SQLite et le cube des séries. Le
+        nouveau snapshot est lu et chaque client hashé : c'est ce qui permet de
+        savoir lesquels ont changé.
+
+        Returns:
+            True si les données ont changé
+        """
+        json_data = self._read_current_state()
+        hashes = {client['nom']: self._client_hash(client) for client in json_data['clients']}
+        changed = {nom for nom, h in hashes.items() if self._client_hashes.get(nom) != h}
+        removed = set(self._client_hashes) - set(hashes)
+        self._client_hashes = hashes
+        if not changed and not removed:
+            return False
+
+        rows = [
+            self._history_to_row(client, hist)
+            for client in json_data['clients'] if client['nom'] in changed
+            for hist in client['historique']
+        ]
+        blocks = None
+        if self._store is not None:
+            self._store.replace_clients(changed | removed, rows)
+            self._data = None
+        elif self._data is not None:
+            blocks = self._rows_frame(rows)
+            self._splice_clients(changed | removed, blocks)
+        self._patch_time_series(changed | removed, blocks)
+        self.version += 1
+        logger.info(f"Nouveau snapshot : {len(changed)} client(s) modifié(s), {len(removed)} supprimé(s)")
+        return True
+
+    def _patch_time_series(self, clients: set, blocks: Optional[pd.DataFrame]) -> None:
+        """
+        Met à jour dans le cube les séries des clients modifiés.
+
+        Seules les tranches de ces clients sont réécrites. Le cube est modifié en
+        place quand rien d'autre que le loader n'y fait référence ; si une vue
+        renvoyée (get_client_series) ou un calcul en cours (get_time_series) le
+        référence encore, une copie modifiée le remplace et ces lecteurs gardent
+        l'ancienne version intacte. Il est reconstruit (à la demande) si le
+        changement modifie ses axes : client ajouté ou supprimé, nouveau mois ou
+        nouvelle métrique.
+
+        Args:
+            clients: Clients dont les lignes ont été remplacées
+            blocks: Toutes leurs nouvelles lignes (None : DataFrame non chargé)
+        """
+        series = self._series
+        if series is None:
+            return
+        if blocks is None or self._data is None:
+            self._series = None
+            return
+        months = {month: i for i, month in enumerate(series['months'])}
+        if (
+            any(client not in series['clients'] for client in clients)
+            or set(clients) != set(blocks['Client'].unique())
+            or any(month not in months for month in blocks['date'].unique())
+            or any(col not in series['metrics'] and col not in DIMENSION_COLUMNS for col in blocks.columns)
+        ):
+            self._series = None
+            return
+
+        metrics = list(series['metrics'])
+        values = widen(blocks.reindex(columns=metrics)).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        client_codes = blocks['Client'].map(series['clients']).to_numpy()
+        month_codes = blocks['date'].map(months).to_numpy()
+        # Références attendues : self._series, la variable locale et l'argument de
+        # getrefcount pour le dictionnaire ; le dictionnaire et l'argument pour le cube
+        in_use = sys.getrefcount(series) > 3 or sys.getrefcount(series['cube']) > 2
+        cube = series['cube'].copy() if in_use else series['cube']
+        cube.flags.writeable = True
+        cube[[series['clients'][client] for client in clients]] = np.nan
+        cube[client_codes, month_codes, :] = values
+        cube.flags.writeable = False
+        if in_use:
+            self._series = {**series, 'cube': cube}
+
+    def compact(self) -> int:
+        """
+        Réécrit le snapshot JSON avec le journal intégré, puis retire ces lignes du journal.
+
+        Le journal est verrouillé pendant la compaction (voir _journal_lock) : les
+        ajouts d'autres processus attendent et ne peuvent pas être perdus. Sans
+        fcntl (Windows), l'ingestion doit être arrêtée pendant la compaction.
+
+        Returns:
+            Nombre d'enregistrements intégrés au snapshot
+        """
+        with self._lock, self._journal_lock():
+            records, offset = self._read_changes_from(0)
+            if not records:
+                return 0
+            json_data = self._merge_records(self._read_snapshot(), records)
+            tmp_path = self.json_path.with_suffix(".json.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(json_data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.json_path)
+
+            # Conserver une dernière ligne incomplète, non consommée par la lecture
+            with open(self.changes_path, 'rb') as f:
+                f.seek(offset)
+                remaining = f.read()
+            tmp_changes = self.changes_path.with_suffix(".tmp")
+            tmp_changes.write_bytes(remaining)
+            os.replace(tmp_changes, self.changes_path)
+            logger.info(f"Compaction : {len(records)} enregistrement(s) intégré(s) dans {self.json_path}")
+            return len(records)
+
+    def filter_data(self, start: Optional[str] = None, end: Optional[str] = None, client: Optional[str] = None,
+                    activite: Optional[str] = None, localite: Optional[str] = None) -> pd.DataFrame:
+        """
+        Récupère les lignes correspondant aux filtres.
+
+        Client et plage de mois sont résolus par recherche dichotomique dans l'index
+        trié (voir _freeze). Sans filtre effectif, le DataFrame en cache est renvoyé
+        tel quel ; un client sur une plage de mois est une tranche. Le résultat est
+        en lecture seule (partagé).
+
+        Args:
+            start: Mois de début inclus ('YYYY-MM')
+            end: Mois de fin inclus ('YYYY-MM')
+            client: Nom du client
+            activite: Activité
+            localite: Localité
+        """
+        filters = {'start': start, 'end': end, 'client': client, 'activite': activite, 'localite': localite}
+        if self.backend == "sqlite":
+            return add_derived_metrics(self.get_store().filter(**filters))
+        data, first, last = self._client_ranges(start, end, client)
+        lengths = last - first
+
+        if client is not None:
+            data = data.iloc[first[0]:last[0]] if len(first) else data.iloc[0:0]
+        elif lengths.sum() < len(data):
+            # Concaténation des tranches des clients, sans parcourir les lignes exclues
+            rows = np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            data = data.take(rows)
+
+        mask = np.ones(len(data), dtype=bool)
+        for key, column in FILTER_COLUMNS.items():
+            if key != 'client' and filters[key] is not None:
+                mask &= (data[column] == filters[key]).to_numpy()
+        return data if mask.all() else data[mask]
+
+    def _client_ranges(self, start: Optional[str], end: Optional[str], client: Optional[str]) -> tuple:
+        """
+        Tranches [premier, dernier[ de chaque client retenu sur la plage de mois,
+        par deux recherches dichotomiques dans l'index trié (voir _freeze).
+
+        Returns:
+            Tuple (DataFrame en cache, débuts, fins)
+        """
+        with self._lock:
+            data = self.get_data()
+            index = self._row_index
+        stride = index['stride']
+        if client is not None:
+            if client not in index['clients']:
+                return data, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            codes = np.array([index['clients'][client]], dtype=np.int64)
+        else:
+            # Codes croissants, avec des trous après la suppression de clients (voir _splice_clients)
+            codes = np.fromiter(index['clients'].values(), dtype=np.int64, count=len(index['clients']))
+        # Bornes ramenées dans [0, stride - 1] : une borne hors des données ne déborde pas sur le client voisin
+        low = max(month_ordinal(start), 0) if start else 0
+        high = min(month_ordinal(end), stride - 1) if end else stride - 1
+        if low > high:
+            return data, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        first = np.searchsorted(index['key'], codes * stride + low, side='left')
+        last = np.searchsorted(index['key'], codes * stride + high, side='right')
+        return data, first, last
+
+    def filter_positions(self, start: Optional[str] = None, end: Optional[str] = None, client: Optional[str] = None,
+                         activite: Optional[str] = None, localite: Optional[str] = None) -> np.ndarray:
+        """
+        Positions, dans le DataFrame en cache (get_data), des lignes correspondant aux filtres.
+
+        Mêmes lignes et même ordre que filter_data, sans copier aucune ligne : un
+        export peut ensuite lire la sélection par tranches. Backends pandas et shared.
+        """
+        if self.backend == "sqlite":
+            raise ValueError("filter_positions n'est pas disponible avec le backend sqlite (voir SQLiteStore.iter_filter)")
+        data, first, last = self._client_ranges(start, end, client)
+        lengths = last - first
+        rows = np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        filters = {'activite': activite, 'localite': localite}
+        for key, value in filters.items():
+            if value is not None:
+                rows = rows[data[FILTER_COLUMNS[key]].to_numpy()[rows] == value]
+        return rows
+
+    def aggregate(self, sums: List[str] = (), means: List[str] = (), by: Optional[List[str]] = None,
+                  derived: List[str] = (), **filters) -> pd.DataFrame:
+        """
+        Calcule sommes et moyennes de métriques, éventuellement groupées par dimension.
+
+        Args:
+            sums: Métriques à sommer
+            means: Métriques à moyenner
+            by: Dimensions de regroupement (Client, Activité, Localité, date)
+            derived: Métriques dérivées, agrégées selon leur définition (somme ou
+                ratio des sommes, voir utils/derived_metrics.py)
+            **filters: Mêmes filtres que filter_data
+        """
+        derived = list(derived)
+        # Les métriques dérivées sont recalculées à partir des sommes de leurs entrées
+        inputs = [col for col in base_columns(derived) if col not in sums]
+        sums = list(sums) + inputs
+        if self.backend == "sqlite":
+            result = self.get_store().aggregate(sums, means, by, count=bool(derived), **filters)
+        else:
+            data = self.filter_data(**filters)
+            agg = {col: 'sum' for col in sums if col in data.columns}
+            agg.update({col: 'mean' for col in means if col in data.columns})
+            numeric = widen(data[list(agg)].apply(pd.to_numeric, errors='coerce'))
+            if by:
+                grouped = numeric.groupby([data[dim] for dim in by], observed=True)
+                result = grouped.agg(agg)
+                if derived:
+                    result[ROW_COUNT] = grouped.size()
+                result = result.reset_index()
+            else:
+                result = numeric.agg(agg).to_frame().T
+                if derived:
+                    result[ROW_COUNT] = len(numeric)
+        if not derived:
+            return result
+        return aggregate_derived(result, derived).drop(columns=[ROW_COUNT] + inputs)
+
+    def get_channel_block(self, **filters) -> dict:
+        """
+        Bloc (ligne × canal × métrique) des lignes filtrées, métriques alignées entre canaux.
+
+        Voir utils/channel_block.py ; les lignes sont dans l'ordre de filter_data.
+        """
+        return build_channel_block(self.filter_data(**filters))
+
+    def get_channel_totals(self, **filters) -> pd.DataFrame:
+        """Totaux de chaque métrique par canal (une ligne par canal, NaN si le canal n'a pas la métrique)."""
+        return channel_totals(self.get_channel_block(**filters))
+
+    def get_metric_columns(self) -> List[str]:
+        """Colonnes de métriques disponibles : chargées, puis dérivées calculables."""
+        loaded = self.get_store().metrics if self.backend == "sqlite" else [
+            col for col in self.get_data().columns if col not in DIMENSION_COLUMNS and col not in DERIVED_METRICS
+        ]
+        derived = [name for name in DERIVED_METRICS if set(base_columns([name])) <= set(loaded)]
+        return list(loaded) + derived
+
+    def get_dimension_values(self, column: str, **filters) -> List[str]:
+        """Valeurs distinctes triées d'une dimension (listes des sélecteurs), avec filtres optionnels."""
+        if self.backend == "sqlite":
+            return self.get_store().distinct(column, **filters)
+        data = self.filter_data(**filters) if any(v is not None for v in filters.values()) else self.get_data()
+        if column not in data.columns:
+            raise ValueError(f"La colonne {column} n'existe pas")
+        return sorted(data[column].dropna().unique().tolist())
 
     def get_clients(self):
-        if self._data is None:
-            self._data = self._load_json_data()
-        return self._data['Client'].unique().tolist()
+        return self.get_dimension_values('Client')
 
     def get_activities(self):
-        if self._data is None:
-            self._data = self._load_json_data()
-        return self._data['Activité'].unique().tolist()
+        return self.get_dimension_values('Activité')
 
     def get_localities(self):
-        if self._data is None:
-            self._data = self._load_json_data()
-        return self._data['Localité'].unique().tolist()
+        return self.get_dimension_values('Localité')
 
     def get_unique_values(self, column: str) -> List[str]:
-        if self._data is None:
-            self._data = self._load_json_data()
-        if column not in self._data.columns:
-            raise ValueError(f"La colonne {column} n'existe pas")
-        return sorted(self._data[column].unique().tolist())
+        return self.get_dimension_values(column)
     
     def get_metric_summary(self, metric: str, client: Optional[str] = None) -> dict:
-        if self._data is None:
-            self._data = self._load_json_data()
         data = self.get_data()
         if metric not in data.columns:
             raise ValueError(f"La métrique {metric} n'existe pas")
+        data = widen(data[[metric]])
         return {
             'total': data[metric].sum(),
             'moyenne': data[metric].mean(),
             'min': data[metric].min(),
             'max': data[metric].max(),
             'ecart_type': data[metric].std()
-        } 
\ No newline at end of file
+        }
+
+    def _build_time_series(self) -> dict:
+        """
+        Construit le cube dense (client × mois × métrique) des valeurs numériques.
+
+        Les mois absents pour un client, comme les valeurs manquantes ou non
+        numériques, valent NaN (le graphique les laisse vides, les anomalies et
+        les prévisions les ignorent).
+        """
+        data = self.get_data()
+        metrics = [col for col in data.columns if col not in DIMENSION_COLUMNS]
+        client_codes, clients = pd.factorize(data['Client'])
+        month_codes, months = pd.factorize(data['date'], sort=True)
+
+        values = data[metrics].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        cube = np.full((len(clients), len(months), len(metrics)), np.nan)
+        cube[client_codes, month_codes, :] = values
+        cube.flags.writeable = False
+
+        return {
+            'cube': cube,
+            'clients': {client: i for i, client in enumerate(clients)},
+            'months': months.tolist(),
+            'metrics': {metric: i for i, metric in enumerate(metrics)},
+        }
+
+    def get_time_series(self) -> dict:
+        """Récupère le cube (client × mois × métrique), construit une seule fois par version des données."""
+        with self._lock:
+            if self._series is None:
+                self._series = self._build_time_series()
+            return self._series
+
+    def publish_shared(self, shared: SharedDataset) -> None:
+        """Publie la version courante (DataFrame et cube) en mémoire partagée."""
+        with self._lock:
+            shared.publish(self.get_data(), self.get_time_series())
+
+    def get_client_series(self, client: str, columns: List[str]) -> tuple:
+        """
+        Récupère les séries mensuelles d'un client.
+
+        Args:
+            client: Nom du client
+            columns: Colonnes de métriques souhaitées
+
+        Returns:
+            Tuple (libellés des mois 'YYYY-MM', dict colonne → vue numpy en lecture seule).
+            Les colonnes absentes du jeu de données sont ignorées.
+        """
+        if self.backend == "sqlite":
+            # Requête indexée sur (client, date) plutôt qu'un cube de tout l'historique
+            return self.get_store().client_series(client, columns)
+        series = self.get_time_series()
+        if client not in series['clients']:
+            raise ValueError(f"Le client {client} n'existe pas")
+        client_cube = series['cube'][series['clients'][client]]
+        return series['months'], {
+            col: client_cube[:, series['metrics'][col]]
+            for col in columns if col in series['metrics']
+        }
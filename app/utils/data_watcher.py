@@ -0,0 +1,73 @@
+import threading
+import logging
+from pathlib import Path
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+logger = logging.getLogger(__name__)
+
+class _DataFileHandler(FileSystemEventHandler):
+    """Relaie les événements concernant le snapshot JSON ou le journal."""
+
+    def __init__(self, paths: set, callback):
+        self.paths = paths
+        self.callback = callback
+
+    def on_any_event(self, event):
+        # os.replace (compaction) produit un déplacement vers le fichier surveillé
+        touched = {getattr(event, 'src_path', None), getattr(event, 'dest_path', None)}
+        if any(path and Path(path).resolve() in self.paths for path in touched):
+            self.callback()
+
+class DataWatcher:
+    """
+    Surveille `data.json` et son journal, et applique les changements au loader.
+
+    Les événements rapprochés sont regroupés (délai `debounce` en secondes)
+    avant d'appeler `loader.refresh()`, qui ne met à jour que les clients modifiés.
+    """
+
+    def __init__(self, loader, debounce: float = 1.0):
+        self.loader = loader
+        self.debounce = debounce
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        self._observer = None
+
+    def _schedule_refresh(self):
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _refresh(self):
+        try:
+            self.loader.refresh()
+        except Exception as e:
+            # Fichier en cours d'écriture, JSON invalide... : le prochain événement réessaiera
+            logger.warning(f"Rechargement des données impossible : {str(e)}")
+
+    def start(self) -> "DataWatcher":
+        """Démarre la surveillance (thread en arrière-plan)."""
+        paths = {self.loader.json_path.resolve(), self.loader.changes_path.resolve()}
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.schedule(
+            _DataFileHandler(paths, self._schedule_refresh),
+            str(self.loader.json_path.resolve().parent),
+            recursive=False
+        )
+        self._observer.start()
+        logger.info(f"Surveillance de {self.loader.json_path} activée")
+        return self
+
+    def stop(self) -> None:
+        """Arrête la surveillance."""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
@@ -0,0 +1,164 @@
+import logging
+from typing import Iterable, List
+import numpy as np
+import pandas as pd
+from utils.compact import widen
+
+logger = logging.getLogger(__name__)
+
+# Budgets forfaitaires mensuels (par client)
+SITE_BUDGET_MENSUEL = 249
+GMB_BUDGET_MENSUEL = 99
+
+# Métriques dérivées, calculées une seule fois à partir des colonnes chargées.
+#
+# Deux sémantiques d'agrégation, déclarées explicitement :
+#   - 'sum'   : somme de colonnes (`terms`) et/ou forfait par ligne client-mois
+#               (`constant`) ; l'agrégat est la somme des valeurs par ligne
+#   - 'ratio' : `numerator` / `denominator` ; l'agrégat est le ratio des sommes
+#               (et non la moyenne des ratios mensuels), 0 si le dénominateur est nul
+#
+# Les définitions peuvent s'appuyer sur des métriques dérivées déclarées plus haut.
+DERIVED_METRICS = {
+    # Site
+    'site_contacts_total': {'aggregation': 'sum', 'terms': ['site_nombre_appels', 'site_formulaires']},
+    'site_budget': {'aggregation': 'sum', 'constant': SITE_BUDGET_MENSUEL},
+    'site_ctr_global': {'aggregation': 'ratio', 'numerator': 'site_visites', 'denominator': 'site_impressions'},
+    'site_taux_conversion_global': {'aggregation': 'ratio', 'numerator': 'site_contacts_total', 'denominator': 'site_visites'},
+    # Google Ads
+    'google_ads_ctr_global': {'aggregation': 'ratio', 'numerator': 'google_ads_clics', 'denominator': 'google_ads_impressions'},
+    'google_ads_taux_conversion_global': {'aggregation': 'ratio', 'numerator': 'google_ads_contacts', 'denominator': 'google_ads_clics'},
+    'google_ads_cout_contact_global': {'aggregation': 'ratio', 'numerator': 'google_ads_budget', 'denominator': 'google_ads_contacts'},
+    # Meta Ads
+    'meta_ads_ctr_global': {'aggregation': 'ratio', 'numerator': 'meta_ads_clics', 'denominator': 'meta_ads_impressions'},
+    'meta_ads_taux_conversion_global': {'aggregation': 'ratio', 'numerator': 'meta_ads_contacts', 'denominator': 'meta_ads_clics'},
+    'meta_ads_cout_contact_global': {'aggregation': 'ratio', 'numerator': 'meta_ads_budget', 'denominator': 'meta_ads_contacts'},
+    # GMB
+    'gmb_contacts': {'aggregation': 'sum', 'terms': ['gmb_appels', 'gmb_reservations']},
+    'gmb_budget': {'aggregation': 'sum', 'constant': GMB_BUDGET_MENSUEL},
+    'gmb_ctr_global': {'aggregation': 'ratio', 'numerator': 'gmb_clics_site', 'denominator': 'gmb_impressions'},
+    'gmb_taux_conversion_global': {'aggregation': 'ratio', 'numerator': 'gmb_appels', 'denominator': 'gmb_impressions'},
+    'gmb_cout_contact_global': {'aggregation': 'ratio', 'numerator': 'gmb_budget', 'denominator': 'gmb_contacts'},
+    # Tous canaux
+    'budget_ads': {'aggregation': 'sum', 'terms': ['google_ads_budget', 'meta_ads_budget']},
+    'budget_total': {'aggregation': 'sum', 'terms': ['budget_ads', 'gmb_budget']},
+    'contacts_total': {'aggregation': 'sum', 'terms': ['site_contacts', 'google_ads_contacts', 'meta_ads_contacts', 'gmb_contacts']},
+    'cout_contact_ads': {'aggregation': 'ratio', 'numerator': 'budget_ads', 'denominator': 'contacts_total'},
+    'cout_contact_total': {'aggregation': 'ratio', 'numerator': 'budget_total', 'denominator': 'contacts_total'},
+}
+
+# Colonne du nombre de lignes client-mois dans les agrégats (forfaits mensuels)
+ROW_COUNT = '_lignes'
+
+def _ratio(numerator, denominator):
+    """Ratio vectorisé, 0 lorsque le dénominateur est nul."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return result
+
+def _dependencies(name: str) -> List[str]:
+    definition = DERIVED_METRICS[name]
+    if definition['aggregation'] == 'ratio':
+        return [definition['numerator'], definition['denominator']]
+    return list(definition.get('terms', []))
+
+def base_columns(names: Iterable[str]) -> List[str]:
+    """Colonnes chargées nécessaires au calcul des métriques dérivées données."""
+    columns = []
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in DERIVED_METRICS:
+            pending.extend(_dependencies(name))
+        elif name not in columns:
+            columns.append(name)
+    return columns
+
+def metric_inputs(name: str) -> List[str]:
+    """Colonnes (chargées ou dérivées) dont une métrique dépend, directement ou non."""
+    inputs = []
+    pending = _dependencies(name) if name in DERIVED_METRICS else []
+    while pending:
+        column = pending.pop()
+        if column not in inputs:
+            inputs.append(column)
+            if column in DERIVED_METRICS:
+                pending.extend(_dependencies(column))
+    return inputs
+
+def add_derived_metrics(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute les colonnes dérivées à un DataFrame de lignes client-mois.
+
+    Les colonnes déjà présentes sont conservées ; une métrique dont une entrée
+    manque n'est pas calculée.
+
+    Returns:
+        Nouveau DataFrame (l'original n'est pas modifié)
+    """
+    derived = {}
+    for name, definition in DERIVED_METRICS.items():
+        if name in data.columns:
+            continue
+        inputs = _dependencies(name)
+        columns = {col: derived[col] if col in derived else data[col] for col in inputs if col in derived or col in data.columns}
+        if len(columns) < len(inputs):
+            logger.debug(f"Métrique dérivée {name} ignorée : colonne(s) manquante(s)")
+            continue
+        values = {col: pd.to_numeric(values, errors='coerce') for col, values in columns.items()}
+        if definition['aggregation'] == 'ratio':
+            derived[name] = _ratio(values[definition['numerator']], values[definition['denominator']])
+        else:
+            total = np.full(len(data), float(definition.get('constant', 0)))
+            for col in inputs:
+                total = total + np.nan_to_num(np.asarray(values[col], dtype=np.float64))
+            derived[name] = total
+    return data.assign(**derived) if derived else data
+
+def derived_total(data: pd.DataFrame, name: str) -> float:
+    """
+    Valeur agrégée d'une métrique dérivée sur un ensemble de lignes (colonnes déjà calculées).
+
+    Les métriques 'sum' sont sommées ; les métriques 'ratio' sont le ratio des sommes.
+    """
+    definition = DERIVED_METRICS[name]
+    if definition['aggregation'] == 'ratio':
+        return float(_ratio(
+            derived_total(data, definition['numerator']) if definition['numerator'] in DERIVED_METRICS else widen(data[definition['numerator']]).sum(),
+            derived_total(data, definition['denominator']) if definition['denominator'] in DERIVED_METRICS else widen(data[definition['denominator']]).sum()
+        ))
+    return float(widen(data[name]).sum())
+
+def aggregate_derived(sums: pd.DataFrame, names: Iterable[str]) -> pd.DataFrame:
+    """
+    Calcule des métriques dérivées à partir d'agrégats.
+
+    Args:
+        sums: Sommes des colonnes chargées (voir base_columns), avec le nombre
+            de lignes client-mois dans la colonne ROW_COUNT si un forfait est utilisé
+        names: Métriques dérivées à calculer
+
+    Returns:
+        DataFrame des agrégats complété par les métriques dérivées
+    """
+    values = {}
+
+    def evaluate(name):
+        if name not in DERIVED_METRICS:
+            return sums[name].to_numpy(dtype=np.float64)
+        if name not in values:
+            definition = DERIVED_METRICS[name]
+            if definition['aggregation'] == 'ratio':
+                values[name] = _ratio(evaluate(definition['numerator']), evaluate(definition['denominator']))
+            else:
+                total = np.zeros(len(sums))
+                if 'constant' in definition:
+                    total = total + definition['constant'] * sums[ROW_COUNT].to_numpy(dtype=np.float64)
+                for col in definition.get('terms', []):
+                    total = total + np.nan_to_num(evaluate(col))
+                values[name] = total
+        return values[name]
+
+    return sums.assign(**{name: evaluate(name) for name in names})
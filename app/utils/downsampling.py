@@ -0,0 +1,48 @@
+import numpy as np
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Sélectionne les points à conserver selon l'algorithme LTTB
+    (Largest-Triangle-Three-Buckets), qui préserve la forme de la série.
+
+    Les abscisses sont supposées régulièrement espacées (une valeur par période).
+
+    Args:
+        y: Valeurs de la série (les NaN sont traités comme 0 pour le choix des points)
+        n_out: Nombre de points souhaités (au moins 3)
+
+    Returns:
+        Indices triés des points retenus (premier et dernier point toujours inclus)
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    x = np.arange(n, dtype=np.float64)
+
+    # Découpage des points intérieurs en n_out - 2 seaux
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Moyenne de chaque seau, calculée d'un seul coup via les sommes cumulées
+    cumsum = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.diff(edges)
+    bucket_y = (cumsum[edges[1:]] - cumsum[edges[:-1]]) / counts
+    bucket_x = (edges[1:] + edges[:-1] - 1) / 2
+    # Le « seau suivant » du dernier seau est le dernier point
+    next_x = np.append(bucket_x[1:], x[-1])
+    next_y = np.append(bucket_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Aire du triangle (point précédent retenu, candidat, moyenne du seau suivant)
+        areas = np.abs(
+            (x[previous] - next_x[i]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[i] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
@@ -0,0 +1,110 @@
+import logging
+from typing import BinaryIO, Iterable, Iterator, Optional
+import numpy as np
+import pandas as pd
+from utils.derived_metrics import add_derived_metrics
+
+logger = logging.getLogger(__name__)
+
+# Formats d'export : libellé → identifiant
+EXPORT_FORMATS = {
+    "CSV": 'csv',
+    "CSV (format français)": 'csv_fr',
+    "Parquet": 'parquet',
+}
+
+# Extension et type MIME de chaque format
+EXPORT_FILES = {
+    'csv': ('csv', 'text/csv'),
+    'csv_fr': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+# Lignes lues, converties et écrites à la fois : la mémoire utilisée ne dépend pas de la sélection
+EXPORT_CHUNK_ROWS = 20_000
+
+def frame_chunks(data: pd.DataFrame, positions: Optional[np.ndarray] = None,
+                 chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Tranches successives des lignes `positions` de `data` (toutes par défaut).
+
+    Seule la tranche en cours est copiée ; `data` n'est jamais matérialisé en entier.
+    """
+    n_rows = len(data) if positions is None else len(positions)
+    if n_rows == 0:
+        # Sélection vide : une tranche vide, pour écrire tout de même l'en-tête (ou le schéma)
+        yield data.iloc[0:0]
+    for begin in range(0, n_rows, chunk_rows):
+        if positions is None:
+            yield data.iloc[begin:begin + chunk_rows]
+        else:
+            yield data.take(positions[begin:begin + chunk_rows])
+
+def loader_chunks(loader, chunk_rows: int = EXPORT_CHUNK_ROWS, **filters) -> Iterator[pd.DataFrame]:
+    """
+    Lignes filtrées du loader par tranches (mêmes lignes et même ordre que filter_data).
+
+    Backends pandas et shared : positions de la sélection dans le DataFrame en
+    cache, lues tranche par tranche. Backend sqlite : requêtes paginées, les
+    métriques dérivées sont calculées sur chaque tranche.
+    """
+    if loader.backend == "sqlite":
+        for chunk in loader.get_store().iter_filter(chunk_rows, **filters):
+            yield add_derived_metrics(chunk)
+        return
+    yield from frame_chunks(loader.get_data(), loader.filter_positions(**filters), chunk_rows)
+
+def write_csv(chunks: Iterable[pd.DataFrame], sink: BinaryIO, french: bool = False) -> int:
+    """
+    Écrit les tranches en CSV UTF-8 dans `sink` (fichier binaire).
+
+    Args:
+        french: Séparateur ';' et virgule décimale (ouverture directe dans Excel
+            en français), avec l'indicateur d'ordre des octets UTF-8
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    options = {'sep': ';', 'decimal': ','} if french else {}
+    rows = 0
+    for chunk in chunks:
+        text = chunk.to_csv(index=False, header=rows == 0, **options)
+        sink.write(text.encode('utf-8-sig' if french and rows == 0 else 'utf-8'))
+        rows += len(chunk)
+    return rows
+
+def write_parquet(chunks: Iterable[pd.DataFrame], sink: BinaryIO) -> int:
+    """
+    Écrit les tranches en Parquet dans `sink` (fichier binaire), un groupe de lignes par tranche.
+
+    Le schéma est celui de la première tranche ; les suivantes y sont converties.
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    # Import différé : pyarrow n'est chargé que pour un export Parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(sink, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def write_export(chunks: Iterable[pd.DataFrame], sink: BinaryIO, export_format: str) -> int:
+    """Écrit les tranches dans le format demandé (voir EXPORT_FORMATS) ; renvoie le nombre de lignes."""
+    if export_format == 'parquet':
+        return write_parquet(chunks, sink)
+    if export_format in ('csv', 'csv_fr'):
+        return write_csv(chunks, sink, french=export_format == 'csv_fr')
+    raise ValueError(f"Format d'export {export_format} non supporté")
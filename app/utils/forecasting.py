@@ -0,0 +1,144 @@
+import logging
+from typing import List
+import numpy as np
+from utils.data_loader import month_ordinal
+from utils.derived_metrics import DERIVED_METRICS
+
+logger = logging.getLogger(__name__)
+
+# Modèles disponibles : libellé → identifiant
+FORECAST_METHODS = {
+    "Lissage de Holt": 'holt',
+    "Tendance linéaire": 'linear',
+}
+
+# Prévisions affichées à côté du graphique d'évolution : libellé → colonne et unité
+FORECAST_SUMMARY = {
+    'Budget': {'column': 'budget_total', 'unit': 'devise'},
+    'Contacts': {'column': 'contacts_total', 'unit': 'nombre'},
+    'Coût par contact': {'column': 'cout_contact_total', 'unit': 'devise'},
+}
+
+# Horizon par défaut : le mois suivant le dernier mois de l'historique
+FORECAST_HORIZON = 1
+# Mois utilisés par la tendance linéaire (les plus récents)
+LINEAR_WINDOW = 12
+# Grille des paramètres de Holt (niveau α, tendance β), choisis par série
+HOLT_GRID = [(alpha, beta) for alpha in (0.2, 0.5, 0.8) for beta in (0.1, 0.3, 0.5)]
+
+def future_months(last_month: str, horizon: int) -> List[str]:
+    """Mois 'YYYY-MM' suivant `last_month`."""
+    start = month_ordinal(last_month) + 1
+    return [f"{(start + h) // 12:04d}-{(start + h) % 12 + 1:02d}" for h in range(horizon)]
+
+def linear_forecast(values: np.ndarray, horizon: int = FORECAST_HORIZON, window: int = LINEAR_WINDOW) -> np.ndarray:
+    """
+    Tendance linéaire (moindres carrés) de toutes les séries à la fois.
+
+    Args:
+        values: Tableau (série × mois × ...), NaN pour les mois absents
+        horizon: Nombre de mois prévus
+
+    Returns:
+        Tableau (série × horizon × ...) ; NaN pour une série de moins de 2 mois renseignés
+    """
+    values = values[:, -window:]
+    n_months = values.shape[1]
+    t = np.arange(n_months, dtype=np.float64).reshape((1, n_months) + (1,) * (values.ndim - 2))
+    valid = ~np.isnan(values)
+    y = np.where(valid, values, 0.0)
+    tv = np.where(valid, t, 0.0)
+    # Sommes des moindres carrés sur les seuls mois renseignés
+    n = valid.sum(axis=1)
+    st, sy = tv.sum(axis=1), y.sum(axis=1)
+    stt, sty = (tv * tv).sum(axis=1), (tv * y).sum(axis=1)
+    denominator = n * stt - st * st
+    slope = np.divide(n * sty - st * sy, denominator, out=np.zeros_like(sy), where=denominator > 0)
+    intercept = np.divide(sy - slope * st, n, out=np.full_like(sy, np.nan), where=n >= 2)
+    steps = np.arange(n_months, n_months + horizon, dtype=np.float64).reshape((1, horizon) + (1,) * (values.ndim - 2))
+    return intercept[:, None] + slope[:, None] * steps
+
+def holt_forecast(values: np.ndarray, horizon: int = FORECAST_HORIZON, grid: List[tuple] = HOLT_GRID) -> np.ndarray:
+    """
+    Lissage exponentiel double (Holt) de toutes les séries à la fois.
+
+    La récursion parcourt l'axe des mois ; chaque pas met à jour le niveau et la
+    tendance de toutes les séries par opérations sur tableaux. Pour chaque
+    série, les paramètres (α, β) de la grille qui minimisent l'erreur de
+    prévision à un mois sont retenus. Un mois absent prolonge la tendance.
+
+    Args:
+        values: Tableau (série × mois × ...), NaN pour les mois absents
+        horizon: Nombre de mois prévus
+
+    Returns:
+        Tableau (série × horizon × ...) ; NaN pour une série sans valeur
+    """
+    shape = values[:, 0].shape
+    best_error = np.full(shape, np.inf)
+    best_level, best_trend = np.full(shape, np.nan), np.zeros(shape)
+    for alpha, beta in grid:
+        level, trend = np.full(shape, np.nan), np.zeros(shape)
+        error = np.zeros(shape)
+        for t in range(values.shape[1]):
+            y = values[:, t]
+            valid = ~np.isnan(y)
+            started = ~np.isnan(level)
+            predicted = level + trend
+            update = started & valid
+            error += np.where(update, (y - predicted) ** 2, 0.0)
+            new_level = np.where(update, alpha * y + (1 - alpha) * predicted, predicted)
+            trend = np.where(update, beta * (new_level - level) + (1 - beta) * trend, trend)
+            # Première valeur d'une série : niveau initial, tendance nulle
+            level = np.where(valid & ~started, y, new_level)
+        better = error < best_error
+        best_error = np.where(better, error, best_error)
+        best_level = np.where(better, level, best_level)
+        best_trend = np.where(better, trend, best_trend)
+    steps = np.arange(1, horizon + 1, dtype=np.float64).reshape((1, horizon) + (1,) * (values.ndim - 2))
+    return best_level[:, None] + best_trend[:, None] * steps
+
+def forecast_series(series: dict, method: str = 'holt', horizon: int = FORECAST_HORIZON) -> dict:
+    """
+    Prévisions des prochains mois pour tous les clients et toutes les métriques du cube.
+
+    Les valeurs sont bornées à 0 (budgets, volumes et taux ne sont pas négatifs) ;
+    les métriques dérivées 'ratio' sont recalculées à partir des prévisions de
+    leur numérateur et de leur dénominateur, comme leurs agrégats.
+
+    Args:
+        series: Cube (client × mois × métrique), voir anomalies.get_metric_cube
+        method: 'holt' ou 'linear'
+        horizon: Nombre de mois prévus
+
+    Returns:
+        Dictionnaire clients, metrics (colonne → indice), months (mois prévus)
+        et forecast (client × horizon × métrique)
+    """
+    if method not in FORECAST_METHODS.values():
+        raise ValueError(f"Méthode de prévision {method} non supportée")
+    cube = series['cube']
+    forecast = holt_forecast(cube, horizon) if method == 'holt' else linear_forecast(cube, horizon)
+    forecast = np.maximum(forecast, 0)
+    metrics = series['metrics']
+    for name, definition in DERIVED_METRICS.items():
+        if definition['aggregation'] == 'ratio' and name in metrics and definition['numerator'] in metrics \
+                and definition['denominator'] in metrics:
+            numerator = forecast[:, :, metrics[definition['numerator']]]
+            denominator = forecast[:, :, metrics[definition['denominator']]]
+            forecast[:, :, metrics[name]] = np.divide(
+                numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0
+            )
+    return {
+        'clients': series['clients'],
+        'metrics': metrics,
+        'months': future_months(series['months'][-1], horizon) if series['months'] else [],
+        'forecast': forecast,
+    }
+
+def client_forecast(forecasts: dict, client: str, columns: List[str]) -> dict:
+    """Prévisions d'un client : colonne → valeurs des mois prévus (colonnes absentes ignorées)."""
+    if client not in forecasts['clients']:
+        return {}
+    client_values = forecasts['forecast'][forecasts['clients'][client]]
+    return {col: client_values[:, forecasts['metrics'][col]] for col in columns if col in forecasts['metrics']}
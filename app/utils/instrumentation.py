@@ -0,0 +1,80 @@
+import sys
+from typing import Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+
+def _column_arrays(frame: pd.DataFrame) -> List[np.ndarray]:
+    """
+    Tableaux numpy des colonnes d'un DataFrame (vues, sans copie sous copy-on-write).
+
+    Une colonne catégorielle est mesurée par ses codes et ses catégories : la
+    convertir en tableau d'objets la recopierait entièrement à chaque mesure.
+    """
+    arrays = []
+    for col in frame.columns:
+        values = frame[col].array
+        if isinstance(values, pd.Categorical):
+            arrays.extend([values.codes, values.categories.to_numpy()])
+        else:
+            arrays.append(frame[col].to_numpy())
+    return arrays
+
+def _buffer_ranges(frames: Iterable[pd.DataFrame]) -> List[Tuple[int, int]]:
+    """Plages d'adresses mémoire occupées par les colonnes des DataFrames partagés."""
+    ranges = []
+    for frame in frames:
+        for array in _column_arrays(frame):
+            start = array.__array_interface__['data'][0]
+            ranges.append((start, start + array.nbytes))
+    return ranges
+
+def owned_bytes(obj, shared: List[Tuple[int, int]]) -> int:
+    """
+    Mémoire propre à un objet, hors tampons partagés.
+
+    Args:
+        obj: DataFrame, tableau numpy, conteneur ou objet quelconque
+        shared: Plages d'adresses partagées (voir _buffer_ranges)
+
+    Returns:
+        Taille en octets ; une colonne qui est une vue sur le jeu de données en
+        cache ne compte pas
+    """
+    if isinstance(obj, pd.DataFrame):
+        return sum(owned_bytes(array, shared) for array in _column_arrays(obj)) + obj.index.nbytes
+    if isinstance(obj, pd.Series):
+        return owned_bytes(obj.to_frame(), shared)
+    if isinstance(obj, np.ndarray):
+        start = obj.__array_interface__['data'][0]
+        if any(low <= start < high for low, high in shared):
+            return 0
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(owned_bytes(value, shared) for value in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(owned_bytes(value, shared) for value in obj)
+    return sys.getsizeof(obj)
+
+def session_memory(objects: dict, shared_frames: Iterable[pd.DataFrame]) -> dict:
+    """
+    Mémoire propre à une session, par objet.
+
+    Args:
+        objects: Objets de la session à mesurer (nom → objet)
+        shared_frames: DataFrames mis en cache et partagés par toutes les sessions
+
+    Returns:
+        Dictionnaire nom → octets, avec le total sous la clé 'total'
+    """
+    shared = _buffer_ranges(shared_frames)
+    report = {name: owned_bytes(obj, shared) for name, obj in objects.items()}
+    report['total'] = sum(report.values())
+    return report
+
+def format_bytes(size: float) -> str:
+    """Formate une taille en octets (Ko, Mo...)."""
+    for unit in ('o', 'Ko', 'Mo'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'o' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} Go"
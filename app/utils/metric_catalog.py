@@ -0,0 +1,152 @@
+import logging
+from typing import Iterable, List, Optional
+from utils.derived_metrics import DERIVED_METRICS
+
+logger = logging.getLogger(__name__)
+
+# Canaux : titre de la grille de KPIs et suffixe des colonnes du tableau des clients
+CHANNELS = {
+    'Site': {'title': "📱 Site Internet", 'suffix': 'Site'},
+    'Google Ads': {'title': "🔍 Google Ads", 'suffix': 'Google'},
+    'Meta Ads': {'title': "📘 Meta Ads", 'suffix': 'Meta'},
+    'GMB': {'title': "📍 Google My Business", 'suffix': 'GMB'},
+}
+
+# Catalogue des métriques : canal → nom affiché → définition
+#   column      : colonne du DataFrame (chargée ou dérivée, voir utils/derived_metrics.py)
+#   aggregation : 'sum', 'mean' ou 'ratio' (ratio des sommes, métrique dérivée)
+#   unit        : 'nombre', 'devise', 'taux' (fraction), 'duree' (secondes),
+#                 'position', 'note_5', 'note_10', 'note_100'
+#   comparison  : métrique de la comparaison des canaux (optionnel)
+#   inverse     : une baisse est une amélioration (variations affichées en vert)
+METRIC_CATALOG = {
+    'Site': {
+        'Impressions': {'column': 'site_impressions', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'impressions'},
+        'Visites': {'column': 'site_visites', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'clics'},
+        'CTR': {'column': 'site_ctr_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'ctr'},
+        'Taux de Rebond': {'column': 'site_taux_rebond', 'aggregation': 'mean', 'unit': 'taux', 'inverse': True},
+        'Durée Moyenne': {'column': 'site_duree_moyenne', 'aggregation': 'mean', 'unit': 'duree'},
+        'Position Moyenne': {'column': 'site_position_moyenne', 'aggregation': 'mean', 'unit': 'position', 'inverse': True},
+        'Appels': {'column': 'site_nombre_appels', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'appels'},
+        'Formulaires': {'column': 'site_formulaires', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'formulaires'},
+        'Contacts': {'column': 'site_contacts_total', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'contacts'},
+        'Coût Contact': {'column': 'site_cout_contact', 'aggregation': 'mean', 'unit': 'devise', 'comparison': 'cout_contact', 'inverse': True},
+        'Taux de Conversion': {'column': 'site_taux_conversion_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'taux_conversion'},
+    },
+    'Google Ads': {
+        'Budget': {'column': 'google_ads_budget', 'aggregation': 'sum', 'unit': 'devise'},
+        'Impressions': {'column': 'google_ads_impressions', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'impressions'},
+        'Clics': {'column': 'google_ads_clics', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'clics'},
+        'CTR': {'column': 'google_ads_ctr_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'ctr'},
+        'Taux de Conversion': {'column': 'google_ads_taux_conversion_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'taux_conversion'},
+        'Appels': {'column': 'google_ads_appels', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'appels'},
+        'Formulaires': {'column': 'google_ads_formulaires', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'formulaires'},
+        'Contacts': {'column': 'google_ads_contacts', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'contacts'},
+        'Coût Contact': {'column': 'google_ads_cout_contact', 'aggregation': 'mean', 'unit': 'devise', 'comparison': 'cout_contact', 'inverse': True},
+        'Quality Score': {'column': 'google_ads_quality_score', 'aggregation': 'mean', 'unit': 'note_100'},
+        'Durée Moyenne': {'column': 'google_ads_durée_moyenne_visite', 'aggregation': 'mean', 'unit': 'duree'},
+        'Taux de Rebond': {'column': 'google_ads_taux_de_rebond', 'aggregation': 'mean', 'unit': 'taux', 'inverse': True},
+    },
+    'Meta Ads': {
+        'Budget': {'column': 'meta_ads_budget', 'aggregation': 'sum', 'unit': 'devise'},
+        'Impressions': {'column': 'meta_ads_impressions', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'impressions'},
+        'Clics': {'column': 'meta_ads_clics', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'clics'},
+        'CTR': {'column': 'meta_ads_ctr_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'ctr'},
+        'Taux de Conversion': {'column': 'meta_ads_taux_conversion_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'taux_conversion'},
+        'Appels': {'column': 'meta_ads_appels', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'appels'},
+        'Formulaires': {'column': 'meta_ads_formulaires', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'formulaires'},
+        'Contacts': {'column': 'meta_ads_contacts', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'contacts'},
+        'Coût Contact': {'column': 'meta_ads_cout_contact', 'aggregation': 'mean', 'unit': 'devise', 'comparison': 'cout_contact', 'inverse': True},
+        'Relevance Score': {'column': 'meta_ads_relevance_score', 'aggregation': 'mean', 'unit': 'note_10'},
+        'Durée Moyenne': {'column': 'meta_ads_durée_moyenne_visite', 'aggregation': 'mean', 'unit': 'duree'},
+        'Taux de Rebond': {'column': 'meta_ads_taux_de_rebond', 'aggregation': 'mean', 'unit': 'taux', 'inverse': True},
+        'Taux d\'Interaction': {'column': 'meta_ads_taux_interaction', 'aggregation': 'mean', 'unit': 'taux'},
+    },
+    'GMB': {
+        'Vues': {'column': 'gmb_impressions', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'impressions'},
+        'Clics Site': {'column': 'gmb_clics_site', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'clics'},
+        'CTR': {'column': 'gmb_ctr_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'ctr'},
+        'Taux de Conversion': {'column': 'gmb_taux_conversion_global', 'aggregation': 'ratio', 'unit': 'taux', 'comparison': 'taux_conversion'},
+        'Itinéraires': {'column': 'gmb_demande_d_itineraire', 'aggregation': 'sum', 'unit': 'nombre'},
+        'Appels': {'column': 'gmb_appels', 'aggregation': 'sum', 'unit': 'nombre', 'comparison': 'appels'},
+        'Réservations': {'column': 'gmb_reservations', 'aggregation': 'sum', 'unit': 'nombre'},
+        'Score Avis': {'column': 'gmb_score_avis', 'aggregation': 'mean', 'unit': 'note_5'},
+        'Nombre Avis': {'column': 'gmb_nombre_avis', 'aggregation': 'sum', 'unit': 'nombre'},
+        'Taux d\'Interaction': {'column': 'gmb_taux_d_interaction', 'aggregation': 'mean', 'unit': 'taux'},
+        'Taux d\'Appel': {'column': 'gmb_taux_d_appel', 'aggregation': 'mean', 'unit': 'taux'},
+        'Taux de Réservation': {'column': 'gmb_taux_de_reservation', 'aggregation': 'mean', 'unit': 'taux'},
+        'Vues Meta Mobile': {'column': 'gmb_vues_meta_adsps_mobile', 'aggregation': 'sum', 'unit': 'nombre'},
+        'Vues Meta Desktop': {'column': 'gmb_vues_meta_adsps_desktop', 'aggregation': 'sum', 'unit': 'nombre'},
+        'Vues Google Mobile': {'column': 'gmb_vues_recherche_google_mobile', 'aggregation': 'sum', 'unit': 'nombre'},
+        'Vues Google Desktop': {'column': 'gmb_vues_recherche_google_desktop', 'aggregation': 'sum', 'unit': 'nombre'},
+    },
+}
+
+def compile_plan(columns: Iterable[str], catalog: Optional[dict] = None) -> dict:
+    """
+    Compile le plan d'exécution du catalogue pour le schéma chargé.
+
+    Chaque définition est validée une fois : colonne absente du schéma, ou
+    agrégation 'ratio' sur une colonne qui n'est pas un ratio dérivé. Les
+    métriques invalides sont écartées (avec un avertissement) au lieu d'être
+    vérifiées à chaque affichage.
+
+    Args:
+        columns: Colonnes disponibles (chargées et dérivées calculables)
+        catalog: Catalogue à compiler (METRIC_CATALOG par défaut)
+
+    Returns:
+        Dictionnaire :
+            catalog     : catalogue restreint aux métriques valides
+            sums, means : colonnes à sommer / moyenner, sans doublon
+            derived     : métriques dérivées à agréger selon leur définition
+            missing     : métriques écartées ("canal / nom : raison")
+    """
+    catalog = METRIC_CATALOG if catalog is None else catalog
+    columns = set(columns)
+    plan = {'catalog': {}, 'sums': [], 'means': [], 'derived': [], 'missing': []}
+    for channel, metrics in catalog.items():
+        valid = {}
+        for name, definition in metrics.items():
+            column, aggregation = definition['column'], definition['aggregation']
+            if column not in columns:
+                plan['missing'].append(f"{channel} / {name} : colonne {column} absente")
+                continue
+            if (aggregation == 'ratio') != (DERIVED_METRICS.get(column, {}).get('aggregation') == 'ratio'):
+                plan['missing'].append(f"{channel} / {name} : agrégation {aggregation} incompatible avec {column}")
+                continue
+            valid[name] = definition
+            target = 'derived' if column in DERIVED_METRICS else ('sums' if aggregation == 'sum' else 'means')
+            if column not in plan[target]:
+                plan[target].append(column)
+        plan['catalog'][channel] = valid
+    for reason in plan['missing']:
+        logger.warning(f"Métrique du catalogue ignorée : {reason}")
+    return plan
+
+def plan_reductions(plan: dict) -> dict:
+    """Arguments de DataLoader.aggregate correspondant au plan (sums, means, derived)."""
+    return {'sums': plan['sums'], 'means': plan['means'], 'derived': plan['derived']}
+
+def comparison_metrics(plan: dict) -> dict:
+    """
+    Métriques de la comparaison des canaux.
+
+    Returns:
+        Dictionnaire métrique → {'unit': unité, 'columns': {canal: colonne}}
+    """
+    comparisons = {}
+    for channel, metrics in plan['catalog'].items():
+        for definition in metrics.values():
+            if 'comparison' in definition:
+                comparison = comparisons.setdefault(definition['comparison'], {'unit': definition['unit'], 'columns': {}})
+                comparison['columns'][channel] = definition['column']
+    return comparisons
+
+def table_columns(plan: dict, channels: Optional[List[str]] = None) -> dict:
+    """Colonnes du tableau des clients : libellé → définition, pour les canaux donnés (tous par défaut)."""
+    return {
+        f"{name} {CHANNELS[channel]['suffix']}": definition
+        for channel, metrics in plan['catalog'].items() if channels is None or channel in channels
+        for name, definition in metrics.items()
+    }
@@ -0,0 +1,214 @@
+import logging
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from utils.data_loader import DataLoader, month_ordinal, month_ordinals
+from utils.derived_metrics import ROW_COUNT, aggregate_derived, base_columns
+
+logger = logging.getLogger(__name__)
+
+# Modes de comparaison proposés : libellé → décalage ('period' : durée de la période sélectionnée)
+COMPARISON_MODES = {
+    "Période précédente": 'period',
+    "Année précédente (YoY)": 12,
+    "Aucune": None,
+}
+
+def build_month_layout(data: pd.DataFrame, sums: List[str], means: List[str]) -> dict:
+    """
+    Construit la disposition mensuelle cumulée (client × mois calendaire × colonne).
+
+    Le long de l'axe des mois, chaque cellule contient la somme des mois
+    précédents (avec une tranche de zéros en tête) : la somme d'une fenêtre de
+    mois, pour tous les clients et toutes les colonnes, est une seule
+    différence de deux tranches. Les mois absents valent 0 ; les colonnes
+    moyennées ont en plus le cumul du nombre de valeurs renseignées.
+
+    Args:
+        data: Lignes client-mois (colonnes Client, Activité, Localité, date)
+        sums: Colonnes sommées
+        means: Colonnes moyennées
+
+    Returns:
+        Dictionnaire :
+            clients, activites, localites : dimensions de chaque client
+            first_month, n_months          : premier ordinal de mois et nombre de mois
+            columns                        : colonne → indice (ROW_COUNT : lignes client-mois)
+            means                          : colonnes moyennées → indice dans `counts`
+            values, counts                 : cumuls (client × (n_months + 1) × colonne)
+    """
+    columns = [col for col in dict.fromkeys(list(sums) + list(means)) if col in data.columns]
+    mean_columns = [col for col in dict.fromkeys(means) if col in data.columns]
+    codes, clients = pd.factorize(data['Client'])
+    months = month_ordinals(data['date']) if len(data) else np.zeros(0, dtype=np.int64)
+    first_month = int(months.min()) if len(months) else 0
+    n_months = int(months.max()) - first_month + 1 if len(months) else 0
+    slots = months - first_month + 1
+
+    numeric = data[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    values = np.zeros((len(clients), n_months + 1, len(columns) + 1))
+    values[codes, slots, :-1] = np.nan_to_num(numeric)
+    values[codes, slots, -1] = 1
+    counts = np.zeros((len(clients), n_months + 1, len(mean_columns)))
+    counts[codes, slots, :] = ~np.isnan(numeric[:, [columns.index(col) for col in mean_columns]])
+    np.cumsum(values, axis=1, out=values)
+    np.cumsum(counts, axis=1, out=counts)
+
+    # Dimensions de chaque client (première ligne, dans l'ordre de factorisation)
+    _, first_rows = np.unique(codes, return_index=True)
+    return {
+        'clients': np.asarray(clients, dtype=object),
+        'activites': data['Activité'].to_numpy(dtype=object)[first_rows],
+        'localites': data['Localité'].to_numpy(dtype=object)[first_rows],
+        'first_month': first_month,
+        'n_months': n_months,
+        'columns': {col: i for i, col in enumerate(columns + [ROW_COUNT])},
+        'means': {col: i for i, col in enumerate(mean_columns)},
+        'values': values,
+        'counts': counts,
+    }
+
+def get_month_layout(loader: DataLoader, sums: List[str] = (), means: List[str] = (), derived: List[str] = ()) -> dict:
+    """
+    Disposition mensuelle des réductions données (mêmes arguments que DataLoader.aggregate).
+
+    Avec le backend sqlite, seules les colonnes nécessaires sont lues de la base.
+    """
+    sums = list(sums) + [col for col in base_columns(derived) if col not in sums]
+    if loader.backend == "sqlite":
+        data = loader.get_store().filter(columns=sums + list(means))
+    else:
+        data = loader.get_data()
+    return build_month_layout(data, sums, means)
+
+def comparison_shift(mode, start: str, end: str) -> Optional[int]:
+    """Décalage en mois de la période de comparaison (None : pas de comparaison)."""
+    if mode == 'period':
+        return month_ordinal(end) - month_ordinal(start) + 1
+    return mode
+
+def window_totals(layout: dict, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sommes et nombres de valeurs renseignées de chaque client sur une plage de mois.
+
+    Returns:
+        Tuple (sommes (client × colonne, voir layout['columns']), nombres de
+        valeurs (client × colonne moyennée, voir layout['means']))
+    """
+    low = np.clip(month_ordinal(start) - layout['first_month'], 0, layout['n_months'])
+    high = np.clip(month_ordinal(end) - layout['first_month'] + 1, 0, layout['n_months'])
+    return layout['values'][:, high] - layout['values'][:, low], layout['counts'][:, high] - layout['counts'][:, low]
+
+def reduce_totals(layout: dict, values: np.ndarray, counts: np.ndarray, sums: List[str] = (),
+                  means: List[str] = (), derived: List[str] = (), dimensions: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Met en forme des sommes de la disposition mensuelle (une ligne par groupe).
+
+    Les moyennes sont le rapport des sommes aux nombres de valeurs renseignées
+    et les métriques dérivées sont recalculées à partir des sommes, comme dans
+    DataLoader.aggregate.
+
+    Args:
+        layout: Disposition mensuelle cumulée (voir build_month_layout)
+        values, counts: Sommes (groupe × colonne) et nombres de valeurs (groupe × colonne moyennée)
+        sums, means, derived: Réductions (voir metric_catalog.plan_reductions)
+        dimensions: Colonnes descriptives des groupes, placées en tête
+
+    Returns:
+        DataFrame des réductions, avec le nombre de lignes client-mois (ROW_COUNT)
+    """
+    derived = list(derived)
+    # Les métriques dérivées sont recalculées à partir des sommes de leurs entrées
+    inputs = [col for col in base_columns(derived) if col not in sums]
+    result = dict(dimensions or {})
+    for col in list(sums) + inputs:
+        if col in layout['columns']:
+            result[col] = values[:, layout['columns'][col]]
+    for col in means:
+        if col in layout['means']:
+            count = counts[:, layout['means'][col]]
+            total = values[:, layout['columns'][col]]
+            result[col] = np.divide(total, count, out=np.full(len(count), np.nan), where=count > 0)
+    result[ROW_COUNT] = values[:, layout['columns'][ROW_COUNT]]
+    frame = pd.DataFrame(result)
+    if derived:
+        frame = aggregate_derived(frame, derived).drop(columns=[col for col in inputs if col in frame.columns])
+    return frame
+
+def compare_periods(layout: dict, start: str, end: str, shift: int, sums: List[str] = (),
+                    means: List[str] = (), derived: List[str] = (), by_client: bool = False,
+                    client: Optional[str] = None, activite: Optional[str] = None,
+                    localite: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame, float]:
+    """
+    Agrège la période sélectionnée et la période décalée de `shift` mois, en une passe.
+
+    Mêmes réductions que DataLoader.aggregate (sommes, moyennes des valeurs
+    renseignées, métriques dérivées recalculées à partir des sommes), pour les
+    deux fenêtres et pour tous les clients à la fois.
+
+    Args:
+        layout: Disposition mensuelle cumulée (voir build_month_layout)
+        start: Mois de début inclus ('YYYY-MM')
+        end: Mois de fin inclus ('YYYY-MM')
+        shift: Décalage de la période de comparaison, en mois
+        sums, means, derived: Réductions (voir metric_catalog.plan_reductions)
+        by_client: Une ligne par client (avec ses dimensions) au lieu du total
+        client, activite, localite: Filtres
+
+    Returns:
+        Tuple (période courante, période précédente, couverture) ; la colonne
+        ROW_COUNT donne le nombre de lignes client-mois de chaque fenêtre, la
+        couverture la part des mois de la période précédente compris dans
+        l'historique chargé. La période précédente est ramenée à l'historique :
+        sous une couverture de 1, ses totaux portent sur moins de mois et les
+        variations ne sont pas comparables.
+    """
+    # Bornes des deux fenêtres dans les cumuls, ramenées à la plage chargée
+    low = month_ordinal(start) - layout['first_month']
+    high = month_ordinal(end) - layout['first_month'] + 1
+    bounds = np.clip(np.array([[low, high], [low - shift, high - shift]]), 0, layout['n_months'])
+    coverage = (bounds[1, 1] - bounds[1, 0]) / (high - low) if high > low else 0.0
+
+    selected = np.ones(len(layout['clients']), dtype=bool)
+    for key, value in (('clients', client), ('activites', activite), ('localites', localite)):
+        if value is not None:
+            selected &= layout[key] == value
+
+    # (client × fenêtre × colonne) : différence de deux tranches des cumuls, lues en une indexation
+    cumuls = layout['values'][np.ix_(selected, bounds.ravel())].reshape(int(selected.sum()), 2, 2, -1)
+    window_values = cumuls[:, :, 1] - cumuls[:, :, 0]
+    cumul_counts = layout['counts'][np.ix_(selected, bounds.ravel())].reshape(int(selected.sum()), 2, 2, -1)
+    window_counts = cumul_counts[:, :, 1] - cumul_counts[:, :, 0]
+    if not by_client:
+        window_values = window_values.sum(axis=0, keepdims=True)
+        window_counts = window_counts.sum(axis=0, keepdims=True)
+
+    dimensions = {
+        'Client': layout['clients'][selected],
+        'Activité': layout['activites'][selected],
+        'Localité': layout['localites'][selected],
+    } if by_client else None
+    current, previous = (
+        reduce_totals(layout, window_values[:, period], window_counts[:, period], sums, means, derived, dimensions)
+        for period in range(2)
+    )
+    return current, previous, float(coverage)
+
+def period_deltas(current: pd.DataFrame, previous: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Variation d'une colonne entre deux périodes (une ligne par client).
+
+    Returns:
+        DataFrame (Actuel, Précédent, Variation, Variation %), la variation
+        relative étant NaN lorsque la période précédente est nulle
+    """
+    actuel = current[column].to_numpy(dtype=np.float64)
+    precedent = previous[column].to_numpy(dtype=np.float64)
+    variation = actuel - precedent
+    relative = np.divide(variation, np.abs(precedent), out=np.full(len(variation), np.nan), where=precedent != 0)
+    return pd.DataFrame({
+        'Actuel': actuel,
+        'Précédent': precedent,
+        'Variation': variation,
+        'Variation %': relative * 100,
+    }, index=current.index)
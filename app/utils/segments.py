@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Union
+import numpy as np
+import pandas as pd
+from utils.period_comparison import reduce_totals, window_totals
+
+logger = logging.getLogger(__name__)
+
+# Critères d'un segment : champ de la définition → dimensions des clients dans la disposition mensuelle.
+# Un client appartient au segment s'il satisfait tous les critères renseignés
+# (l'une des valeurs de chaque liste).
+SEGMENT_CRITERIA = {
+    'clients': 'clients',
+    'activites': 'activites',
+    'localites': 'localites',
+}
+
+class SegmentStore:
+    """Définitions des segments enregistrées dans `data/segments.json`."""
+
+    def __init__(self, path: Union[str, Path] = "data/segments.json"):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> List[dict]:
+        """Segments enregistrés, dans l'ordre de création."""
+        if not self.path.exists():
+            return []
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write(self, segments: List[dict]) -> None:
+        # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(segments, ensure_ascii=False, indent=2), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    def save(self, segment: dict) -> None:
+        """
+        Enregistre un segment (remplace celui de même nom).
+
+        Args:
+            segment: {"name", "clients", "activites", "localites"} ; au moins un
+                critère non vide
+        """
+        if not segment.get('name'):
+            raise ValueError("Un segment doit avoir un nom")
+        if not any(segment.get(field) for field in SEGMENT_CRITERIA):
+            raise ValueError(f"Le segment {segment['name']} n'a aucun critère")
+        segment = {'name': segment['name'], **{field: list(segment.get(field) or []) for field in SEGMENT_CRITERIA}}
+        with self._lock:
+            segments = [s for s in self.load() if s['name'] != segment['name']]
+            self._write(segments + [segment])
+
+    def delete(self, name: str) -> None:
+        """Supprime un segment."""
+        with self._lock:
+            self._write([s for s in self.load() if s['name'] != name])
+
+def membership_matrix(layout: dict, segments: List[dict]) -> np.ndarray:
+    """
+    Matrice d'appartenance (segment × client) des clients de la disposition mensuelle.
+
+    Returns:
+        Tableau de 0 et de 1 (float64), prêt pour le produit avec les sommes par client
+    """
+    membership = np.ones((len(segments), len(layout['clients'])), dtype=bool)
+    for i, segment in enumerate(segments):
+        for field, dimension in SEGMENT_CRITERIA.items():
+            if segment.get(field):
+                membership[i] &= np.isin(layout[dimension], segment[field])
+    return membership.astype(np.float64)
+
+def segment_aggregates(layout: dict, segments: List[dict], start: str, end: str, sums: List[str] = (),
+                       means: List[str] = (), derived: List[str] = ()) -> pd.DataFrame:
+    """
+    Réductions de tous les segments sur une plage de mois, en un seul produit matriciel.
+
+    Les sommes de chaque client sur la plage sont lues dans les cumuls de la
+    disposition mensuelle ; le produit de la matrice d'appartenance
+    (segment × client) par ces sommes (client × colonne) donne les sommes de
+    tous les segments à la fois. Moyennes et métriques dérivées en découlent,
+    comme dans DataLoader.aggregate.
+
+    Args:
+        layout: Disposition mensuelle cumulée (voir period_comparison.build_month_layout)
+        segments: Définitions des segments (voir SegmentStore)
+        start: Mois de début inclus ('YYYY-MM')
+        end: Mois de fin inclus ('YYYY-MM')
+        sums, means, derived: Réductions (voir metric_catalog.plan_reductions)
+
+    Returns:
+        DataFrame indexé par nom de segment, avec le nombre de clients (colonne 'Clients')
+    """
+    membership = membership_matrix(layout, segments)
+    values, counts = window_totals(layout, start, end)
+    frame = reduce_totals(
+        layout, membership @ values, membership @ counts, sums, means, derived,
+        {'Segment': [segment['name'] for segment in segments], 'Clients': membership.sum(axis=1).astype(int)}
+    )
+    return frame.set_index('Segment')
@@ -0,0 +1,205 @@
+import json
+import logging
+import time
+from multiprocessing import shared_memory, resource_tracker
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Alignement des tableaux dans le segment partagé
+_ALIGNMENT = 64
+# Taille de l'en-tête de position : longueur (uint64) du JSON de métadonnées
+_PREFIX_SIZE = 8
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Ouvre un segment existant sans le confier au resource_tracker de ce processus."""
+    shm = shared_memory.SharedMemory(name=name)
+    # Sinon le segment serait supprimé à la sortie du premier worker qui l'a ouvert
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+def _unlink(shm: shared_memory.SharedMemory) -> None:
+    """Supprime un segment créé par ce processus."""
+    # Des processus enfants (pool de rapports) partagent le resource_tracker de ce
+    # processus et y ont désinscrit le segment en s'y rattachant : on le réinscrit
+    # pour que la suppression ne soit pas signalée comme inconnue
+    resource_tracker.register(shm._name, 'shared_memory')
+    shm.close()
+    shm.unlink()
+
+def _release(shm: shared_memory.SharedMemory) -> None:
+    """
+    Abandonne un segment sans invalider les vues encore utilisées : la projection
+    est libérée avec le dernier tableau qui la référence.
+    """
+    shm._buf = None
+    shm._mmap = None
+    shm.close()
+
+class SharedDataset:
+    """
+    Jeu de données publié en mémoire partagée pour plusieurs processus Streamlit.
+
+    Un processus éditeur (voir `app/shared_publisher.py`) écrit les colonnes
+    numériques typées (float64), les codes des dimensions et le cube des séries
+    dans un segment `<name>_v<génération>`, précédé d'un en-tête JSON (schéma,
+    dictionnaires des dimensions, position des tableaux). Un petit segment de
+    contrôle `<name>_ctl` contient la génération courante (horodatage en µs,
+    croissant même après un redémarrage de l'éditeur) : changer de version est
+    un simple échange de pointeur, les lecteurs rattachent le nouveau segment à
+    leur prochain rafraîchissement.
+
+    Les workers s'y rattachent en lecture seule et sans copie des valeurs.
+    """
+
+    def __init__(self, name: str = "dashboard"):
+        self.name = name
+        self._segment = None
+        self._control = None
+        self.version = None
+
+    # --- Éditeur -----------------------------------------------------------
+
+    def publish(self, data: pd.DataFrame, series: Optional[dict] = None,
+                dimensions: tuple = ('Client', 'Activité', 'Localité', 'date')) -> int:
+        """
+        Publie une version du jeu de données puis bascule la version courante.
+
+        Args:
+            data: DataFrame à plat (dimensions + métriques)
+            series: Cube des séries (voir DataLoader.get_time_series), optionnel
+            dimensions: Colonnes encodées par dictionnaire
+
+        Returns:
+            Génération publiée
+        """
+        version = time.time_ns() // 1000
+        arrays, dictionaries = {}, {}
+        for column in dimensions:
+            codes, uniques = pd.factorize(data[column])
+            arrays[f"dim:{column}"] = codes.astype(np.int32)
+            dictionaries[column] = [str(value) for value in uniques]
+        metrics = [col for col in data.columns if col not in dimensions]
+        for column in metrics:
+            arrays[f"col:{column}"] = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=np.float64)
+        header = {'version': version, 'n_rows': len(data), 'metrics': metrics, 'dictionaries': dictionaries}
+        if series is not None:
+            arrays['cube'] = np.ascontiguousarray(series['cube'])
+            header['series'] = {
+                'clients': list(series['clients']),
+                'months': series['months'],
+                'metrics': list(series['metrics']),
+            }
+
+        # Position de chaque tableau, après l'en-tête
+        layout, offset = [], 0
+        for key, array in arrays.items():
+            layout.append({'name': key, 'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset})
+            offset = _align(offset + array.nbytes)
+        header['arrays'] = layout
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        data_start = _align(_PREFIX_SIZE + len(header_bytes))
+
+        segment = shared_memory.SharedMemory(
+            name=f"{self.name}_v{version}", create=True, size=data_start + offset
+        )
+        segment.buf[:_PREFIX_SIZE] = np.uint64(len(header_bytes)).tobytes()
+        segment.buf[_PREFIX_SIZE:_PREFIX_SIZE + len(header_bytes)] = header_bytes
+        for entry in layout:
+            array = arrays[entry['name']]
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, offset=data_start + entry['offset'])
+            target[...] = array
+
+        # Bascule atomique : les lecteurs voient soit l'ancienne, soit la nouvelle version
+        if self._control is None:
+            try:
+                self._control = shared_memory.SharedMemory(name=f"{self.name}_ctl", create=True, size=8)
+            except FileExistsError:
+                self._control = _attach(f"{self.name}_ctl")
+        np.ndarray((1,), dtype=np.int64, buffer=self._control.buf)[0] = version
+
+        # L'ancien segment est retiré ; les workers qui l'utilisent gardent leur projection
+        if self._segment is not None:
+            _unlink(self._segment)
+        self._segment = segment
+        self.version = version
+        logger.info(f"Génération {version} publiée en mémoire partagée ({segment.size / 1e6:.1f} Mo)")
+        return version
+
+    def unlink(self) -> None:
+        """Supprime les segments publiés (à l'arrêt de l'éditeur)."""
+        for segment in (self._segment, self._control):
+            if segment is not None:
+                _unlink(segment)
+        self._segment = self._control = None
+
+    # --- Workers -----------------------------------------------------------
+
+    def current_version(self) -> Optional[int]:
+        """Version actuellement publiée (None si aucun éditeur)."""
+        if self._control is None:
+            try:
+                self._control = _attach(f"{self.name}_ctl")
+            except FileNotFoundError:
+                return None
+        return int(np.ndarray((1,), dtype=np.int64, buffer=self._control.buf)[0])
+
+    def attach(self) -> tuple:
+        """
+        Se rattache à la version courante.
+
+        Returns:
+            Tuple (DataFrame dont les métriques sont des vues en lecture seule,
+            cube des séries ou None, version)
+        """
+        for _ in range(3):
+            version = self.current_version()
+            if version is None:
+                raise FileNotFoundError(f"Aucun jeu de données publié sous le nom {self.name}")
+            try:
+                segment = _attach(f"{self.name}_v{version}")
+                break
+            except FileNotFoundError:
+                # Version remplacée entre la lecture du contrôle et l'ouverture : on relit
+                continue
+        else:
+            raise RuntimeError("Le jeu de données partagé change trop vite pour être rattaché")
+
+        header_size = int(np.frombuffer(segment.buf[:_PREFIX_SIZE], dtype=np.uint64)[0])
+        header = json.loads(bytes(segment.buf[_PREFIX_SIZE:_PREFIX_SIZE + header_size]).decode('utf-8'))
+        data_start = _align(_PREFIX_SIZE + header_size)
+        arrays = {}
+        for entry in header['arrays']:
+            array = np.ndarray(tuple(entry['shape']), dtype=np.dtype(entry['dtype']), buffer=segment.buf,
+                               offset=data_start + entry['offset'])
+            array.flags.writeable = False
+            arrays[entry['name']] = array
+
+        columns = {}
+        for column, dictionary in header['dictionaries'].items():
+            # Dimensions décodées localement : références vers les chaînes du dictionnaire
+            columns[column] = np.asarray(dictionary, dtype=object)[arrays[f"dim:{column}"]]
+        for column in header['metrics']:
+            columns[column] = arrays[f"col:{column}"]
+        data = pd.DataFrame(columns, copy=False)
+
+        series = None
+        if 'series' in header:
+            series = {
+                'cube': arrays['cube'],
+                'clients': {client: i for i, client in enumerate(header['series']['clients'])},
+                'months': header['series']['months'],
+                'metrics': {metric: i for i, metric in enumerate(header['series']['metrics'])},
+            }
+
+        # L'ancienne projection reste valide tant que des vues la référencent
+        if self._segment is not None:
+            _release(self._segment)
+        self._segment = segment
+        self.version = header['version']
+        return data, series, header['version']
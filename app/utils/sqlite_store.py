@@ -0,0 +1,278 @@
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Colonnes de dimension exposées par le store, et leur emplacement dans le schéma normalisé
+DIMENSION_SQL = {
+    'Client': 'c.nom',
+    'Activité': 'c.activite',
+    'Localité': 'c.localite',
+    'date': 'm.date',
+}
+
+def _quote(identifier: str) -> str:
+    """Protège un nom de colonne (accents, tirets...) pour SQLite."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+class SQLiteStore:
+    """
+    Stockage des données du dashboard dans une base SQLite (bibliothèque standard).
+
+    Schéma normalisé :
+        clients(id, nom, activite, localite)     index sur activite et localite
+        mesures(client_id, date, <métriques>)    index sur (client_id, date)
+
+    Les filtres et agrégats sont exécutés en SQL : seul le résultat est renvoyé
+    sous forme de DataFrame.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = ":memory:"):
+        self.db_path = str(db_path)
+        # Une seule connexion partagée entre les sessions Streamlit (threads), protégée par un verrou
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._metrics = None
+
+    def is_empty(self) -> bool:
+        """Indique si la base ne contient encore aucune donnée."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'mesures'"
+            ).fetchone()
+        return row[0] == 0
+
+    @property
+    def metrics(self) -> List[str]:
+        """Colonnes de métriques de la table mesures."""
+        if self._metrics is None:
+            with self._lock:
+                columns = [row[1] for row in self._conn.execute("PRAGMA table_info(mesures)")]
+            self._metrics = [col for col in columns if col not in ('client_id', 'date')]
+        return self._metrics
+
+    def load_rows(self, rows: Sequence[dict]) -> None:
+        """
+        (Re)crée les tables à partir de lignes à plat (une par client et par mois).
+
+        Args:
+            rows: Dictionnaires contenant Client, Activité, Localité, date et les métriques
+        """
+        metrics = []
+        for row in rows:
+            for key in row:
+                if key not in DIMENSION_SQL and key not in metrics:
+                    metrics.append(key)
+
+        clients = {}
+        for row in rows:
+            clients.setdefault(row['Client'], (len(clients) + 1, row['Client'], row['Activité'], row['Localité']))
+
+        columns_sql = ", ".join(f"{_quote(col)} REAL" for col in metrics)
+        placeholders = ", ".join("?" for _ in range(len(metrics) + 2))
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                DROP TABLE IF EXISTS mesures;
+                DROP TABLE IF EXISTS clients;
+                CREATE TABLE clients (
+                    id INTEGER PRIMARY KEY,
+                    nom TEXT UNIQUE NOT NULL,
+                    activite TEXT,
+                    localite TEXT
+                );
+                CREATE INDEX idx_clients_activite ON clients(activite);
+                CREATE INDEX idx_clients_localite ON clients(localite);
+            """)
+            self._conn.execute(f"CREATE TABLE mesures (client_id INTEGER NOT NULL REFERENCES clients(id), date TEXT NOT NULL, {columns_sql})")
+            self._conn.execute("CREATE INDEX idx_mesures_client_date ON mesures(client_id, date)")
+            self._conn.execute("CREATE INDEX idx_mesures_date ON mesures(date)")
+            self._conn.executemany("INSERT INTO clients VALUES (?, ?, ?, ?)", clients.values())
+            self._conn.executemany(
+                f"INSERT INTO mesures VALUES ({placeholders})",
+                (
+                    [clients[row['Client']][0], row['date']] + [row.get(col) for col in metrics]
+                    for row in rows
+                )
+            )
+        self._metrics = metrics
+        logger.info(f"Base SQLite chargée : {len(clients)} clients, {len(rows)} lignes")
+
+    def upsert_rows(self, rows: Sequence[dict]) -> None:
+        """
+        Remplace ou ajoute des lignes (client, mois), sans reconstruire les tables.
+
+        Les nouveaux clients et les nouvelles métriques sont ajoutés au schéma.
+        """
+        metrics = self.metrics
+        with self._lock, self._conn:
+            self._upsert(rows, metrics)
+
+    def _upsert(self, rows: Sequence[dict], metrics: List[str]) -> None:
+        """Remplace ou ajoute des lignes dans la transaction en cours (verrou détenu par l'appelant)."""
+        for row in rows:
+            for key in row:
+                if key not in DIMENSION_SQL and key not in metrics:
+                    self._conn.execute(f"ALTER TABLE mesures ADD COLUMN {_quote(key)} REAL")
+                    metrics.append(key)
+            self._conn.execute(
+                "INSERT INTO clients (nom, activite, localite) VALUES (?, ?, ?) "
+                "ON CONFLICT(nom) DO UPDATE SET activite = excluded.activite, localite = excluded.localite",
+                (row['Client'], row['Activité'], row['Localité'])
+            )
+            client_id = self._conn.execute("SELECT id FROM clients WHERE nom = ?", (row['Client'],)).fetchone()[0]
+            self._conn.execute("DELETE FROM mesures WHERE client_id = ? AND date = ?", (client_id, row['date']))
+            self._conn.execute(
+                f"INSERT INTO mesures (client_id, date, {', '.join(_quote(col) for col in metrics)}) "
+                f"VALUES ({', '.join('?' for _ in range(len(metrics) + 2))})",
+                [client_id, row['date']] + [row.get(col) for col in metrics]
+            )
+
+    def replace_clients(self, clients: Iterable[str], rows: Sequence[dict]) -> None:
+        """
+        Supprime toutes les lignes des clients donnés, puis insère leurs nouvelles lignes.
+
+        Une seule transaction : un lecteur voit les anciennes lignes ou les nouvelles,
+        jamais un client sans lignes.
+        """
+        clients = list(clients)
+        metrics = self.metrics
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM mesures WHERE client_id IN (SELECT id FROM clients WHERE nom = ?)",
+                [(client,) for client in clients]
+            )
+            present = {row['Client'] for row in rows}
+            self._conn.executemany(
+                "DELETE FROM clients WHERE nom = ?",
+                [(client,) for client in clients if client not in present]
+            )
+            self._upsert(rows, metrics)
+
+    def _where(self, start: Optional[str] = None, end: Optional[str] = None,
+               client: Optional[str] = None, activite: Optional[str] = None,
+               localite: Optional[str] = None) -> tuple:
+        """Construit la clause WHERE (et ses paramètres) correspondant aux filtres."""
+        clauses, params = [], []
+        for condition, value in (
+            ("c.nom = ?", client),
+            ("c.activite = ?", activite),
+            ("c.localite = ?", localite),
+            ("m.date >= ?", start),
+            ("m.date <= ?", end),
+        ):
+            if value is not None:
+                clauses.append(condition)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _query(self, sql: str, params: Iterable) -> pd.DataFrame:
+        with self._lock:
+            cursor = self._conn.execute(sql, list(params))
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def filter(self, columns: Optional[List[str]] = None, **filters) -> pd.DataFrame:
+        """
+        Renvoie les lignes correspondant aux filtres, triées par client et date.
+
+        Args:
+            columns: Métriques à renvoyer (toutes par défaut)
+            **filters: start, end ('YYYY-MM'), client, activite, localite
+        """
+        metrics = self.metrics if columns is None else [col for col in columns if col in self.metrics]
+        select = [f"{sql} AS {_quote(name)}" for name, sql in DIMENSION_SQL.items()]
+        select += [f"m.{_quote(col)}" for col in metrics]
+        where, params = self._where(**filters)
+        return self._query(
+            f"SELECT {', '.join(select)} FROM mesures m JOIN clients c ON c.id = m.client_id{where} "
+            f"ORDER BY c.nom, m.date",
+            params
+        )
+
+    def iter_filter(self, chunk_rows: int, columns: Optional[List[str]] = None, **filters) -> Iterator[pd.DataFrame]:
+        """
+        Lignes correspondant aux filtres, par blocs de `chunk_rows` lignes (même ordre que filter).
+
+        Chaque bloc est une requête paginée sur la clé (client, date) : le verrou
+        n'est tenu que le temps d'un bloc, et seul ce bloc est en mémoire.
+        """
+        metrics = self.metrics if columns is None else [col for col in columns if col in self.metrics]
+        select = [f"{sql} AS {_quote(name)}" for name, sql in DIMENSION_SQL.items()]
+        select += [f"m.{_quote(col)}" for col in metrics]
+        where, params = self._where(**filters)
+        last = None
+        while True:
+            after = ""
+            if last is not None:
+                after = (" AND " if where else " WHERE ") + "(c.nom, m.date) > (?, ?)"
+            chunk = self._query(
+                f"SELECT {', '.join(select)} FROM mesures m JOIN clients c ON c.id = m.client_id{where}{after} "
+                f"ORDER BY c.nom, m.date LIMIT ?",
+                [*params, *(last or ()), chunk_rows]
+            )
+            if chunk.empty:
+                # Sélection vide : une tranche vide, avec ses colonnes
+                if last is None:
+                    yield chunk
+                return
+            yield chunk
+            if len(chunk) < chunk_rows:
+                return
+            last = (chunk['Client'].iloc[-1], chunk['date'].iloc[-1])
+
+    def aggregate(self, sums: Sequence[str] = (), means: Sequence[str] = (),
+                  by: Optional[Sequence[str]] = None, count: bool = False, **filters) -> pd.DataFrame:
+        """
+        Calcule sommes et moyennes en SQL, éventuellement groupées par dimension.
+
+        Args:
+            sums: Métriques à sommer
+            means: Métriques à moyenner
+            by: Dimensions de regroupement (Client, Activité, Localité, date)
+            count: Ajoute le nombre de lignes (colonne `_lignes`)
+            **filters: start, end ('YYYY-MM'), client, activite, localite
+        """
+        by = list(by or [])
+        select = [f"{DIMENSION_SQL[dim]} AS {_quote(dim)}" for dim in by]
+        select += [f"TOTAL(m.{_quote(col)}) AS {_quote(col)}" for col in sums if col in self.metrics]
+        select += [f"AVG(m.{_quote(col)}) AS {_quote(col)}" for col in means if col in self.metrics]
+        if count:
+            select.append('COUNT(*) AS "_lignes"')
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(select)} FROM mesures m JOIN clients c ON c.id = m.client_id{where}"
+        if by:
+            sql += " GROUP BY " + ", ".join(DIMENSION_SQL[dim] for dim in by)
+            sql += " ORDER BY " + ", ".join(DIMENSION_SQL[dim] for dim in by)
+        return self._query(sql, params)
+
+    def distinct(self, column: str, **filters) -> List[str]:
+        """Valeurs distinctes (triées) d'une dimension, via les index."""
+        if column not in DIMENSION_SQL:
+            raise ValueError(f"La colonne {column} n'existe pas")
+        where, params = self._where(**filters)
+        # Les dimensions client ne nécessitent la table mesures que si l'on filtre sur la date
+        if column != 'date' and not any(filters.get(key) for key in ('start', 'end')):
+            sql = f"SELECT DISTINCT {DIMENSION_SQL[column]} FROM clients c{where} ORDER BY 1"
+        else:
+            sql = f"SELECT DISTINCT {DIMENSION_SQL[column]} FROM mesures m JOIN clients c ON c.id = m.client_id{where} ORDER BY 1"
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def client_dimensions(self) -> dict:
+        """Activité et localité de chaque client : nom → (activite, localite)."""
+        with self._lock:
+            return {nom: (activite, localite) for nom, activite, localite in
+                    self._conn.execute("SELECT nom, activite, localite FROM clients")}
+
+    def client_series(self, client: str, columns: List[str]) -> tuple:
+        """Séries mensuelles d'un client : (mois, dict colonne → tableau numpy)."""
+        data = self.filter(columns=columns, client=client)
+        return data['date'].tolist(), {
+            col: pd.to_numeric(data[col], errors='coerce').to_numpy(dtype=float)
+            for col in columns if col in data.columns
+        }
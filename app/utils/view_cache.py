@@ -0,0 +1,168 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# État de filtres : (version des données, début, fin, client ("" : tous), activité, localité)
+DEFAULT_ACTIVITE = "Tous"
+DEFAULT_LOCALITE = "Tous"
+
+def make_filter_state(version: int, start: str, end: str, client: str = "",
+                      activite: str = DEFAULT_ACTIVITE, localite: str = DEFAULT_LOCALITE) -> tuple:
+    """État de filtres, clé des résultats mis en cache (mêmes valeurs que les widgets de la barre latérale)."""
+    return (version, start, end, client, activite, localite)
+
+def state_filters(state: tuple) -> dict:
+    """Arguments de DataLoader.filter_data / aggregate correspondant à un état de filtres."""
+    _, start, end, client, activite, localite = state
+    return {
+        'start': start,
+        'end': end,
+        'client': client or None,
+        'activite': activite if activite != DEFAULT_ACTIVITE else None,
+        'localite': localite if localite != DEFAULT_LOCALITE else None,
+    }
+
+class ViewCache:
+    """
+    Résultats calculés par état de filtres (KPIs, métriques financières, performances),
+    partagés par toutes les sessions et par le préchauffage.
+
+    Un calcul en cours n'est jamais dupliqué : une session qui demande une vue en
+    cours de préchauffage attend sa fin. Les entrées les moins récemment utilisées
+    sont évincées au-delà de `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key, compute: Callable[[], object]):
+        """Renvoie la valeur en cache, ou la calcule (une seule fois par clé)."""
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    break
+            # Calcul en cours dans un autre thread : on attend puis on relit
+            event.wait()
+
+        try:
+            value = compute()
+            with self._lock:
+                self._entries[key] = value
+                self.misses += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+class UsageLog:
+    """Journal des clients consultés (`data/usage.jsonl`), pour choisir les vues à préchauffer."""
+
+    def __init__(self, path: Union[str, Path] = "data/usage.jsonl"):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def record(self, client: str) -> None:
+        """Enregistre la consultation d'un client."""
+        line = json.dumps({'client': client, 'date': datetime.now().isoformat(timespec='seconds')}, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+    def top_clients(self, n: int) -> List[str]:
+        """Clients les plus consultés, du plus au moins fréquent."""
+        if n <= 0 or not self.path.exists():
+            return []
+        counts = Counter()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    counts[json.loads(line)['client']] += 1
+                except (ValueError, KeyError):
+                    continue
+        return [client for client, _ in counts.most_common(n)]
+
+def warmup_states(version: int, months: List[str], clients: List[str],
+                  config_path: Optional[Union[str, Path]] = None) -> List[tuple]:
+    """
+    États de filtres à préchauffer : vue par défaut (tous les clients, toute la
+    période), vue de chacun des clients donnés, puis états listés dans un fichier
+    JSON optionnel ([{"client", "start", "end", "activite", "localite"}, ...]).
+    """
+    start, end = months[0], months[-1]
+    states = [make_filter_state(version, start, end)]
+    states += [make_filter_state(version, start, end, client) for client in clients]
+    if config_path is not None and Path(config_path).exists():
+        for entry in json.loads(Path(config_path).read_text(encoding='utf-8')):
+            states.append(make_filter_state(
+                version,
+                entry.get('start', start),
+                entry.get('end', end),
+                entry.get('client', ""),
+                entry.get('activite', DEFAULT_ACTIVITE),
+                entry.get('localite', DEFAULT_LOCALITE)
+            ))
+    return list(dict.fromkeys(states))
+
+class CacheWarmer:
+    """
+    Précalcule en arrière-plan les vues d'une liste d'états de filtres.
+
+    Le thread démarre après le chargement des données et ne bloque pas le premier
+    affichage ; son avancement est exposé dans `progress` (voir l'instrumentation).
+    """
+
+    def __init__(self, cache: ViewCache, compute: Callable[[tuple], object], states: List[tuple]):
+        self.cache = cache
+        self.compute = compute
+        self.states = states
+        self.progress = {'total': len(states), 'done': 0, 'errors': 0, 'current': None,
+                         'elapsed': 0.0, 'finished': False}
+        self._thread = None
+
+    def _run(self):
+        started = time.perf_counter()
+        for state in self.states:
+            self.progress['current'] = state
+            try:
+                self.cache.get_or_compute(state, lambda: self.compute(state))
+            except Exception as e:
+                self.progress['errors'] += 1
+                logger.warning(f"Préchauffage de {state} impossible : {str(e)}")
+            self.progress['done'] += 1
+            self.progress['elapsed'] = time.perf_counter() - started
+        self.progress['current'] = None
+        self.progress['finished'] = True
+        logger.info(f"Préchauffage terminé : {self.progress['done']} vue(s) en {self.progress['elapsed']:.1f} s")
+
+    def start(self) -> "CacheWarmer":
+        """Démarre le préchauffage (thread en arrière-plan)."""
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+        self._thread.start()
+        return self
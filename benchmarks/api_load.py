@@ -0,0 +1,124 @@
+"""
+Charge de l'API JSON (app/api_server.py) : plusieurs clients HTTP simultanés.
+
+Chaque requête tire une route (/kpis, /financial, /performance, /clients) et un
+état de filtres parmi un petit ensemble tiré de /meta : les états se répètent,
+comme quand plusieurs dashboards consultent les mêmes vues, et le cache partagé
+du serveur évite de les recalculer. Affiche le débit, les latences (p50, p95,
+p99) et l'efficacité du cache.
+
+Sans --url, un serveur est démarré dans ce processus sur un port libre.
+
+Usage :
+    python benchmarks/api_load.py --concurrency 8 --requests 400
+    python benchmarks/api_load.py --url http://127.0.0.1:8600
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+ROUTES = ['/kpis', '/financial', '/performance', '/clients']
+
+
+def _get(url: str) -> dict:
+    with urlopen(url, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def _start_server(json_path: Path):
+    """Serveur de l'API dans un thread de ce processus ; renvoie (serveur, url)."""
+    sys.path.insert(0, str(ROOT / "app"))
+    from api_server import make_server
+    from utils.data_loader import DataLoader
+
+    loader = DataLoader(json_path=json_path)
+    loader.get_data()
+    server = make_server(loader, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _filter_states(meta: dict, count: int, rng: random.Random) -> list:
+    """`count` états de filtres : toute la période, fenêtres de mois, clients."""
+    months = meta['mois']
+    states = [{}]
+    while len(states) < count:
+        first = rng.randrange(len(months))
+        state = {'start': months[first], 'end': months[rng.randrange(first, len(months))]}
+        if rng.random() < 0.5:
+            state['client'] = rng.choice(meta['clients'])
+        elif rng.random() < 0.5:
+            state['activite'] = rng.choice(meta['activites'])
+        states.append(state)
+    return states
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="API déjà démarrée (serveur local par défaut)")
+    parser.add_argument("--json", type=Path, default=ROOT / "data" / "data.json", help="Snapshot JSON du serveur local")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients simultanés")
+    parser.add_argument("--requests", type=int, default=400, help="Nombre total de requêtes")
+    parser.add_argument("--states", type=int, default=20, help="États de filtres distincts")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du tirage des requêtes")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = _start_server(args.json)
+    url = url.rstrip('/')
+
+    rng = random.Random(args.seed)
+    states = _filter_states(_get(f"{url}/meta"), args.states, rng)
+    targets = [
+        f"{url}{route}?{urlencode(rng.choice(states))}"
+        for route in (rng.choice(ROUTES) for _ in range(args.requests))
+    ]
+    before = _get(f"{url}/health")['cache']
+
+    def timed(target: str) -> tuple:
+        started = time.perf_counter()
+        try:
+            _get(target)
+            ok = True
+        except HTTPError:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(timed, targets))
+    elapsed = time.perf_counter() - started
+    after = _get(f"{url}/health")['cache']
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+    latencies = np.array([latency for latency, _ in results])
+    errors = sum(1 for _, ok in results if not ok)
+    hits = after['succes'] - before['succes']
+    misses = after['calculs'] - before['calculs']
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{len(results)} requêtes, {args.concurrency} clients simultanés, {args.states} états de filtres")
+    print(f"débit    : {len(results) / elapsed:.1f} requêtes/s ({elapsed:.2f} s)")
+    print(f"latence  : p50 {p50:.1f} ms   p95 {p95:.1f} ms   p99 {p99:.1f} ms")
+    print(f"cache    : {hits} succès, {misses} calculs des vues ({hits / max(hits + misses, 1):.0%} de succès)")
+    if errors:
+        print(f"erreurs  : {errors}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Rapport de temps d'import (basé sur `python -X importtime`).
+
+Mesure le coût de démarrage à froid des modules du dashboard : chaque module
+est importé dans un interpréteur neuf, et les modules les plus coûteux
+(temps cumulé) sont listés.
+
+Usage :
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --top 15 --max-ms 1500 --json bench_import.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# Modules importés au démarrage du dashboard
+MODULES = [
+    "utils.data_loader",
+    "components.visualizations",
+    "utils.ai_analyzer",
+]
+
+
+def measure_import(module: str) -> list:
+    """Importe un module dans un interpréteur neuf et renvoie les lignes -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import de {module} impossible :\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # Format : "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, values = line.split(":", 1)
+        self_us, cumulative_us, name = values.split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return entries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules à mesurer")
+    parser.add_argument("--top", type=int, default=10, help="Nombre de dépendances listées par module")
+    parser.add_argument("--max-ms", type=float, default=None, help="Seuil d'échec sur le temps cumulé (ms)")
+    parser.add_argument("--json", type=Path, default=None, help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    # Modules chargés par l'interpréteur lui-même (site, encodings...), exclus du rapport
+    startup = {e["module"] for e in measure_import("sys")}
+
+    report = {}
+    failed = False
+    for module in args.modules:
+        entries = [e for e in measure_import(module) if e["module"] not in startup]
+        total = next((e["cumulative_ms"] for e in reversed(entries) if e["module"] == module), 0.0)
+        heaviest = sorted(
+            (e for e in entries if e["module"] != module and e["depth"] <= 1),
+            key=lambda e: e["cumulative_ms"],
+            reverse=True,
+        )[:args.top]
+        report[module] = {"cumulative_ms": total, "heaviest": heaviest}
+
+        print(f"{module} : {total:.1f} ms")
+        for e in heaviest:
+            print(f"    {e['cumulative_ms']:9.1f} ms  {e['module']}")
+        if args.max_ms is not None and total > args.max_ms:
+            print(f"    ⚠ dépasse le seuil de {args.max_ms:.0f} ms")
+            failed = True
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
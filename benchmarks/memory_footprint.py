@@ -0,0 +1,61 @@
+"""
+Empreinte mémoire du DataFrame en cache, mode standard contre mode compact, sur données synthétiques.
+
+- avant : dimensions en chaînes Python répétées sur chaque ligne, métriques en float64 ;
+- après : `DataLoader(compact=True)` (voir `utils/compact.py`), dimensions
+  catégorielles, comptages en petits entiers, autres métriques en float32.
+
+Affiche les octets par ligne des deux versions et l'écart relatif maximal des
+totaux de chaque métrique (sommes faites en float64 dans les deux cas).
+
+Usage :
+    python benchmarks/memory_footprint.py
+    python benchmarks/memory_footprint.py --clients 10000 --months 36
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from synthetic_data import generate_rows
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+from utils.compact import compact_frame, memory_report, widen  # noqa: E402
+from utils.data_loader import DIMENSION_COLUMNS  # noqa: E402
+from utils.derived_metrics import add_derived_metrics  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10_000, help="Nombre de clients synthétiques")
+    parser.add_argument("--months", type=int, default=36, help="Nombre de mois")
+    args = parser.parse_args()
+
+    data = add_derived_metrics(generate_rows(args.clients, args.months))
+    start = time.perf_counter()
+    compact = compact_frame(data, DIMENSION_COLUMNS)
+    elapsed = time.perf_counter() - start
+
+    before, after = memory_report(data), memory_report(compact)
+    print(f"{before['rows']} lignes, {len(data.columns)} colonnes (conversion : {elapsed:.2f} s)")
+    for label, report in (("avant", before), ("après", after)):
+        dtypes = ", ".join(f"{count} {dtype}" for dtype, count in sorted(report['dtypes'].items()))
+        print(f"{label:6s}: {report['bytes_per_row']:7.1f} octets/ligne, "
+              f"{report['bytes'] / 1e6:8.1f} Mo ({dtypes})")
+    print(f"gain  : {before['bytes'] / after['bytes']:.1f}x")
+
+    metrics = [col for col in data.columns if col not in DIMENSION_COLUMNS]
+    exact = data[metrics].sum().to_numpy(dtype=np.float64)
+    totals = widen(compact[metrics]).sum().to_numpy(dtype=np.float64)
+    error = np.abs(totals - exact) / np.where(exact != 0, np.abs(exact), 1.0)
+    worst = int(np.nanargmax(error))
+    print(f"totaux : écart relatif maximal {error[worst]:.1e} ({metrics[worst]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Latence de relance lors d'un changement de métrique dans « Comparaison des Canaux ».
+
+- avant : relance complète de `app/main.py` (chargement, filtres, grilles de
+  KPIs, métriques financières, analyse de performance, tableau des clients) ;
+- après : relance du seul fragment `canal_comparison_section`, qui reçoit
+  explicitement les agrégats du plan de métriques.
+
+Usage :
+    python benchmarks/rerun_latency.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIR = ROOT / "app"
+METRIC_LABEL = "Sélectionnez une métrique à comparer"
+
+
+def _fragment_script(app_dir, kpi_values, plan, filter_state):
+    """Script équivalent à une relance du fragment de comparaison."""
+    import sys
+    sys.path.insert(0, app_dir)
+    from components.sections import canal_comparison_section
+    canal_comparison_section(kpi_values, plan, filter_state)
+
+
+def _timed_runs(at: AppTest, metrics: list, repeat: int) -> list:
+    """Change la métrique à chaque relance et renvoie les durées (ms)."""
+    durations = []
+    for i in range(repeat):
+        metric = metrics[i % len(metrics)]
+        selectbox = next(s for s in at.selectbox if s.label == METRIC_LABEL)
+        start = time.perf_counter()
+        selectbox.set_value(metric).run()
+        durations.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return durations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Nombre de changements de métrique mesurés")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    sys.path.insert(0, str(APP_DIR))
+    from utils.data_loader import DataLoader
+    from utils.metric_catalog import comparison_metrics, compile_plan, plan_reductions
+
+    loader = DataLoader()
+    plan = compile_plan(loader.get_metric_columns())
+    metrics = list(comparison_metrics(plan))
+    metrics = metrics[1:] + metrics[:1]
+
+    # Avant : toute la page est relancée
+    full_page = AppTest.from_file(str(APP_DIR / "main.py"), default_timeout=300)
+    full_page.run()
+    before = _timed_runs(full_page, metrics, args.repeat)
+
+    # Après : seul le fragment est relancé, avec ses entrées explicites
+    kpi_values = loader.aggregate(**plan_reductions(plan)).iloc[0]
+    filter_state = (0, None, None, "", "Tous", "Tous")
+    fragment = AppTest.from_function(
+        _fragment_script, default_timeout=300, args=(str(APP_DIR), kpi_values, plan, filter_state)
+    )
+    fragment.run()
+    after = _timed_runs(fragment, metrics, args.repeat)
+
+    print(f"Relance complète de la page : {statistics.median(before):8.1f} ms (médiane sur {args.repeat})")
+    print(f"Relance du fragment seul    : {statistics.median(after):8.1f} ms (médiane sur {args.repeat})")
+    print(f"Gain : x{statistics.median(before) / statistics.median(after):.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
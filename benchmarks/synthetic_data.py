@@ -0,0 +1,88 @@
+"""
+Générateur de données synthétiques pour les benchmarks.
+
+Produit des lignes client-mois au format du DataFrame du loader (dimensions
+Client, Activité, Localité, date et métriques chargées), à l'échelle voulue.
+Chaque client a son propre niveau d'activité, avec une saisonnalité commune, du
+bruit et quelques ruptures injectées (hausses ou effondrements soudains).
+
+Usage (depuis un autre benchmark) :
+    from synthetic_data import generate_rows
+    data = generate_rows(n_clients=10_000, n_months=36)
+"""
+import numpy as np
+import pandas as pd
+
+ACTIVITES = ['Plombier', 'Couvreur', 'Fleuriste', 'Garagiste', 'Formation', 'Électricien', 'Boulangerie', 'Coiffeur']
+LOCALITES = ['Paris', 'Lyon', 'Marseille', 'Toulouse', 'Nantes', 'Lille', 'Bordeaux', 'Rennes']
+
+# Métriques chargées : (colonne, type) ; le type détermine la loi de génération
+METRIC_COLUMNS = [
+    ('site_impressions', 'volume'), ('site_visites', 'volume'), ('site_ctr', 'taux'),
+    ('site_duree_moyenne', 'duree'), ('site_taux_rebond', 'taux'), ('site_nombre_appels', 'contacts'),
+    ('site_formulaires', 'contacts'), ('site_contacts', 'contacts'), ('site_cout_contact', 'cout'),
+    ('site_taux_conversion', 'taux'), ('site_position_moyenne', 'position'), ('site_score_site_pondéré', 'score'),
+    ('google_ads_budget', 'budget'), ('google_ads_quality_score', 'score'), ('google_ads_impressions', 'volume'),
+    ('google_ads_clics', 'volume'), ('google_ads_ctr', 'taux'), ('google_ads_taux_conversion', 'taux'),
+    ('google_ads_appels', 'contacts'), ('google_ads_formulaires', 'contacts'), ('google_ads_contacts', 'contacts'),
+    ('google_ads_cout_contact', 'cout'), ('google_ads_durée_moyenne_visite', 'duree'),
+    ('google_ads_taux_de_rebond', 'taux'), ('google_ads_score_google_ads_pondéré', 'score'),
+    ('meta_ads_budget', 'budget'), ('meta_ads_relevance_score', 'score'), ('meta_ads_impressions', 'volume'),
+    ('meta_ads_clics', 'volume'), ('meta_ads_ctr', 'taux'), ('meta_ads_taux_conversion', 'taux'),
+    ('meta_ads_interaction', 'volume'), ('meta_ads_taux_interaction', 'taux'), ('meta_ads_appels', 'contacts'),
+    ('meta_ads_formulaires', 'contacts'), ('meta_ads_contacts', 'contacts'), ('meta_ads_cout_contact', 'cout'),
+    ('meta_ads_durée_moyenne_visite', 'duree'), ('meta_ads_taux_de_rebond', 'taux'),
+    ('meta_ads_score_meta_ads_pondéré', 'score'), ('gmb_impressions', 'volume'), ('gmb_clics_site', 'volume'),
+    ('gmb_demande_d_itineraire', 'contacts'), ('gmb_appels', 'contacts'), ('gmb_reservations', 'contacts'),
+    ('gmb_taux_d_interaction', 'taux'), ('gmb_taux_d_appel', 'taux'), ('gmb_taux_de_reservation', 'taux'),
+    ('gmb_nombre_avis', 'contacts'), ('gmb_score_avis', 'score'), ('gmb_vues_meta_adsps_mobile', 'volume'),
+    ('gmb_vues_meta_adsps_desktop', 'volume'), ('gmb_vues_recherche_google_mobile', 'volume'),
+    ('gmb_vues_recherche_google_desktop', 'volume'), ('gmb_score_gmb_pondéré', 'score'),
+]
+
+# Niveau moyen de chaque type de métrique (multiplié par le niveau du client)
+SCALES = {'volume': 2000.0, 'contacts': 15.0, 'budget': 800.0, 'cout': 20.0}
+
+
+def generate_rows(n_clients: int = 10_000, n_months: int = 36, first_month: str = "2023-01",
+                  shock_rate: float = 0.002, seed: int = 0) -> pd.DataFrame:
+    """
+    Génère `n_clients` × `n_months` lignes client-mois.
+
+    Args:
+        n_clients: Nombre de clients
+        n_months: Nombre de mois consécutifs à partir de `first_month`
+        first_month: Premier mois ('YYYY-MM')
+        shock_rate: Part des cellules client-mois-métrique multipliées ou divisées par 5
+        seed: Graine du générateur
+    """
+    rng = np.random.default_rng(seed)
+    start = int(first_month[:4]) * 12 + int(first_month[5:7]) - 1
+    months = [f"{(start + i) // 12:04d}-{(start + i) % 12 + 1:02d}" for i in range(n_months)]
+
+    level = rng.lognormal(0.0, 0.6, size=(n_clients, 1))
+    season = 1 + 0.15 * np.sin(np.arange(n_months) * 2 * np.pi / 12)
+    shape = (n_clients, n_months)
+
+    columns = {
+        'Client': np.repeat(np.array([f"Client {i:05d}" for i in range(n_clients)], dtype=object), n_months),
+        'Activité': np.repeat(rng.choice(np.array(ACTIVITES, dtype=object), n_clients), n_months),
+        'Localité': np.repeat(rng.choice(np.array(LOCALITES, dtype=object), n_clients), n_months),
+        'date': np.tile(np.array(months, dtype=object), n_clients),
+    }
+    for column, kind in METRIC_COLUMNS:
+        if kind in SCALES:
+            mean = SCALES[kind] * level * season
+            values = rng.poisson(mean).astype(np.float64) if kind in ('volume', 'contacts') else rng.gamma(4.0, mean / 4.0)
+            shocks = rng.random(shape) < shock_rate
+            values[shocks] *= rng.choice([0.2, 5.0], size=int(shocks.sum()))
+        elif kind == 'taux':
+            values = rng.beta(2, 20, size=shape)
+        elif kind == 'duree':
+            values = rng.gamma(4.0, 40.0, size=shape)
+        elif kind == 'position':
+            values = rng.uniform(1, 30, size=shape)
+        else:
+            values = rng.uniform(1, 10, size=shape)
+        columns[column] = np.round(values, 2).ravel()
+    return pd.DataFrame(columns)
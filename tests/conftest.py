@@ -0,0 +1,18 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Les modules de l'application s'importent comme sous `streamlit run app/main.py`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from loader_checks import DATA_JSON  # noqa: E402
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    """Copie de data/data.json, modifiable par le test."""
+    path = tmp_path / "data.json"
+    shutil.copy(DATA_JSON, path)
+    return path
@@ -0,0 +1,52 @@
+"""
+Outils communs aux tests du DataLoader : copies des fichiers de données,
+enregistrements du journal et comparaison avec un rechargement complet.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import DataLoader
+
+DATA_JSON = Path(__file__).resolve().parent.parent / "data" / "data.json"
+BACKENDS = ["pandas", "sqlite"]
+
+
+def snapshot(path: Path) -> dict:
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def write_snapshot(path: Path, json_data: dict) -> None:
+    """Réécrit le snapshot avec une date de modification différente (détectée par refresh)."""
+    mtime = path.stat().st_mtime_ns
+    path.write_text(json.dumps(json_data, ensure_ascii=False), encoding='utf-8')
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+def record(client: dict, month: str, contacts: int, **fields) -> dict:
+    """Enregistrement du journal : premier mois de l'historique du client, daté `month`."""
+    hist = json.loads(json.dumps(client['historique'][0]))
+    hist['site']['contacts'] = contacts
+    return {**hist, 'nom': client['nom'], 'date': month, **fields}
+
+
+def assert_same_as_reload(loader: DataLoader, json_path: Path, tmp_path: Path) -> None:
+    """Les lignes du loader sont celles d'un loader neuf (base SQLite reconstruite) sur les mêmes fichiers."""
+    fresh = DataLoader(json_path=json_path, backend=loader.backend, db_path=tmp_path / "fresh.sqlite")
+
+    def rows(data: pd.DataFrame) -> pd.DataFrame:
+        return data.sort_values(['Client', 'date']).reset_index(drop=True)
+
+    actual, expected = rows(loader.filter_data()), rows(fresh.filter_data())
+    assert sorted(actual.columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False)
+    for client in fresh.get_clients():
+        months, series = loader.get_client_series(client, ['contacts_total', 'site_contacts'])
+        fresh_months, fresh_series = fresh.get_client_series(client, ['contacts_total', 'site_contacts'])
+        observed = [months.index(month) for month in fresh_months]
+        assert [months[i] for i in observed] == list(fresh_months)
+        for column, values in fresh_series.items():
+            np.testing.assert_allclose(series[column][observed], values)
@@ -0,0 +1,108 @@
+"""
+Journal des enregistrements mensuels : ajout, refresh et compaction.
+
+Après chaque mise à jour, les données doivent être celles d'un rechargement
+complet des mêmes fichiers.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from loader_checks import BACKENDS, assert_same_as_reload, record, snapshot
+from utils.data_loader import DataLoader, fcntl
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# Ajout d'un autre processus (comme app/ingest.py) : prêt une fois les modules
+# chargés, il ajoute l'enregistrement lu sur l'entrée standard
+APPEND_SCRIPT = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+from utils.data_loader import DataLoader
+loader = DataLoader(json_path=sys.argv[2])
+print("pret", flush=True)
+loader.append_records([json.loads(sys.stdin.readline())])
+"""
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_journal_refresh_matches_reload(backend, json_path, tmp_path):
+    loader = DataLoader(json_path=json_path, backend=backend)
+    loader.get_data()
+    loader.get_time_series()
+    clients = snapshot(json_path)['clients']
+    latest = clients[0]['historique'][0]['date']
+
+    loader.append_records([
+        # Mois existant modifié et nouveau mois, sans activité ni localité : celles du client
+        record(clients[0], latest, 777),
+        record(clients[1], "2025-06", 12),
+        record({**clients[2], 'nom': "Nouveau client"}, latest, 5, activite="Plombier", localite="Lyon"),
+    ])
+    assert loader.refresh()
+
+    assert loader.filter_data(client=clients[1]['nom'])['Activité'].unique().tolist() == [clients[1]['activite']]
+    assert loader.filter_data(client=clients[0]['nom'], start=latest)['contacts_total'].notna().all()
+    assert_same_as_reload(loader, json_path, tmp_path)
+
+
+def test_unknown_client_without_dimensions_is_rejected(json_path):
+    loader = DataLoader(json_path=json_path)
+    client = snapshot(json_path)['clients'][0]
+    with pytest.raises(ValueError):
+        loader.append_records([record({**client, 'nom': "Inconnu"}, "2025-06", 1)])
+    assert not loader.changes_path.exists()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_compact_matches_reload(backend, json_path, tmp_path):
+    loader = DataLoader(json_path=json_path, backend=backend)
+    loader.get_data()
+    clients = snapshot(json_path)['clients']
+    loader.append_records([record(clients[0], "2025-06", 42), record(clients[3], "2025-07", 7)])
+    assert loader.refresh()
+
+    assert loader.compact() == 2
+    assert loader.changes_path.read_bytes() == b""
+    loader.refresh()
+    assert {h['date'] for h in snapshot(json_path)['clients'][0]['historique']} >= {"2025-06"}
+    assert_same_as_reload(loader, json_path, tmp_path)
+
+
+@pytest.mark.skipif(fcntl is None, reason="verrou du journal entre processus indisponible sans fcntl")
+def test_compact_keeps_appends_from_another_process(json_path, monkeypatch):
+    loader = DataLoader(json_path=json_path)
+    client = snapshot(json_path)['clients'][0]
+    loader.append_records([record(client, "2025-06", 42)])
+    writer = subprocess.Popen(
+        [sys.executable, "-c", APPEND_SCRIPT, str(APP_DIR), str(json_path)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    assert writer.stdout.readline().strip() == "pret"
+
+    # L'autre processus ajoute son enregistrement juste avant le remplacement du
+    # journal, après la lecture de sa fin : sans verrou, la ligne serait perdue
+    replace = os.replace
+
+    def replace_during_append(src, dst):
+        if Path(dst) == loader.changes_path:
+            writer.stdin.write(json.dumps(record(client, "2025-07", 7)) + "\n")
+            writer.stdin.flush()
+            try:
+                writer.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                pass  # Bloqué par le verrou jusqu'à la fin de la compaction
+        replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', replace_during_append)
+    assert loader.compact() == 1
+    monkeypatch.undo()
+    assert writer.wait(timeout=30) == 0
+
+    assert loader.compact() == 1
+    dates = {h['date'] for c in snapshot(json_path)['clients'] if c['nom'] == client['nom'] for h in c['historique']}
+    assert dates >= {"2025-06", "2025-07"}
@@ -0,0 +1,15 @@
+"""
+Index des lignes par (client, mois) : les bornes de mois hors des données
+restent dans la plage du client.
+"""
+from utils.data_loader import DataLoader
+
+
+def test_month_bounds_stay_within_client(json_path):
+    loader = DataLoader(json_path=json_path)
+    client = loader.get_clients()[0]
+    rows = loader.filter_data(client=client)
+    assert len(loader.filter_data(client=client, end="9999-12")) == len(rows)
+    assert len(loader.filter_data(client=client, start="0001-01")) == len(rows)
+    assert len(loader.filter_positions(end="9999-12")) == len(loader.get_data())
+    assert len(loader.filter_data(start="2099-01")) == 0
@@ -0,0 +1,24 @@
+"""
+Remplacement du snapshot JSON : seuls les clients modifiés ou retirés sont
+recalculés, et les données doivent être celles d'un rechargement complet.
+"""
+import pytest
+
+from loader_checks import BACKENDS, assert_same_as_reload, snapshot, write_snapshot
+from utils.data_loader import DataLoader
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_snapshot_patch_matches_reload(backend, json_path, tmp_path):
+    loader = DataLoader(json_path=json_path, backend=backend)
+    loader.get_data()
+    loader.get_time_series()
+
+    json_data = snapshot(json_path)
+    json_data['clients'][0]['historique'][0]['site']['contacts'] = 555
+    removed = json_data['clients'].pop(1)
+    write_snapshot(json_path, json_data)
+    assert loader.refresh()
+
+    assert removed['nom'] not in loader.get_clients()
+    assert_same_as_reload(loader, json_path, tmp_path)